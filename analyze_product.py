@@ -7,16 +7,17 @@ Usage: python analyze_product.py <amazon_url_or_asin_or_product_name>
 import sys
 import asyncio
 import json
-import pandas as pd
 import re
 from backend.carbon import estimate_carbon, estimate_carbon_strict
-from backend.llm_extract import extract_facts_claude
+from backend.fact_extract import extract_facts
 from backend.settings import settings
 from backend.models import ProductInfo
 
 
 def load_csv_data():
     """Load the Amazon CSV dataset"""
+    import pandas as pd
+
     try:
         df = pd.read_csv('amazon_com_best_sellers_2025_01_27.csv')
         print(f"Loaded CSV with {len(df)} products")
@@ -62,6 +63,8 @@ def find_product_in_csv(df, search_term):
 
 def parse_weight_from_additional_properties(additional_props_str):
     """Extract weight from additionalProperties JSON string"""
+    import pandas as pd
+
     if pd.isna(additional_props_str):
         return None
     
@@ -91,6 +94,8 @@ def parse_weight_from_additional_properties(additional_props_str):
 
 def csv_row_to_product_info(row):
     """Convert a CSV row to ProductInfo object"""
+    import pandas as pd
+
     # Extract weight
     weight_kg = None
     if pd.notna(row.get('weight_value')) and pd.notna(row.get('weight_unit')):
@@ -202,22 +207,22 @@ async def analyze_product(search_term: str, destination: str = "Boston", shippin
         # Step 2: LLM extraction (if API key available)
         # Use strict mode with real APIs
         strict = settings.STRICT_SOURCED_ONLY or bool(settings.CLIMATIQ_API_KEY)
-        if strict and info.raw and info.raw.get("text") and settings.ANTHROPIC_API_KEY:
-            print("Extracting facts with Claude LLM...")
+        if strict:
+            print("Extracting facts (detail table, regexes, then Claude for what's missing)...")
             try:
-                extracted = await extract_facts_claude(info.raw.get("text") or "")
+                extracted = await extract_facts(info)
             except Exception as e:
-                print(f"   CLAUDE API ERROR: {e}")
+                print(f"   EXTRACTION ERROR: {e}")
                 extracted = {}
             
-            # Update info with LLM extracted data
+            # Update info with extracted data
             if not info.weight_kg and extracted.get("item_weight_kg"):
                 info.weight_kg = extracted.get("item_weight_kg")
-                print(f"   LLM found weight: {info.weight_kg} kg")
+                print(f"   Found weight: {info.weight_kg} kg")
             
             if not info.shipping_weight_kg and extracted.get("shipping_weight_kg"):
                 info.shipping_weight_kg = extracted.get("shipping_weight_kg")
-                print(f"   LLM found shipping weight: {info.shipping_weight_kg} kg")
+                print(f"   Found shipping weight: {info.shipping_weight_kg} kg")
             
             # Attach extracted data to raw for carbon calculation
             extra_raw = info.raw or {}
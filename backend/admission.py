@@ -0,0 +1,89 @@
+"""
+Admission control for expensive endpoints.
+
+Each controller allows a fixed number of requests to run at once and parks a
+bounded number of others in a wait queue with a deadline. Anything beyond that
+is rejected immediately (429), and anything that waits past the deadline is
+shed (503). Both carry a Retry-After hint derived from recent service times.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict
+
+
+class Overloaded(Exception):
+    """Raised when a request cannot be admitted; maps to an HTTP 429/503 with Retry-After."""
+
+    def __init__(self, endpoint: str, status_code: int, retry_after: int, reason: str):
+        super().__init__(f"{endpoint} is {reason}")
+        self.endpoint = endpoint
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class AdmissionController:
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, queue_timeout_s: float):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout_s = queue_timeout_s
+        self._sem = asyncio.Semaphore(self.max_concurrency)
+        self._active = 0
+        self._waiting = 0
+        # EWMA of time spent holding a slot, seeds the Retry-After estimate
+        self._avg_service_s = 1.0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free, assuming the queue drains at the current rate."""
+        backlog = self._waiting + 1
+        return max(1, math.ceil(self._avg_service_s * backlog / self.max_concurrency))
+
+    @asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        if not self._sem.locked():
+            # Free slot: acquire() completes without suspending
+            await self._sem.acquire()
+        else:
+            if self._waiting >= self.max_queue:
+                self.rejected += 1
+                raise Overloaded(self.name, 429, self.retry_after(), "saturated")
+            self._waiting += 1
+            try:
+                await asyncio.wait_for(self._sem.acquire(), timeout=self.queue_timeout_s)
+            except asyncio.TimeoutError:
+                self.timed_out += 1
+                raise Overloaded(self.name, 503, self.retry_after(), "overloaded (queue deadline exceeded)") from None
+            finally:
+                self._waiting -= 1
+
+        self.admitted += 1
+        self._active += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._active -= 1
+            self._avg_service_s = 0.8 * self._avg_service_s + 0.2 * (time.monotonic() - started)
+            self._sem.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self._active,
+            "waiting": self._waiting,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "queue_timeout_s": self.queue_timeout_s,
+            "avg_service_s": round(self._avg_service_s, 3),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
@@ -0,0 +1,302 @@
+"""
+Precomputed lower-carbon alternatives.
+
+The whole catalog is scored once with the heuristic `estimate_carbon` (at a
+fixed baseline destination and shipping mode, so scores are comparable) and
+grouped by breadcrumb category. Within a category, products are clustered with
+the similarity index: each cluster is led by one product and holds the
+products close enough to it. Every category and every cluster keeps its
+products sorted by footprint, so the alternatives for a product are the head
+of its cluster's list, topped up from its category, without scraping or
+estimating anything at request time.
+
+Updates are incremental: `upsert` re-scores one product and moves it within
+the sorted lists. The index is saved as JSON; build it offline with
+
+    python alternatives_index.py path/to/dataset.csv [--out alternatives_index.json]
+"""
+
+from __future__ import annotations
+
+import bisect
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+from carbon import estimate_carbon
+from models import ProductInfo
+
+if TYPE_CHECKING:
+    from similarity_index import SimilarityIndex
+
+
+# Neighbours looked at when clustering a product
+CLUSTER_NEIGHBOURS = 50
+UNCATEGORIZED = "Uncategorized"
+
+
+class AlternativeEntry:
+    __slots__ = ("asin", "title", "brand", "url", "category", "cluster", "kg")
+
+    def __init__(self, asin: str, title: Optional[str], brand: Optional[str], url: str,
+                 category: str, cluster: str, kg: float):
+        self.asin = asin
+        self.title = title
+        self.brand = brand
+        self.url = url
+        self.category = category
+        self.cluster = cluster
+        self.kg = kg
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class AlternativesIndex:
+    def __init__(self, destination: Optional[str] = None, shipping_mode: Optional[str] = "ground",
+                 cluster_min_score: float = 0.35):
+        self.destination = destination
+        self.shipping_mode = shipping_mode
+        self.cluster_min_score = cluster_min_score
+        self.entries: Dict[str, AlternativeEntry] = {}
+        # (kg, asin) lists sorted ascending, per category and per (category, cluster)
+        self._by_category: Dict[str, List[Tuple[float, str]]] = {}
+        self._by_cluster: Dict[Tuple[str, str], List[Tuple[float, str]]] = {}
+        self._similarity: Optional["SimilarityIndex"] = None
+        self._lock = threading.Lock()
+        self.built_at: Optional[float] = None
+        self.dirty = False
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def score(self, info: ProductInfo) -> float:
+        """Baseline footprint used for ranking."""
+        return round(estimate_carbon(info, self.destination, self.shipping_mode).total, 3)
+
+    def build(self, products: Iterable[ProductInfo], similarity: Optional["SimilarityIndex"] = None) -> "AlternativesIndex":
+        """Score and cluster a whole catalog, replacing the current contents."""
+        entries: Dict[str, AlternativeEntry] = {}
+        for info in products:
+            if info.asin:
+                entries[info.asin] = self._entry(info, cluster="")
+
+        # Leader clustering in ASIN order, so the result doesn't depend on input order
+        for asin in sorted(entries):
+            entry = entries[asin]
+            if entry.cluster:
+                continue
+            entry.cluster = asin
+            for other in self._neighbours(similarity, entry):
+                candidate = entries.get(other)
+                if candidate is not None and not candidate.cluster and candidate.category == entry.category:
+                    candidate.cluster = asin
+
+        with self._lock:
+            self.entries = entries
+            self._similarity = similarity
+            self._reindex()
+            self.built_at = time.time()
+            self.dirty = True
+        return self
+
+    def upsert(self, info: ProductInfo) -> Optional[AlternativeEntry]:
+        """Re-score one product (adding it if new) and move it to its new rank."""
+        if not info.asin:
+            return None
+        with self._lock:
+            old = self.entries.get(info.asin)
+            entry = self._entry(info, cluster=old.cluster if old else "")
+            if old is not None and old.category == entry.category:
+                self._unlink(old)
+            else:
+                if old is not None:
+                    self._unlink(old)
+                entry.cluster = self._nearest_cluster(entry)
+            self.entries[entry.asin] = entry
+            self._link(entry)
+            self.dirty = True
+            return entry
+
+    def alternatives(self, asin: str, limit: int = 5) -> Optional[Dict[str, Any]]:
+        """Products with a lower footprint than `asin`: same cluster first, then same category."""
+        entry = self.entries.get(asin)
+        if entry is None:
+            return None
+        picked: List[Dict[str, Any]] = []
+        seen = {asin}
+        for same_cluster, ranking in (
+            (True, self._by_cluster.get((entry.category, entry.cluster), [])),
+            (False, self._by_category.get(entry.category, [])),
+        ):
+            # Rankings are ascending, so everything that qualifies sits at the front
+            for kg, other in ranking:
+                if len(picked) >= limit or kg >= entry.kg:
+                    break
+                if other in seen:
+                    continue
+                seen.add(other)
+                alt = self.entries[other]
+                picked.append({
+                    "asin": alt.asin,
+                    "title": alt.title,
+                    "brand": alt.brand,
+                    "url": alt.url,
+                    "carbon_kgco2e": alt.kg,
+                    "savings_kgco2e": round(entry.kg - alt.kg, 3),
+                    "same_cluster": same_cluster,
+                })
+        return {"product": entry.to_dict(), "alternatives": picked}
+
+    def _entry(self, info: ProductInfo, cluster: str) -> AlternativeEntry:
+        return AlternativeEntry(
+            asin=info.asin or "",
+            title=info.title,
+            brand=info.brand,
+            url=str(info.url),
+            category=info.category or UNCATEGORIZED,
+            cluster=cluster,
+            kg=self.score(info),
+        )
+
+    def _neighbours(self, similarity: Optional["SimilarityIndex"], entry: AlternativeEntry) -> List[str]:
+        if similarity is None:
+            return []
+        hits = similarity.query(entry.title, entry.brand, entry.category, k=CLUSTER_NEIGHBOURS,
+                                exclude=[entry.asin], min_score=self.cluster_min_score)
+        return [asin for asin, _ in hits]
+
+    def _nearest_cluster(self, entry: AlternativeEntry) -> str:
+        for other in self._neighbours(self._similarity, entry):
+            known = self.entries.get(other)
+            if known is not None and known.category == entry.category:
+                return known.cluster
+        return entry.asin
+
+    def _link(self, entry: AlternativeEntry) -> None:
+        bisect.insort(self._by_category.setdefault(entry.category, []), (entry.kg, entry.asin))
+        bisect.insort(self._by_cluster.setdefault((entry.category, entry.cluster), []), (entry.kg, entry.asin))
+
+    def _unlink(self, entry: AlternativeEntry) -> None:
+        for groups, key in ((self._by_category, entry.category), (self._by_cluster, (entry.category, entry.cluster))):
+            ranking = groups.get(key, [])
+            i = bisect.bisect_left(ranking, (entry.kg, entry.asin))
+            if i < len(ranking) and ranking[i] == (entry.kg, entry.asin):
+                del ranking[i]
+            if not ranking:
+                groups.pop(key, None)
+
+    def _reindex(self) -> None:
+        self._by_category = {}
+        self._by_cluster = {}
+        for entry in self.entries.values():
+            self._by_category.setdefault(entry.category, []).append((entry.kg, entry.asin))
+            self._by_cluster.setdefault((entry.category, entry.cluster), []).append((entry.kg, entry.asin))
+        for ranking in list(self._by_category.values()) + list(self._by_cluster.values()):
+            ranking.sort()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "products": len(self.entries),
+            "categories": len(self._by_category),
+            "clusters": len(self._by_cluster),
+            "built_at": self.built_at,
+            "dirty": self.dirty,
+        }
+
+    def save(self, path: str | Path) -> None:
+        path = Path(path)
+        with self._lock:
+            payload = {
+                "version": 1,
+                "built_at": self.built_at,
+                "destination": self.destination,
+                "shipping_mode": self.shipping_mode,
+                "cluster_min_score": self.cluster_min_score,
+                "products": [e.to_dict() for e in self.entries.values()],
+            }
+            tmp = path.with_suffix(path.suffix + ".tmp")
+            tmp.write_text(json.dumps(payload))
+            os.replace(tmp, path)
+            self.dirty = False
+
+    @classmethod
+    def load(cls, path: str | Path, similarity: Optional["SimilarityIndex"] = None) -> "AlternativesIndex":
+        payload = json.loads(Path(path).read_text())
+        index = cls(payload.get("destination"), payload.get("shipping_mode"), payload.get("cluster_min_score", 0.35))
+        index.entries = {p["asin"]: AlternativeEntry(**p) for p in payload.get("products", [])}
+        index.built_at = payload.get("built_at")
+        index._similarity = similarity
+        index._reindex()
+        return index
+
+
+def build_from_dataset(loader, cluster_min_score: float = 0.35) -> AlternativesIndex:
+    """Score every product of a loaded DatasetLoader."""
+    products = (loader._row_to_product_info(row) for _, row in loader.df.iterrows())
+    return AlternativesIndex(cluster_min_score=cluster_min_score).build(products, loader.get_similarity_index())
+
+
+# Loaded (or built) by the app on startup
+alternatives_index: Optional[AlternativesIndex] = None
+
+
+def start_alternatives_index(path: str, build_if_missing: bool, cluster_min_score: float) -> Optional[AlternativesIndex]:
+    """Load the saved index, or build it from the loaded dataset. Blocking; run it in a thread."""
+    global alternatives_index
+    from dataset_loader import dataset_loader
+
+    similarity = dataset_loader.get_similarity_index()
+    if os.path.exists(path):
+        try:
+            alternatives_index = AlternativesIndex.load(path, similarity)
+            print(f"Loaded alternatives index with {len(alternatives_index)} products from {path}")
+            return alternatives_index
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"WARNING: Could not load alternatives index from {path}: {e}")
+    if build_if_missing and dataset_loader.df is not None:
+        alternatives_index = build_from_dataset(dataset_loader, cluster_min_score)
+        print(f"Built alternatives index with {len(alternatives_index)} products")
+    return alternatives_index
+
+
+def stop_alternatives_index(path: str) -> None:
+    """Persist incremental updates made since the index was loaded."""
+    global alternatives_index
+    if alternatives_index is not None and alternatives_index.dirty:
+        try:
+            alternatives_index.save(path)
+        except OSError as e:
+            print(f"WARNING: Could not save alternatives index to {path}: {e}")
+    alternatives_index = None
+
+
+def main() -> None:
+    import argparse
+
+    from dataset_loader import DatasetLoader
+
+    parser = argparse.ArgumentParser(description="Build the lower-carbon alternatives index from a dataset CSV")
+    parser.add_argument("csv", help="Dataset CSV (Octaprice layout)")
+    parser.add_argument("--out", default=os.path.join(os.path.dirname(__file__), "alternatives_index.json"))
+    parser.add_argument("--cluster-min-score", type=float, default=0.35)
+    args = parser.parse_args()
+
+    loader = DatasetLoader()
+    if not loader.load_local_dataset(args.csv):
+        raise SystemExit(1)
+    started = time.perf_counter()
+    index = build_from_dataset(loader, args.cluster_min_score)
+    index.save(args.out)
+    stats = index.stats()
+    print(
+        f"Indexed {stats['products']} products in {stats['categories']} categories / {stats['clusters']} clusters "
+        f"in {time.perf_counter() - started:.1f}s -> {args.out}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,23 @@
 from __future__ import annotations
 
-import asyncio
-from fastapi import FastAPI, HTTPException
+from typing import Optional
+
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 
+from admission import AdmissionController, Overloaded
+from deadline import Deadline, DeadlineExceeded
 from extract_top_k_similar import extract_top_k_similar
-from models import AnalyzeRequest, AnalyzeResponse
-from scrape import scrape_amazon_product
+from models import AnalyzeRequest, AnalyzeResponse, CarbonBreakdown, CoverageRequest, ProductInfo
+from scrape import scrape_amazon_product, strategy_scheduler, page_cache, _extract_product_info_from_url
 from carbon import estimate_carbon, estimate_carbon_strict
 from settings import settings
-from llm_extract import extract_facts_claude
+from serialization import FastJSONResponse, project
+from fact_extract import extract_facts
 from dataset_loader import load_dataset, get_product_from_url
-from analyze_api import router as analyze_router
 
 
-app = FastAPI(title=settings.APP_NAME, version="0.1.0")
+app = FastAPI(title=settings.APP_NAME, version="0.1.0", default_response_class=FastJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -24,7 +27,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Include the analyze router
+analyze_admission = AdmissionController(
+    "analyze",
+    max_concurrency=settings.ADMISSION_ANALYZE_CONCURRENCY,
+    max_queue=settings.ADMISSION_ANALYZE_QUEUE,
+    queue_timeout_s=settings.ADMISSION_QUEUE_TIMEOUT,
+)
+similar_admission = AdmissionController(
+    "similar",
+    max_concurrency=settings.ADMISSION_SIMILAR_CONCURRENCY,
+    max_queue=settings.ADMISSION_SIMILAR_QUEUE,
+    queue_timeout_s=settings.ADMISSION_QUEUE_TIMEOUT,
+)
+
+# Analyze router is not imported: it pulls in analyze_product and pandas at startup
+# from analyze_api import router as analyze_router
 # app.include_router(analyze_router, prefix="/api")  # Commented out to avoid conflict
 
 
@@ -50,82 +67,192 @@ async def startup_event():
     else:
         print("WARNING: No dataset found. API will fallback to web scraping only.")
 
+    import asyncio
+
+    if settings.SIMILAR_INDEX_ENABLED:
+        from dataset_loader import dataset_loader
+
+        # Build now rather than on the first /api/similar request
+        await asyncio.to_thread(dataset_loader.get_similarity_index)
+
+    from alternatives_index import start_alternatives_index
+
+    await asyncio.to_thread(
+        start_alternatives_index,
+        settings.ALTERNATIVES_INDEX_PATH,
+        settings.ALTERNATIVES_BUILD_ON_STARTUP,
+        settings.ALTERNATIVES_CLUSTER_MIN_SCORE,
+    )
+
+    if settings.COVERAGE_FILTER_ENABLED:
+        from asin_coverage import start_coverage
+        from extension_cache import DEFAULT_OUT
+
+        await asyncio.to_thread(start_coverage, settings.COVERAGE_FALSE_POSITIVE_RATE, DEFAULT_OUT)
+
+    from extraction_pool import extraction_pool
+
+    extraction_pool.start(settings.EXTRACT_WORKERS, settings.EXTRACT_INLINE_BELOW_BYTES)
+
+    if settings.SCRAPE_TRY_PLAYWRIGHT:
+        from browser_pool import start_browser_pool
+        from scrape import DESKTOP_USER_AGENT
+
+        await start_browser_pool(
+            size=settings.PLAYWRIGHT_POOL_SIZE,
+            max_pages_per_context=settings.PLAYWRIGHT_MAX_PAGES_PER_CONTEXT,
+            user_agent=settings.USER_AGENT or DESKTOP_USER_AGENT,
+            block_resources=[r.strip() for r in settings.PLAYWRIGHT_BLOCK_RESOURCES.split(",") if r.strip()],
+        )
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close the shared Playwright browser and the extraction workers; save re-scored alternatives."""
+    from alternatives_index import stop_alternatives_index
+    from asin_coverage import stop_coverage
+    from browser_pool import stop_browser_pool
+    from extraction_pool import extraction_pool
+    from llm_extract import llm_cache
+
+    await stop_browser_pool()
+    extraction_pool.stop()
+    stop_alternatives_index(settings.ALTERNATIVES_INDEX_PATH)
+    stop_coverage()
+    if llm_cache is not None:
+        llm_cache.close()
+
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    return FastJSONResponse(
+        {"detail": f"Service busy: {exc}. Retry later.", "endpoint": exc.endpoint},
+        status_code=exc.status_code,
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
 
 @app.get("/api/health")
 async def health():
     return {"status": "ok"}
 
 
-@app.post("/api/analyze", response_model=AnalyzeResponse)
-async def analyze(req: AnalyzeRequest):
+@app.get("/api/admission")
+async def admission_stats():
+    import llm_scheduler
+
+    return {
+        "analyze": analyze_admission.stats(),
+        "similar": similar_admission.stats(),
+        "llm": llm_scheduler.scheduler.stats(),
+    }
+
+
+@app.get("/api/scrape/stats")
+async def scrape_stats(host: str | None = None):
+    """Per-host fetch strategy stats, the order fetch_html would currently use, the page/LLM caches and browser pool."""
+    import browser_pool
+    from extraction_pool import extraction_pool
+    import fact_extract
+    from llm_extract import llm_cache
+
+    pool = browser_pool.browser_pool
+    return {
+        "adaptive": settings.SCRAPE_ADAPTIVE,
+        "hosts": strategy_scheduler.snapshot(host),
+        "page_cache": page_cache.stats() if page_cache is not None else None,
+        "browser_pool": pool.stats() if pool is not None else None,
+        "extraction_pool": extraction_pool.stats(),
+        "llm_cache": llm_cache.stats() if llm_cache is not None else None,
+        "fact_extraction": fact_extract.stats(),
+    }
+
+
+def _mock_product(url) -> ProductInfo:
+    from pydantic import AnyUrl
+
+    return ProductInfo(
+        url=AnyUrl(str(url)),
+        title="LED String Lights 66ft 200 LED",
+        brand="Brightech",
+        asin="B0CYLKRRQX",
+        price=24.99,
+        currency="USD",
+        weight_kg=0.5,
+        shipping_weight_kg=0.7,
+        dimensions_cm=(30.0, 20.0, 5.0),
+        category="Home & Garden",
+        bullets=[
+            "66 feet of warm white LED lights",
+            "Energy efficient and long lasting",
+            "Perfect for indoor and outdoor use"
+        ],
+        materials=["Copper wire", "LED bulbs", "Plastic"],
+        images=[],
+        raw={"text": "Mock product data for testing carbon footprint analysis"}
+    )
+
+
+def _request_deadline(req: AnalyzeRequest) -> Deadline:
+    budget = settings.ANALYZE_DEADLINE
+    if req.deadline_s:
+        budget = min(budget, req.deadline_s)
+    return Deadline(budget)
+
+
+def _dataset_product(url: str) -> Optional[ProductInfo]:
+    """Dataset lookup, skipped when the coverage filter says the ASIN is unknown."""
+    import asin_coverage
+
+    asin = asin_coverage.asin_from_url(url)
+    if asin and asin_coverage.coverage is not None and asin not in asin_coverage.coverage:
+        return None
+    return get_product_from_url(url)
+
+
+async def _lookup_product(req: AnalyzeRequest, deadline: Deadline) -> tuple[ProductInfo, str]:
+    """The product and where it came from: "dataset", "scrape", or the placeholders "url" / "mock"."""
     # Try dataset lookup first, fallback to scraping if not found
-    info = get_product_from_url(req.url)
-    
-    if not info:
-        # Fallback to web scraping if product not in dataset
-        try:
-            info = await scrape_amazon_product(req.url, html=req.html)
-        except Exception as e:
-            # If scraping fails, use mock data for testing
-            print(f"Scraping failed: {e}")
-            print("Using mock product data for testing...")
-            from models import ProductInfo
-            from pydantic import AnyUrl
-            
-            info = ProductInfo(
-                url=AnyUrl(str(req.url)),
-                title="LED String Lights 66ft 200 LED",
-                brand="Brightech",
-                asin="B0CYLKRRQX",
-                price=24.99,
-                currency="USD",
-                weight_kg=0.5,
-                shipping_weight_kg=0.7,
-                dimensions_cm=(30.0, 20.0, 5.0),
-                category="Home & Garden",
-                bullets=[
-                    "66 feet of warm white LED lights",
-                    "Energy efficient and long lasting",
-                    "Perfect for indoor and outdoor use"
-                ],
-                materials=["Copper wire", "LED bulbs", "Plastic"],
-                images=[],
-                raw={"text": "Mock product data for testing carbon footprint analysis"}
-            )
+    info = _dataset_product(str(req.url))
+    if info:
+        return info, "dataset"
+    try:
+        return await scrape_amazon_product(req.url, html=req.html, deadline=deadline, hedge=req.hedge), "scrape"
+    except DeadlineExceeded as e:
+        # Out of time: fall back to what the URL itself tells us
+        print(f"Scraping stopped: {e}")
+        return _extract_product_info_from_url(str(req.url)), "url"
+    except Exception as e:
+        # If scraping fails, use mock data for testing
+        print(f"Scraping failed: {e}")
+        print("Using mock product data for testing...")
+        return _mock_product(req.url), "mock"
 
-    # Choose strict sourced-only path if API keys present or STRICT_SOURCED_ONLY is true
-    strict = settings.STRICT_SOURCED_ONLY or bool(settings.CLIMATIQ_API_KEY)
 
-    # In strict mode, attempt explicit-only enrichment via Claude using raw text (no inference)
-    if strict and info.raw and info.raw.get("text"):
-        extracted = await extract_facts_claude(info.raw.get("text") or "")
-        # Only overwrite fields if we don't already have them from scraper
-        if not info.weight_kg and extracted.get("item_weight_kg"):
-            info.weight_kg = extracted.get("item_weight_kg")
-        if not info.shipping_weight_kg and extracted.get("shipping_weight_kg"):
-            info.shipping_weight_kg = extracted.get("shipping_weight_kg")
-        # Attach extracted materials/origin to raw for later sourcing steps
-        extra_raw = info.raw or {}
-        extra_raw["extracted_materials"] = extracted.get("materials") or []
-        extra_raw["extracted_materials_composition"] = extracted.get("materials_composition") or []
-        extra_raw["extracted_packaging_materials"] = extracted.get("packaging_materials") or []
-        if extracted.get("packaging_weight_kg") and not info.shipping_weight_kg and info.weight_kg:
-            # If packaging mass is explicitly given and item/shipping not, we can use this later
-            extra_raw["extracted_packaging_weight_kg"] = extracted.get("packaging_weight_kg")
-        extra_raw["extracted_origin"] = extracted.get("country_of_origin")
-        info.raw = extra_raw
+async def _enrich_facts(info: ProductInfo, deadline: Deadline) -> None:
+    """Strict mode: fill facts from the detail table, then regexes, then Claude for whatever is still missing."""
+    extracted = await extract_facts(info, deadline=deadline)
+    # Only overwrite fields if we don't already have them from scraper
+    if not info.weight_kg and extracted.get("item_weight_kg"):
+        info.weight_kg = extracted.get("item_weight_kg")
+    if not info.shipping_weight_kg and extracted.get("shipping_weight_kg"):
+        info.shipping_weight_kg = extracted.get("shipping_weight_kg")
+    # Attach extracted materials/origin to raw for later sourcing steps
+    extra_raw = info.raw or {}
+    extra_raw["extracted_materials"] = extracted.get("materials") or []
+    extra_raw["extracted_materials_composition"] = extracted.get("materials_composition") or []
+    extra_raw["extracted_packaging_materials"] = extracted.get("packaging_materials") or []
+    if extracted.get("packaging_weight_kg") and not info.shipping_weight_kg and info.weight_kg:
+        # If packaging mass is explicitly given and item/shipping not, we can use this later
+        extra_raw["extracted_packaging_weight_kg"] = extracted.get("packaging_weight_kg")
+    extra_raw["extracted_origin"] = extracted.get("country_of_origin")
+    # Which tier (table / regex / llm) produced each fact
+    extra_raw["extraction_provenance"] = extracted.get("provenance") or {}
+    info.raw = extra_raw
 
-    # Compute carbon breakdown
-    if strict:
-        carbon = await estimate_carbon_strict(
-            info,
-            destination=req.destination,
-            origin=req.origin,
-            shipping_mode=req.shipping_mode,
-        )
-    else:
-        carbon = estimate_carbon(info, req.destination, req.shipping_mode)
 
+def _summarize(info: ProductInfo, carbon: CarbonBreakdown, req: AnalyzeRequest, strict: bool) -> tuple[float, float, list[str]]:
+    """Total, confidence and assumptions for a computed breakdown."""
     assumptions = []
     if info.weight_kg is None and not strict:
         assumptions.append("Estimated item weight based on category heuristics.")
@@ -151,7 +278,72 @@ async def analyze(req: AnalyzeRequest):
     else:
         confidence = 0.6 - (0.1 if info.weight_kg is None else 0.0)
     confidence = max(0.3, min(0.9, confidence))
+    return total, confidence, assumptions
+
+
+def _fill_missing_with_heuristics(carbon: CarbonBreakdown, info: ProductInfo, req: AnalyzeRequest) -> list[str]:
+    """Fill components the strict path did not finish with heuristic values; returns the filled names."""
+    heuristic = estimate_carbon(info, req.destination, req.shipping_mode)
+    filled = []
+    for component in ["manufacturing", "packaging", "shipping", "end_of_life"]:
+        field = f"{component}_kgco2e"
+        if getattr(carbon, field) is None and getattr(heuristic, field) is not None:
+            setattr(carbon, field, getattr(heuristic, field))
+            carbon.sources.setdefault(component, []).append("heuristic_fallback")
+            filled.append(component.replace("_", " "))
+    return filled
+
 
+RANKABLE_SOURCES = {"dataset", "scrape"}
+
+
+def _rescore_alternative(info: ProductInfo, source: str) -> None:
+    """Keep the alternatives ranking and the coverage filter in step with what analysis just learned."""
+    import alternatives_index
+    import asin_coverage
+
+    # Placeholder products (URL-derived or mock) carry no real data and must not enter the rankings
+    if not (info.asin and info.title and source in RANKABLE_SOURCES):
+        return
+    index = alternatives_index.alternatives_index
+    if index is not None:
+        index.upsert(info)
+    if asin_coverage.coverage is not None:
+        asin_coverage.coverage.add(info.asin)
+
+
+async def _run_analysis(req: AnalyzeRequest, deadline: Deadline) -> AnalyzeResponse:
+    info, source = await _lookup_product(req, deadline)
+
+    # Choose strict sourced-only path if API keys present or STRICT_SOURCED_ONLY is true
+    strict = settings.STRICT_SOURCED_ONLY or bool(settings.CLIMATIQ_API_KEY)
+    if strict and not deadline.expired:
+        await _enrich_facts(info, deadline)
+
+    # Compute carbon breakdown
+    if strict:
+        carbon = await estimate_carbon_strict(
+            info,
+            destination=req.destination,
+            origin=req.origin,
+            shipping_mode=req.shipping_mode,
+            deadline=deadline,
+        )
+    else:
+        carbon = estimate_carbon(info, req.destination, req.shipping_mode)
+
+    _rescore_alternative(info, source)
+
+    total, confidence, assumptions = _summarize(info, carbon, req, strict)
+    if strict and deadline.expired:
+        # Out of time: keep whatever was sourced, fill the rest heuristically
+        filled = _fill_missing_with_heuristics(carbon, info, req)
+        if filled:
+            total, confidence, _ = _summarize(info, carbon, req, strict)
+            confidence = min(confidence, 0.5)
+            assumptions.append(
+                f"Time budget of {deadline.budget_s:.0f}s reached; {', '.join(filled)} estimated with heuristics."
+            )
     return AnalyzeResponse(
         product=info,
         carbon=carbon,
@@ -166,149 +358,129 @@ async def analyze(req: AnalyzeRequest):
     )
 
 
+def _heuristic_analysis(req: AnalyzeRequest) -> AnalyzeResponse:
+    """Cheap path for shed requests: dataset or URL-derived product + heuristic factors, no network calls."""
+    info = _dataset_product(str(req.url)) or _extract_product_info_from_url(str(req.url))
+    carbon = estimate_carbon(info, req.destination, req.shipping_mode)
+    total, confidence, assumptions = _summarize(info, carbon, req, strict=False)
+    assumptions.append("Service at capacity: served a heuristic estimate without scraping or sourced factors.")
+    return AnalyzeResponse(
+        product=info,
+        carbon=carbon,
+        total_kgco2e=total,
+        confidence=min(confidence, 0.4),
+        assumptions=assumptions,
+        notes="Degraded response (load shedding). Estimates are rough and intended for relative comparisons only.",
+    )
+
+
+async def _admitted_analysis(req: AnalyzeRequest) -> tuple[AnalyzeResponse, bool]:
+    """Run the full analysis under admission control; returns (response, degraded)."""
+    # The deadline starts before queueing, so time spent waiting for a slot counts against it
+    deadline = _request_deadline(req)
+    try:
+        async with analyze_admission.admit():
+            return await _run_analysis(req, deadline), False
+    except Overloaded:
+        if not settings.ADMISSION_SHED_TO_HEURISTIC:
+            raise
+        return _heuristic_analysis(req), True
+
+
+@app.post("/api/analyze", response_model=AnalyzeResponse)
+async def analyze(req: AnalyzeRequest):
+    response, degraded = await _admitted_analysis(req)
+    # Slim by default: product.raw (page text / dataset row) only ships when asked for
+    return FastJSONResponse(
+        project(response, fields=req.fields, include=req.include),
+        headers={"X-Degraded": "shed"} if degraded else None,
+    )
+
+
 @app.post("/api/analyze-product")
 async def analyze_product_endpoint(req: AnalyzeRequest):
     """Analyze product endpoint that matches frontend expectations"""
     try:
-        # Try dataset lookup first, fallback to scraping if not found
-        info = get_product_from_url(req.url)
-        
-        if not info:
-            # Fallback to web scraping if product not in dataset
-            try:
-                info = await scrape_amazon_product(req.url, html=req.html)
-            except Exception as e:
-                # If scraping fails, use mock data for testing
-                print(f"Scraping failed: {e}")
-                print("Using mock product data for testing...")
-                from models import ProductInfo
-                from pydantic import AnyUrl
-                
-                info = ProductInfo(
-                    url=AnyUrl(str(req.url)),
-                    title="LED String Lights 66ft 200 LED",
-                    brand="Brightech",
-                    asin="B0CYLKRRQX",
-                    price=24.99,
-                    currency="USD",
-                    weight_kg=0.5,
-                    shipping_weight_kg=0.7,
-                    dimensions_cm=(30.0, 20.0, 5.0),
-                    category="Home & Garden",
-                    bullets=[
-                        "66 feet of warm white LED lights",
-                        "Energy efficient and long lasting",
-                        "Perfect for indoor and outdoor use"
-                    ],
-                    materials=["Copper wire", "LED bulbs", "Plastic"],
-                    images=[],
-                    raw={"text": "Mock product data for testing carbon footprint analysis"}
-                )
-
-        # Choose strict sourced-only path if API keys present or STRICT_SOURCED_ONLY is true
-        strict = settings.STRICT_SOURCED_ONLY or bool(settings.CLIMATIQ_API_KEY)
-
-        # In strict mode, attempt explicit-only enrichment via Claude using raw text (no inference)
-        if strict and info.raw and info.raw.get("text"):
-            extracted = await extract_facts_claude(info.raw.get("text") or "")
-            # Only overwrite fields if we don't already have them from scraper
-            if not info.weight_kg and extracted.get("item_weight_kg"):
-                info.weight_kg = extracted.get("item_weight_kg")
-            if not info.shipping_weight_kg and extracted.get("shipping_weight_kg"):
-                info.shipping_weight_kg = extracted.get("shipping_weight_kg")
-            # Attach extracted materials/origin to raw for later sourcing steps
-            extra_raw = info.raw or {}
-            extra_raw["extracted_materials"] = extracted.get("materials") or []
-            extra_raw["extracted_materials_composition"] = extracted.get("materials_composition") or []
-            extra_raw["extracted_packaging_materials"] = extracted.get("packaging_materials") or []
-            if extracted.get("packaging_weight_kg") and not info.shipping_weight_kg and info.weight_kg:
-                # If packaging mass is explicitly given and item/shipping not, we can use this later
-                extra_raw["extracted_packaging_weight_kg"] = extracted.get("packaging_weight_kg")
-            extra_raw["extracted_origin"] = extracted.get("country_of_origin")
-            info.raw = extra_raw
-
-        # Compute carbon breakdown
-        if strict:
-            carbon = await estimate_carbon_strict(
-                info,
-                destination=req.destination,
-                origin=req.origin,
-                shipping_mode=req.shipping_mode,
-            )
-        else:
-            carbon = estimate_carbon(info, req.destination, req.shipping_mode)
-
-        assumptions = []
-        if info.weight_kg is None and not strict:
-            assumptions.append("Estimated item weight based on category heuristics.")
-        if req.shipping_mode == "auto" and not strict:
-            assumptions.append("Assumed ground shipping by default for 'auto'.")
-        if req.destination is None and not strict:
-            assumptions.append("Assumed regional delivery distance due to missing destination.")
-
-        total = round(carbon.total, 3)
-        # Confidence: in strict mode, base on number of sourced components present
-        if strict:
-            present = sum(
-                1
-                for c in [
-                    carbon.manufacturing_kgco2e,
-                    carbon.packaging_kgco2e,
-                    carbon.shipping_kgco2e,
-                    carbon.end_of_life_kgco2e,
-                ]
-                if isinstance(c, (int, float))
-            )
-            confidence = min(0.2 + 0.15 * present, 0.95)
-        else:
-            confidence = 0.6 - (0.1 if info.weight_kg is None else 0.0)
-        confidence = max(0.3, min(0.9, confidence))
-        
+        response, degraded = await _admitted_analysis(req)
+        info, carbon = response.product, response.carbon
+
         # Transform the response to match frontend expectations
-        return {
-            "success": True,
-            "total_kgco2e": total,
-            "product_title": info.title,
-            "product_price": info.price,
-            "confidence": confidence,
-            "breakdown": {
-                "manufacturing": carbon.manufacturing_kgco2e or 0,
-                "packaging": carbon.packaging_kgco2e or 0,
-                "shipping": carbon.shipping_kgco2e or 0,
-                "use_phase": carbon.use_phase_kgco2e or 0,
-                "end_of_life": carbon.end_of_life_kgco2e or 0
+        return FastJSONResponse(
+            {
+                "success": True,
+                "total_kgco2e": response.total_kgco2e,
+                "product_title": info.title,
+                "product_price": info.price,
+                "confidence": response.confidence,
+                "breakdown": {
+                    "manufacturing": carbon.manufacturing_kgco2e or 0,
+                    "packaging": carbon.packaging_kgco2e or 0,
+                    "shipping": carbon.shipping_kgco2e or 0,
+                    "use_phase": carbon.use_phase_kgco2e or 0,
+                    "end_of_life": carbon.end_of_life_kgco2e or 0
+                },
+                "assumptions": response.assumptions
             },
-            "assumptions": assumptions
-        }
-    except HTTPException as e:
+            headers={"X-Degraded": "shed"} if degraded else None,
+        )
+    except (HTTPException, Overloaded) as e:
         raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to analyze product: {str(e)}")
 
 
+@app.get("/api/alternatives/{asin}")
+async def get_alternatives(asin: str, limit: int = 5):
+    """Lower-carbon alternatives from the precomputed per-category rankings; no scraping."""
+    import alternatives_index
+
+    index = alternatives_index.alternatives_index
+    if index is None:
+        raise HTTPException(status_code=503, detail="Alternatives index not loaded")
+    result = index.alternatives(asin.upper(), limit=max(1, min(limit, 50)))
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"No ranking for ASIN {asin}")
+    return result
+
+
+@app.post("/api/coverage")
+async def get_coverage(req: CoverageRequest):
+    """Which ASINs we hold data for, from the Bloom filter: "false" is certain, "true" is probable."""
+    import asin_coverage
+
+    cov = asin_coverage.coverage
+    if cov is None:
+        raise HTTPException(status_code=503, detail="Coverage filter not loaded")
+    covered = {asin: asin.strip().upper() in cov for asin in req.asins}
+    return {"covered": covered, "stats": cov.stats()}
+
+
 @app.post("/api/similar")
 async def get_similar_products(req: AnalyzeRequest):
     """Get 5 similar products for a given Amazon product URL"""
-    try:
-        # First scrape the original product
-        info = await scrape_amazon_product(req.url, html=req.html)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to fetch/scrape product: {e}")
-    
-    try:
-        # Extract 5 similar products
-        similar_products = await extract_top_k_similar(info, k=5)
-        
-        return {
-            "original_product": {
-                "title": info.title,
-                "asin": info.asin,
-                "price": info.price,
-                "currency": info.currency,
-                "url": str(info.url)
-            },
-            "similar_products": similar_products,
-            "count": len(similar_products)
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to extract similar products: {e}")
+    # Started before queueing, so time spent waiting for admission counts against the budget
+    deadline = _request_deadline(req)
+    async with similar_admission.admit():
+        try:
+            # First scrape the original product
+            info = await scrape_amazon_product(req.url, html=req.html, deadline=deadline, hedge=req.hedge)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Failed to fetch/scrape product: {e}")
+
+        try:
+            # Extract 5 similar products
+            similar_products = await extract_top_k_similar(info, k=5, deadline=deadline)
+
+            return {
+                "original_product": {
+                    "title": info.title,
+                    "asin": info.asin,
+                    "price": info.price,
+                    "currency": info.currency,
+                    "url": str(info.url)
+                },
+                "similar_products": similar_products,
+                "count": len(similar_products)
+            }
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to extract similar products: {e}")
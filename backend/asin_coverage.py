@@ -0,0 +1,172 @@
+"""
+Bloom filter over every ASIN we hold data for.
+
+Answers "do we know this product at all?" without touching the dataset, the
+alternatives index or the extension cache shards. A "no" is certain; a "yes"
+is wrong with probability about `error_rate`, so positives still go through
+the full lookup. The app builds one at startup from the dataset, the
+alternatives index (which every analysis updates) and the extension cache,
+and adds each newly analysed product. `cache_shards.export_shards` writes one
+next to the shards, so a reader can skip fetching a shard for a miss.
+
+Hashing is two 32-bit FNV-1a passes (different offset bases) combined by
+double hashing, which is cheap to mirror in JavaScript. Serialized layout
+(little-endian): b"CFB1", uint32 bits, uint32 hashes, uint32 count, then the
+bit array.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+import struct
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+_HEADER = struct.Struct("<4sIII")
+_MAGIC = b"CFB1"
+_FNV_PRIME = 0x01000193
+_FNV_BASIS = 0x811C9DC5
+_FNV_BASIS_2 = 0x050C5D1F
+
+_ASIN_IN_URL = re.compile(r"/(?:dp|gp/product)/([A-Z0-9]{10})")
+
+
+def asin_from_url(url: str) -> Optional[str]:
+    match = _ASIN_IN_URL.search(url)
+    return match.group(1) if match else None
+
+
+def _fnv1a(data: bytes, basis: int) -> int:
+    h = basis
+    for byte in data:
+        h = ((h ^ byte) * _FNV_PRIME) & 0xFFFFFFFF
+    return h
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        capacity = max(1, capacity)
+        error_rate = min(max(error_rate, 1e-9), 0.5)
+        self.bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self.count = 0
+        self._array = bytearray((self.bits + 7) // 8)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _positions(self, key: str) -> Iterable[int]:
+        data = key.encode("utf-8")
+        h1 = _fnv1a(data, _FNV_BASIS)
+        h2 = _fnv1a(data, _FNV_BASIS_2) | 1
+        for i in range(self.hashes):
+            yield ((h1 + i * h2) & 0xFFFFFFFF) % self.bits
+
+    def add(self, key: str) -> None:
+        new = False
+        for pos in self._positions(key):
+            mask = 1 << (pos & 7)
+            if not self._array[pos >> 3] & mask:
+                self._array[pos >> 3] |= mask
+                new = True
+        if new:
+            self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._array[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def error_rate(self) -> float:
+        """Expected false positive rate at the current fill."""
+        return (1 - math.exp(-self.hashes * self.count / self.bits)) ** self.hashes
+
+    def to_bytes(self) -> bytes:
+        return _HEADER.pack(_MAGIC, self.bits, self.hashes, self.count) + bytes(self._array)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "BloomFilter":
+        magic, bits, hashes, count = _HEADER.unpack_from(data, 0)
+        if magic != _MAGIC:
+            raise ValueError("Not a coverage filter")
+        bloom = cls.__new__(cls)
+        bloom.bits, bloom.hashes, bloom.count = bits, hashes, count
+        bloom._array = bytearray(data[_HEADER.size:_HEADER.size + (bits + 7) // 8])
+        return bloom
+
+    def save(self, path: str | Path) -> None:
+        Path(path).write_bytes(self.to_bytes())
+
+    @classmethod
+    def load(cls, path: str | Path) -> "BloomFilter":
+        return cls.from_bytes(Path(path).read_bytes())
+
+
+def build_filter(asins: Iterable[str], error_rate: float = 0.001, headroom: float = 2.0) -> BloomFilter:
+    """A filter holding `asins`, sized for `headroom` times as many so later additions keep the error rate."""
+    unique = {a for a in asins if isinstance(a, str) and a}
+    bloom = BloomFilter(max(1000, int(len(unique) * headroom)), error_rate)
+    for asin in unique:
+        bloom.add(asin)
+    return bloom
+
+
+class Coverage:
+    """The app's filter plus lookup counters."""
+
+    def __init__(self, bloom: BloomFilter):
+        self.bloom = bloom
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, asin: str) -> bool:
+        found = asin in self.bloom
+        if found:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return found
+
+    def add(self, asin: str) -> None:
+        self.bloom.add(asin)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "asins": len(self.bloom),
+            "bits": self.bloom.bits,
+            "hashes": self.bloom.hashes,
+            "false_positive_rate": round(self.bloom.error_rate(), 6),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+# Built by the app on startup; None until then or when disabled
+coverage: Optional[Coverage] = None
+
+
+def start_coverage(error_rate: float, extension_cache_path: Optional[str] = None) -> Coverage:
+    """Build the filter from the dataset, the alternatives index and the extension cache. Blocking; run it in a thread."""
+    global coverage
+    import json
+
+    import alternatives_index
+    from dataset_loader import dataset_loader
+
+    asins = set()
+    if dataset_loader.df is not None and "sku" in dataset_loader.df:
+        asins.update(dataset_loader.df["sku"].dropna().astype(str))
+    if alternatives_index.alternatives_index is not None:
+        asins.update(alternatives_index.alternatives_index.entries)
+    if extension_cache_path:
+        try:
+            asins.update(json.loads(Path(extension_cache_path).read_text()))
+        except (OSError, ValueError) as e:
+            print(f"WARNING: Could not read extension cache {extension_cache_path} for coverage: {e}")
+    coverage = Coverage(build_filter(asins, error_rate))
+    print(f"Built coverage filter over {len(coverage.bloom)} ASINs ({len(coverage.bloom.to_bytes()) // 1024} KB)")
+    return coverage
+
+
+def stop_coverage() -> None:
+    global coverage
+    coverage = None
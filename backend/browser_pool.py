@@ -0,0 +1,179 @@
+"""
+Long-lived Playwright browser pool.
+
+One headless Chromium is launched at app startup and shared by all requests.
+It hosts up to `size` browser contexts, each with a single page that is reused
+for successive fetches and recycled (context closed and recreated) after
+`max_pages_per_context` navigations or after any error. Image, font and media
+requests are aborted so pages settle quickly. A health check relaunches the
+browser if it has crashed or disconnected.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Iterable, List, Optional, Set
+
+if TYPE_CHECKING:
+    from playwright.async_api import Browser, BrowserContext, Page, Playwright, Route
+
+
+class _Slot:
+    """A browser context and its reusable page."""
+
+    def __init__(self, context: "BrowserContext", page: "Page"):
+        self.context = context
+        self.page = page
+        self.uses = 0
+
+
+class BrowserPool:
+    def __init__(
+        self,
+        size: int = 2,
+        max_pages_per_context: int = 50,
+        user_agent: Optional[str] = None,
+        block_resources: Iterable[str] = ("image", "font", "media"),
+    ):
+        self.size = max(1, size)
+        self.max_pages_per_context = max(1, max_pages_per_context)
+        self.user_agent = user_agent
+        self.block_resources = frozenset(block_resources)
+        self._playwright: Optional["Playwright"] = None
+        self._browser: Optional["Browser"] = None
+        self._idle: List[_Slot] = []
+        self._sem = asyncio.Semaphore(self.size)
+        self._launch_lock = asyncio.Lock()
+        # Recycled contexts being closed in the background; held so the tasks can't be garbage-collected
+        self._closing: Set[asyncio.Task] = set()
+        self.launches = 0
+        self.contexts_created = 0
+        self.pages_served = 0
+        self.recycled = 0
+
+    @property
+    def running(self) -> bool:
+        return self._playwright is not None
+
+    async def start(self) -> None:
+        from playwright.async_api import async_playwright  # type: ignore
+
+        self._playwright = await async_playwright().start()
+        await self._launch()
+
+    async def stop(self) -> None:
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
+        for slot in self._idle:
+            await self._close_slot(slot)
+        self._idle.clear()
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    async def _launch(self) -> None:
+        self._browser = await self._playwright.chromium.launch(headless=True)
+        self.launches += 1
+
+    async def _ensure_healthy(self) -> None:
+        """Relaunch the browser if it crashed; idle contexts belonged to the old one and are dropped."""
+        if self._browser is not None and self._browser.is_connected():
+            return
+        async with self._launch_lock:
+            if self._browser is not None and self._browser.is_connected():
+                return
+            print("   Playwright browser disconnected, relaunching")
+            self._idle.clear()
+            await self._launch()
+
+    async def _block_heavy(self, route: "Route") -> None:
+        if route.request.resource_type in self.block_resources:
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _new_slot(self) -> _Slot:
+        context = await self._browser.new_context(
+            user_agent=self.user_agent,
+            viewport={"width": 1366, "height": 900},
+        )
+        if self.block_resources:
+            await context.route("**/*", self._block_heavy)
+        page = await context.new_page()
+        self.contexts_created += 1
+        return _Slot(context, page)
+
+    @staticmethod
+    async def _close_slot(slot: _Slot) -> None:
+        try:
+            await slot.context.close()
+        except Exception:
+            pass
+
+    @asynccontextmanager
+    async def page(self) -> AsyncIterator["Page"]:
+        """Borrow a page; waits while all `size` contexts are busy."""
+        if not self.running:
+            raise RuntimeError("Browser pool is not running")
+        async with self._sem:
+            await self._ensure_healthy()
+            slot = self._idle.pop() if self._idle else await self._new_slot()
+            ok = False
+            try:
+                yield slot.page
+                ok = True
+            finally:
+                slot.uses += 1
+                self.pages_served += 1
+                if ok and slot.uses < self.max_pages_per_context and not slot.page.is_closed():
+                    self._idle.append(slot)
+                else:
+                    # Worn out, or left in an unknown state by an error/cancellation
+                    self.recycled += 1
+                    task = asyncio.ensure_future(self._close_slot(slot))
+                    self._closing.add(task)
+                    task.add_done_callback(self._closing.discard)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "connected": bool(self._browser and self._browser.is_connected()),
+            "size": self.size,
+            "idle_contexts": len(self._idle),
+            "max_pages_per_context": self.max_pages_per_context,
+            "launches": self.launches,
+            "contexts_created": self.contexts_created,
+            "pages_served": self.pages_served,
+            "recycled": self.recycled,
+        }
+
+
+# Shared pool, started by the app on startup; None when Playwright is disabled or unavailable
+browser_pool: Optional[BrowserPool] = None
+
+
+async def start_browser_pool(size: int, max_pages_per_context: int, user_agent: Optional[str], block_resources: Iterable[str]) -> Optional[BrowserPool]:
+    global browser_pool
+    pool = BrowserPool(size, max_pages_per_context, user_agent, block_resources)
+    try:
+        await pool.start()
+    except Exception as e:
+        print(f"WARNING: Playwright browser pool unavailable ({e}); the playwright strategy will launch per request.")
+        await pool.stop()
+        return None
+    browser_pool = pool
+    return pool
+
+
+async def stop_browser_pool() -> None:
+    global browser_pool
+    if browser_pool is not None:
+        await browser_pool.stop()
+        browser_pool = None
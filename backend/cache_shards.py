@@ -0,0 +1,214 @@
+"""
+Compact sharded binary export of the extension cache.
+
+`carbon_footprint_cache.json` is one file the extension fetches and parses in
+full. This writes the same entries as small binary shards instead, one per
+ASIN prefix (the first `prefix_len` characters), plus a `manifest.json` listing
+the shards and `coverage.bin`, a Bloom filter of the exported ASINs
+(`asin_coverage.py`). A lookup checks the filter, loads only the shard for its
+prefix and binary-searches it, so its cost stays flat as the catalog grows
+and a miss usually costs no shard load at all.
+
+Shard layout (little-endian):
+
+    header   b"CFC1", uint32 record count, uint32 string table length
+    records  RECORD_SIZE bytes each, sorted by ASIN
+    strings  UTF-8 string table; identical strings are stored once
+
+A record is the 10-byte ASIN, carbon_footprint_kg (float64),
+carbon_footprint_g (uint32), price (float64, NaN when missing), and an
+(offset, length) pair into the string table for each of name, description,
+link, similar_asins (comma-joined), processed_date and destination_zip.
+Missing strings read back as "". Keys other than these are not exported.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import struct
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+FORMAT = "CFC1"
+FORMAT_VERSION = 1
+ASIN_WIDTH = 10
+STRING_FIELDS = ("name", "description", "link", "similar_asins", "processed_date", "destination_zip")
+_HEADER = struct.Struct("<4sII")
+_RECORD = struct.Struct("<10sdId" + "II" * len(STRING_FIELDS))
+RECORD_SIZE = _RECORD.size
+# carbon_footprint_g for entries without a footprint
+_MISSING_G = 0xFFFFFFFF
+
+
+def shard_key(asin: str, prefix_len: int) -> str:
+    return asin[:prefix_len]
+
+
+class _StringTable:
+    def __init__(self):
+        self.blob = bytearray()
+        self._offsets: Dict[bytes, int] = {}
+
+    def add(self, value: Optional[str]) -> tuple[int, int]:
+        data = (value or "").encode("utf-8")
+        offset = self._offsets.get(data)
+        if offset is None:
+            offset = self._offsets[data] = len(self.blob)
+            self.blob += data
+        return offset, len(data)
+
+
+def _pack_shard(entries: List[tuple[str, Dict[str, Any]]]) -> bytes:
+    strings = _StringTable()
+    records = bytearray()
+    for asin, entry in sorted(entries):
+        kg = entry.get("carbon_footprint_kg")
+        grams = entry.get("carbon_footprint_g")
+        price = entry.get("price")
+        spans: List[int] = []
+        for name in STRING_FIELDS:
+            value = entry.get(name)
+            if name == "similar_asins":
+                value = ",".join(value or [])
+            spans.extend(strings.add(None if value is None else str(value)))
+        records += _RECORD.pack(
+            asin.encode("ascii"),
+            math.nan if kg is None else float(kg),
+            _MISSING_G if grams is None else int(grams),
+            math.nan if price is None else float(price),
+            *spans,
+        )
+    return _HEADER.pack(FORMAT.encode("ascii"), len(entries), len(strings.blob)) + bytes(records) + bytes(strings.blob)
+
+
+def _write_bytes(path: Path, data: bytes) -> None:
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def export_shards(cache: Dict[str, Dict[str, Any]], out_dir: str | Path, prefix_len: int = 4) -> Dict[str, Any]:
+    """Write `cache` (ASIN -> extension entry) as binary shards plus a manifest; returns the manifest."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    groups: Dict[str, List[tuple[str, Dict[str, Any]]]] = {}
+    for asin, entry in cache.items():
+        if len(asin) != ASIN_WIDTH or not asin.isascii():
+            print(f"WARNING: Skipping cache entry with a non-ASIN key: {asin!r}")
+            continue
+        groups.setdefault(shard_key(asin, prefix_len), []).append((asin, entry))
+
+    shards: Dict[str, Dict[str, Any]] = {}
+    for key in sorted(groups):
+        data = _pack_shard(groups[key])
+        name = f"{key}.bin"
+        _write_bytes(out_dir / name, data)
+        shards[key] = {"file": name, "count": len(groups[key]), "bytes": len(data)}
+
+    manifest = {
+        "format": FORMAT,
+        "version": FORMAT_VERSION,
+        "prefix_len": prefix_len,
+        "record_size": RECORD_SIZE,
+        "string_fields": list(STRING_FIELDS),
+        "products": sum(s["count"] for s in shards.values()),
+        "shards": shards,
+    }
+    from asin_coverage import build_filter
+
+    bloom = build_filter((asin for group in groups.values() for asin, _ in group), headroom=1.0)
+    _write_bytes(out_dir / "coverage.bin", bloom.to_bytes())
+    manifest["coverage"] = {"file": "coverage.bin", "bits": bloom.bits, "hashes": bloom.hashes}
+    _write_bytes(out_dir / "manifest.json", json.dumps(manifest, indent=2).encode("utf-8"))
+    # Shards left over from an earlier export with other prefixes
+    for path in out_dir.glob("*.bin"):
+        if path.stem not in shards and path.name != "coverage.bin":
+            path.unlink()
+    return manifest
+
+
+class ShardReader:
+    """Looks ASINs up in an exported shard directory, keeping the `max_shards` most recently used shards loaded."""
+
+    def __init__(self, shard_dir: str | Path, max_shards: int = 16):
+        self.shard_dir = Path(shard_dir)
+        self.manifest = json.loads((self.shard_dir / "manifest.json").read_text())
+        if self.manifest.get("format") != FORMAT or self.manifest.get("record_size") != RECORD_SIZE:
+            raise ValueError(f"Unsupported shard format in {self.shard_dir}")
+        self.prefix_len: int = self.manifest["prefix_len"]
+        self.max_shards = max(1, max_shards)
+        self._loaded: "OrderedDict[str, bytes]" = OrderedDict()
+        self.coverage = None
+        if "coverage" in self.manifest:
+            from asin_coverage import BloomFilter
+
+            self.coverage = BloomFilter.load(self.shard_dir / self.manifest["coverage"]["file"])
+
+    def __len__(self) -> int:
+        return self.manifest["products"]
+
+    def __contains__(self, asin: str) -> bool:
+        return self.get(asin) is not None
+
+    def _shard(self, key: str) -> Optional[bytes]:
+        data = self._loaded.get(key)
+        if data is not None:
+            self._loaded.move_to_end(key)
+            return data
+        info = self.manifest["shards"].get(key)
+        if info is None:
+            return None
+        data = (self.shard_dir / info["file"]).read_bytes()
+        self._loaded[key] = data
+        if len(self._loaded) > self.max_shards:
+            self._loaded.popitem(last=False)
+        return data
+
+    def get(self, asin: str) -> Optional[Dict[str, Any]]:
+        """The cache entry for `asin`, in the JSON cache's format, or None."""
+        if len(asin) != ASIN_WIDTH or not asin.isascii():
+            return None
+        if self.coverage is not None and asin not in self.coverage:
+            return None
+        data = self._shard(shard_key(asin, self.prefix_len))
+        if data is None:
+            return None
+        _, count, _ = _HEADER.unpack_from(data, 0)
+        target = asin.encode("ascii")
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = _HEADER.size + mid * RECORD_SIZE
+            key = data[start:start + ASIN_WIDTH]
+            if key < target:
+                lo = mid + 1
+            elif key > target:
+                hi = mid
+            else:
+                return self._decode(data, count, start)
+        return None
+
+    @staticmethod
+    def _decode(data: bytes, count: int, start: int) -> Dict[str, Any]:
+        _, kg, grams, price, *spans = _RECORD.unpack_from(data, start)
+        strings_at = _HEADER.size + count * RECORD_SIZE
+        values = {}
+        for i, name in enumerate(STRING_FIELDS):
+            offset, length = spans[2 * i], spans[2 * i + 1]
+            values[name] = data[strings_at + offset:strings_at + offset + length].decode("utf-8")
+        similar = values.pop("similar_asins")
+        return {
+            "name": values["name"],
+            "description": values["description"],
+            "price": None if math.isnan(price) else price,
+            "link": values["link"],
+            "carbon_footprint_kg": None if math.isnan(kg) else kg,
+            "carbon_footprint_g": None if grams == _MISSING_G else grams,
+            "similar_asins": similar.split(",") if similar else [],
+            "processed_date": values["processed_date"],
+            "destination_zip": values["destination_zip"],
+        }
@@ -1,13 +1,17 @@
 from __future__ import annotations
 
+import asyncio
 import os
 import json
-from typing import List, Optional, Tuple, Dict
-import aiohttp
+from typing import TYPE_CHECKING, List, Optional, Tuple, Dict
 
+from deadline import Deadline
 from models import ProductInfo, CarbonBreakdown
 from settings import settings
 
+if TYPE_CHECKING:
+    import aiohttp
+
 
 # Simple emission factors and heuristics (kg CO2e)
 EF_KG_PER_KG_MANUFACTURING = 6.0  # average for consumer goods (very rough)
@@ -106,12 +110,12 @@ def _estimate_weight(product: ProductInfo) -> float:
             return 0.8
     
     # If we have a price, use it as a rough weight indicator
-    if product.price_usd and product.price_usd > 0:
-        if product.price_usd < 20:
+    if product.price and product.price > 0:
+        if product.price < 20:
             return 0.3  # Small, cheap items
-        elif product.price_usd < 100:
+        elif product.price < 100:
             return 0.7  # Medium items
-        elif product.price_usd < 500:
+        elif product.price < 500:
             return 2.0  # Larger items
         else:
             return 5.0  # Expensive, likely heavy items
@@ -185,7 +189,7 @@ async def _geocode(session: aiohttp.ClientSession, query: str) -> Optional[Tuple
     from urllib.parse import quote_plus
     # Ensure query is a string before encoding
     query_str = str(query) if query is not None else ""
-    url = f"https://api.opencagedata.com/geocode/v1/json?q={quote_plus(query_str)}&key={key}"
+    url = f"{settings.OPENCAGE_API_URL}/geocode/v1/json?q={quote_plus(query_str)}&key={key}"
     try:
         async with session.get(url) as resp:
             if resp.status != 200:
@@ -219,7 +223,7 @@ async def _climatiq_transport(session: aiohttp.ClientSession, kg: float, km: flo
         }
         for q in q_candidates.get(m, ["road freight"]):
             async with session.get(
-                "https://api.climatiq.io/data/v1/search",
+                f"{settings.CLIMATIQ_API_URL}/data/v1/search",
                 headers={"Authorization": f"Bearer {api_key}"},
                 params={"query": q, "results_per_page": 20, "data_version": "25.25"},
             ) as r:
@@ -252,7 +256,7 @@ async def _climatiq_transport(session: aiohttp.ClientSession, kg: float, km: flo
                             "distance_unit": "km",
                         },
                     }
-                    async with session.post("https://api.climatiq.io/data/v1/estimate", headers=headers, data=json.dumps(payload2)) as r2:
+                    async with session.post(f"{settings.CLIMATIQ_API_URL}/data/v1/estimate", headers=headers, data=json.dumps(payload2)) as r2:
                         if r2.status != 200:
                             continue
                         est = await r2.json()
@@ -273,7 +277,7 @@ async def _climatiq_transport(session: aiohttp.ClientSession, kg: float, km: flo
             ],
         }
         async with session.post(
-            "https://api.climatiq.io/intermodal/v1/estimate",
+            f"{settings.CLIMATIQ_API_URL}/intermodal/v1/estimate",
             headers=headers,
             data=json.dumps(payload3),
         ) as r3:
@@ -289,246 +293,274 @@ async def _climatiq_transport(session: aiohttp.ClientSession, kg: float, km: flo
     return None
 
 
-async def estimate_carbon_strict(product: ProductInfo, destination: Optional[str], origin: Optional[str], shipping_mode: Optional[str]) -> CarbonBreakdown:
-    """Estimate using only sourced data: mass from page, distance from geocoding, factors from Climatiq.
-    Missing inputs => component omitted (None)."""
-    carbon = CarbonBreakdown()
-    carbon.sources = {}
-
-    try:
-        reasons: list[str] = []
-        async with aiohttp.ClientSession() as session:
-            # Shipping: requires item or shipping weight, origin, destination, mode
-            latlon_o = None
-            latlon_d = None
-            km = None
-
-            # Determine usable weight for shipping (prefer shipping weight; else item weight)
-            ship_kg = product.shipping_weight_kg or product.weight_kg
-            if not ship_kg:
-                reasons.append("missing_weight")
-
-            if origin and destination:
-                lo = await _geocode(session, origin)
-                ld = await _geocode(session, destination)
-                if lo and ld:
-                    latlon_o, latlon_d = lo, ld
-                    # Haversine distance (approx)
-                    from math import radians, sin, cos, sqrt, atan2
-                    R = 6371.0
-                    dlat = radians(ld[0] - lo[0])
-                    dlon = radians(ld[1] - lo[1])
-                    a = sin(dlat/2)**2 + cos(radians(lo[0]))*cos(radians(ld[0]))*sin(dlon/2)**2
-                    km = 2 * R * atan2(sqrt(a), sqrt(1-a))
-
-            else:
-                reasons.append("missing_origin_or_destination")
-
-            if ship_kg and km is not None:
-                tr = await _climatiq_transport(session, ship_kg, km, shipping_mode or "ground")
-                if tr:
-                    val, ef = tr
-                    carbon.shipping_kgco2e = round(val, 3)
-                    carbon.sources.setdefault("shipping", []).append(ef)
-                else:
-                    reasons.append("climatiq_no_result")
-            # Packaging mass from explicit field or from (shipping - item)
-            packaging_kg: Optional[float] = None
-            if product.raw and isinstance(product.raw, dict) and product.raw.get("extracted_packaging_weight_kg"):
-                try:
-                    packaging_kg = float(product.raw.get("extracted_packaging_weight_kg"))
-                except Exception:
-                    packaging_kg = None
-            if packaging_kg is None and product.shipping_weight_kg and product.weight_kg and product.shipping_weight_kg >= product.weight_kg:
-                packaging_kg = product.shipping_weight_kg - product.weight_kg
-
-            if packaging_kg and packaging_kg > 0:
-                # Try cardboard/paper factors for packaging mass via Climatiq
-                try:
-                    async with session.get(
-                        "https://api.climatiq.io/data/v1/search",
-                        headers={"Authorization": f"Bearer {settings.CLIMATIQ_API_KEY}"},
-                        params={"query": "cardboard", "results_per_page": 10, "data_version": "25.25"},
-                    ) as sr:
-                        if sr.status == 200:
-                            js = await sr.json()
-                            results = js.get("results") or []
-                            # Prefer factors with unit 'kg'
-                            ef = next((r for r in results if r.get("unit") == "kg"), None) or (results[0] if results else None)
-                            if ef and ef.get("id"):
-                                ef_id = ef["id"]
-                                payload = {
-                                    "emission_factor": {"id": ef_id},
-                                    "parameters": {"weight": packaging_kg, "weight_unit": "kg"},
-                                }
-                                async with session.post(
-                                    "https://api.climatiq.io/data/v1/estimate",
-                                    headers={"Authorization": f"Bearer {settings.CLIMATIQ_API_KEY}", "Content-Type": "application/json"},
-                                    data=json.dumps(payload),
-                                ) as er:
-                                    if er.status == 200:
-                                        est = await er.json()
-                                        co2e = est.get("co2e")
-                                        if isinstance(co2e, (int, float)):
-                                            carbon.packaging_kgco2e = round(float(co2e), 3)
-                                            carbon.sources.setdefault("packaging", []).append(str(ef_id))
-                        else:
-                            reasons.append("packaging_factor_not_found")
-                except Exception:
-                    reasons.append("packaging_calc_error")
-
-            # Manufacturing: If explicit materials are present, sum factors by material mass share
-            # We only use explicitly extracted materials (from scraper or Claude-extracted raw)
-            materials: List[str] = []
-            if product.materials:
-                materials.extend(product.materials)
-            if product.raw and isinstance(product.raw, dict):
-                mats2 = product.raw.get("extracted_materials") or []
-                if isinstance(mats2, list):
-                    materials.extend([m for m in mats2 if isinstance(m, str)])
-            materials = [m.strip().lower() for m in materials if isinstance(m, str)]
-            # De-duplicate conservatively
-            materials = list(dict.fromkeys(materials))[:5]
-
-            # If explicit composition is present, use it; else skip manufacturing unless you allow an even split assumption
-            composition = []
-            if product.raw and isinstance(product.raw, dict):
-                comp = product.raw.get("extracted_materials_composition") or []
-                if isinstance(comp, list):
-                    for entry in comp:
-                        if isinstance(entry, dict) and "material" in entry and "fraction" in entry:
-                            try:
-                                composition.append((str(entry["material"]).strip().lower(), float(entry["fraction"])) )
-                            except Exception:
-                                continue
-
-            if composition and product.weight_kg:
-                manuf_total = 0.0
-                manuf_sources: List[str] = []
-                for mat, frac in composition:
-                    mat_kg = product.weight_kg * max(0.0, min(1.0, frac))
-                    q = mat
-                    try:
-                        async with session.get(
-                            "https://api.climatiq.io/data/v1/search",
-                            headers={"Authorization": f"Bearer {settings.CLIMATIQ_API_KEY}"},
-                            params={"query": q, "results_per_page": 10, "data_version": "25.25"},
-                        ) as sr:
-                            if sr.status != 200:
-                                continue
-                            js = await sr.json()
-                            results = js.get("results") or []
-                            ef = next((r for r in results if r.get("unit") == "kg"), None) or (results[0] if results else None)
-                            if not ef or not ef.get("id"):
-                                continue
-                            ef_id = ef["id"]
-                            payload = {
-                                "emission_factor": {"id": ef_id},
-                                "parameters": {"weight": mat_kg, "weight_unit": "kg"},
-                            }
-                            async with session.post(
-                                "https://api.climatiq.io/data/v1/estimate",
-                                headers={"Authorization": f"Bearer {settings.CLIMATIQ_API_KEY}", "Content-Type": "application/json"},
-                                data=json.dumps(payload),
-                            ) as er:
-                                if er.status != 200:
-                                    continue
+async def _strict_components(
+    session: aiohttp.ClientSession,
+    product: ProductInfo,
+    destination: Optional[str],
+    origin: Optional[str],
+    shipping_mode: Optional[str],
+    carbon: CarbonBreakdown,
+    reasons: list[str],
+) -> None:
+    """Fill `carbon` component by component, so a cancelled run leaves the finished parts in place."""
+    # Shipping: requires item or shipping weight, origin, destination, mode
+    latlon_o = None
+    latlon_d = None
+    km = None
+
+    # Determine usable weight for shipping (prefer shipping weight; else item weight)
+    ship_kg = product.shipping_weight_kg or product.weight_kg
+    if not ship_kg:
+        reasons.append("missing_weight")
+
+    if origin and destination:
+        lo = await _geocode(session, origin)
+        ld = await _geocode(session, destination)
+        if lo and ld:
+            latlon_o, latlon_d = lo, ld
+            # Haversine distance (approx)
+            from math import radians, sin, cos, sqrt, atan2
+            R = 6371.0
+            dlat = radians(ld[0] - lo[0])
+            dlon = radians(ld[1] - lo[1])
+            a = sin(dlat/2)**2 + cos(radians(lo[0]))*cos(radians(ld[0]))*sin(dlon/2)**2
+            km = 2 * R * atan2(sqrt(a), sqrt(1-a))
+
+    else:
+        reasons.append("missing_origin_or_destination")
+
+    if ship_kg and km is not None:
+        tr = await _climatiq_transport(session, ship_kg, km, shipping_mode or "ground")
+        if tr:
+            val, ef = tr
+            carbon.shipping_kgco2e = round(val, 3)
+            carbon.sources.setdefault("shipping", []).append(ef)
+        else:
+            reasons.append("climatiq_no_result")
+    # Packaging mass from explicit field or from (shipping - item)
+    packaging_kg: Optional[float] = None
+    if product.raw and isinstance(product.raw, dict) and product.raw.get("extracted_packaging_weight_kg"):
+        try:
+            packaging_kg = float(product.raw.get("extracted_packaging_weight_kg"))
+        except Exception:
+            packaging_kg = None
+    if packaging_kg is None and product.shipping_weight_kg and product.weight_kg and product.shipping_weight_kg >= product.weight_kg:
+        packaging_kg = product.shipping_weight_kg - product.weight_kg
+
+    if packaging_kg and packaging_kg > 0:
+        # Try cardboard/paper factors for packaging mass via Climatiq
+        try:
+            async with session.get(
+                f"{settings.CLIMATIQ_API_URL}/data/v1/search",
+                headers={"Authorization": f"Bearer {settings.CLIMATIQ_API_KEY}"},
+                params={"query": "cardboard", "results_per_page": 10, "data_version": "25.25"},
+            ) as sr:
+                if sr.status == 200:
+                    js = await sr.json()
+                    results = js.get("results") or []
+                    # Prefer factors with unit 'kg'
+                    ef = next((r for r in results if r.get("unit") == "kg"), None) or (results[0] if results else None)
+                    if ef and ef.get("id"):
+                        ef_id = ef["id"]
+                        payload = {
+                            "emission_factor": {"id": ef_id},
+                            "parameters": {"weight": packaging_kg, "weight_unit": "kg"},
+                        }
+                        async with session.post(
+                            f"{settings.CLIMATIQ_API_URL}/data/v1/estimate",
+                            headers={"Authorization": f"Bearer {settings.CLIMATIQ_API_KEY}", "Content-Type": "application/json"},
+                            data=json.dumps(payload),
+                        ) as er:
+                            if er.status == 200:
                                 est = await er.json()
                                 co2e = est.get("co2e")
                                 if isinstance(co2e, (int, float)):
-                                    manuf_total += float(co2e)
-                                    manuf_sources.append(str(ef_id))
+                                    carbon.packaging_kgco2e = round(float(co2e), 3)
+                                    carbon.sources.setdefault("packaging", []).append(str(ef_id))
+                else:
+                    reasons.append("packaging_factor_not_found")
+        except Exception:
+            reasons.append("packaging_calc_error")
+
+    # Manufacturing: If explicit materials are present, sum factors by material mass share
+    # We only use explicitly extracted materials (from scraper or Claude-extracted raw)
+    materials: List[str] = []
+    if product.materials:
+        materials.extend(product.materials)
+    if product.raw and isinstance(product.raw, dict):
+        mats2 = product.raw.get("extracted_materials") or []
+        if isinstance(mats2, list):
+            materials.extend([m for m in mats2 if isinstance(m, str)])
+    materials = [m.strip().lower() for m in materials if isinstance(m, str)]
+    # De-duplicate conservatively
+    materials = list(dict.fromkeys(materials))[:5]
+
+    # If explicit composition is present, use it; else skip manufacturing unless you allow an even split assumption
+    composition = []
+    if product.raw and isinstance(product.raw, dict):
+        comp = product.raw.get("extracted_materials_composition") or []
+        if isinstance(comp, list):
+            for entry in comp:
+                if isinstance(entry, dict) and "material" in entry and "fraction" in entry:
+                    try:
+                        composition.append((str(entry["material"]).strip().lower(), float(entry["fraction"])) )
                     except Exception:
                         continue
-                if manuf_total > 0:
-                    carbon.manufacturing_kgco2e = round(manuf_total, 3)
-                    carbon.sources.setdefault("manufacturing", []).extend(manuf_sources)
-            else:
-                # No explicit composition: use equal split assumption for available materials
-                if materials and product.weight_kg:
-                    manuf_total = 0.0
-                    manuf_sources: List[str] = []
-                    # Assume equal distribution among materials
-                    frac_per_material = 1.0 / len(materials)
-                    for mat in materials:
-                        mat_kg = product.weight_kg * frac_per_material
-                        q = mat
-                        try:
-                            async with session.get(
-                                "https://api.climatiq.io/data/v1/search",
-                                headers={"Authorization": f"Bearer {settings.CLIMATIQ_API_KEY}"},
-                                params={"query": q, "results_per_page": 10, "data_version": "25.25"},
-                            ) as sr:
-                                if sr.status != 200:
-                                    continue
-                                js = await sr.json()
-                                results = js.get("results") or []
-                                # Choose a factor with unit 'kg'
-                                ef = next((r for r in results if r.get("unit") == "kg"), None) or (results[0] if results else None)
-                                if not ef or not ef.get("id"):
-                                    continue
-                                ef_id = ef["id"]
-                                payload = {
-                                    "emission_factor": {"id": ef_id}, 
-                                    "parameters": {"weight": mat_kg, "weight_unit": "kg"}
-                                }
-                                async with session.post(
-                                    "https://api.climatiq.io/data/v1/estimate",
-                                    headers={"Authorization": f"Bearer {settings.CLIMATIQ_API_KEY}", "Content-Type": "application/json"},
-                                    data=json.dumps(payload),
-                                ) as er:
-                                    if er.status != 200:
-                                        continue
-                                    est = await er.json()
-                                    co2e = est.get("co2e")
-                                    if isinstance(co2e, (int, float)):
-                                        manuf_total += float(co2e)
-                                        manuf_sources.append(str(ef_id))
-                        except Exception:
+
+    if composition and product.weight_kg:
+        manuf_total = 0.0
+        manuf_sources: List[str] = []
+        for mat, frac in composition:
+            mat_kg = product.weight_kg * max(0.0, min(1.0, frac))
+            q = mat
+            try:
+                async with session.get(
+                    f"{settings.CLIMATIQ_API_URL}/data/v1/search",
+                    headers={"Authorization": f"Bearer {settings.CLIMATIQ_API_KEY}"},
+                    params={"query": q, "results_per_page": 10, "data_version": "25.25"},
+                ) as sr:
+                    if sr.status != 200:
+                        continue
+                    js = await sr.json()
+                    results = js.get("results") or []
+                    ef = next((r for r in results if r.get("unit") == "kg"), None) or (results[0] if results else None)
+                    if not ef or not ef.get("id"):
+                        continue
+                    ef_id = ef["id"]
+                    payload = {
+                        "emission_factor": {"id": ef_id},
+                        "parameters": {"weight": mat_kg, "weight_unit": "kg"},
+                    }
+                    async with session.post(
+                        f"{settings.CLIMATIQ_API_URL}/data/v1/estimate",
+                        headers={"Authorization": f"Bearer {settings.CLIMATIQ_API_KEY}", "Content-Type": "application/json"},
+                        data=json.dumps(payload),
+                    ) as er:
+                        if er.status != 200:
                             continue
-                    if manuf_total > 0:
-                        carbon.manufacturing_kgco2e = round(manuf_total, 3)
-                        carbon.sources.setdefault("manufacturing", []).extend(manuf_sources)
-
-            # End-of-life: Simple calculation based on weight (waste processing)
-            if product.weight_kg:
-                carbon.end_of_life_kgco2e = round(0.05 * product.weight_kg, 3)
-                carbon.sources.setdefault("end_of_life", []).append("heuristic_waste_processing")
-
-            # Packaging: If no explicit packaging weight, estimate based on product weight
-            if not carbon.packaging_kgco2e and product.weight_kg:
-                # Estimate packaging as 10-20% of product weight for small electronics
-                est_packaging_kg = max(0.01, product.weight_kg * 0.15)  # Minimum 10g packaging
+                        est = await er.json()
+                        co2e = est.get("co2e")
+                        if isinstance(co2e, (int, float)):
+                            manuf_total += float(co2e)
+                            manuf_sources.append(str(ef_id))
+            except Exception:
+                continue
+        if manuf_total > 0:
+            carbon.manufacturing_kgco2e = round(manuf_total, 3)
+            carbon.sources.setdefault("manufacturing", []).extend(manuf_sources)
+    else:
+        # No explicit composition: use equal split assumption for available materials
+        if materials and product.weight_kg:
+            manuf_total = 0.0
+            manuf_sources: List[str] = []
+            # Assume equal distribution among materials
+            frac_per_material = 1.0 / len(materials)
+            for mat in materials:
+                mat_kg = product.weight_kg * frac_per_material
+                q = mat
                 try:
                     async with session.get(
-                        "https://api.climatiq.io/data/v1/search",
+                        f"{settings.CLIMATIQ_API_URL}/data/v1/search",
                         headers={"Authorization": f"Bearer {settings.CLIMATIQ_API_KEY}"},
-                        params={"query": "cardboard packaging", "results_per_page": 5, "data_version": "25.25"},
+                        params={"query": q, "results_per_page": 10, "data_version": "25.25"},
                     ) as sr:
-                        if sr.status == 200:
-                            js = await sr.json()
-                            results = js.get("results") or []
-                            ef = next((r for r in results if r.get("unit") == "kg"), None) or (results[0] if results else None)
-                            if ef and ef.get("id"):
-                                ef_id = ef["id"]
-                                payload = {
-                                    "emission_factor": {"id": ef_id},
-                                    "parameters": {"weight": est_packaging_kg, "weight_unit": "kg"},
-                                }
-                                async with session.post(
-                                    "https://api.climatiq.io/data/v1/estimate",
-                                    headers={"Authorization": f"Bearer {settings.CLIMATIQ_API_KEY}", "Content-Type": "application/json"},
-                                    data=json.dumps(payload),
-                                ) as er:
-                                    if er.status == 200:
-                                        est = await er.json()
-                                        co2e = est.get("co2e")
-                                        if isinstance(co2e, (int, float)):
-                                            carbon.packaging_kgco2e = round(float(co2e), 3)
-                                            carbon.sources.setdefault("packaging", []).append(str(ef_id))
+                        if sr.status != 200:
+                            continue
+                        js = await sr.json()
+                        results = js.get("results") or []
+                        # Choose a factor with unit 'kg'
+                        ef = next((r for r in results if r.get("unit") == "kg"), None) or (results[0] if results else None)
+                        if not ef or not ef.get("id"):
+                            continue
+                        ef_id = ef["id"]
+                        payload = {
+                            "emission_factor": {"id": ef_id}, 
+                            "parameters": {"weight": mat_kg, "weight_unit": "kg"}
+                        }
+                        async with session.post(
+                            f"{settings.CLIMATIQ_API_URL}/data/v1/estimate",
+                            headers={"Authorization": f"Bearer {settings.CLIMATIQ_API_KEY}", "Content-Type": "application/json"},
+                            data=json.dumps(payload),
+                        ) as er:
+                            if er.status != 200:
+                                continue
+                            est = await er.json()
+                            co2e = est.get("co2e")
+                            if isinstance(co2e, (int, float)):
+                                manuf_total += float(co2e)
+                                manuf_sources.append(str(ef_id))
                 except Exception:
-                    pass
+                    continue
+            if manuf_total > 0:
+                carbon.manufacturing_kgco2e = round(manuf_total, 3)
+                carbon.sources.setdefault("manufacturing", []).extend(manuf_sources)
+
+    # End-of-life: Simple calculation based on weight (waste processing)
+    if product.weight_kg:
+        carbon.end_of_life_kgco2e = round(0.05 * product.weight_kg, 3)
+        carbon.sources.setdefault("end_of_life", []).append("heuristic_waste_processing")
+
+    # Packaging: If no explicit packaging weight, estimate based on product weight
+    if not carbon.packaging_kgco2e and product.weight_kg:
+        # Estimate packaging as 10-20% of product weight for small electronics
+        est_packaging_kg = max(0.01, product.weight_kg * 0.15)  # Minimum 10g packaging
+        try:
+            async with session.get(
+                f"{settings.CLIMATIQ_API_URL}/data/v1/search",
+                headers={"Authorization": f"Bearer {settings.CLIMATIQ_API_KEY}"},
+                params={"query": "cardboard packaging", "results_per_page": 5, "data_version": "25.25"},
+            ) as sr:
+                if sr.status == 200:
+                    js = await sr.json()
+                    results = js.get("results") or []
+                    ef = next((r for r in results if r.get("unit") == "kg"), None) or (results[0] if results else None)
+                    if ef and ef.get("id"):
+                        ef_id = ef["id"]
+                        payload = {
+                            "emission_factor": {"id": ef_id},
+                            "parameters": {"weight": est_packaging_kg, "weight_unit": "kg"},
+                        }
+                        async with session.post(
+                            f"{settings.CLIMATIQ_API_URL}/data/v1/estimate",
+                            headers={"Authorization": f"Bearer {settings.CLIMATIQ_API_KEY}", "Content-Type": "application/json"},
+                            data=json.dumps(payload),
+                        ) as er:
+                            if er.status == 200:
+                                est = await er.json()
+                                co2e = est.get("co2e")
+                                if isinstance(co2e, (int, float)):
+                                    carbon.packaging_kgco2e = round(float(co2e), 3)
+                                    carbon.sources.setdefault("packaging", []).append(str(ef_id))
+        except Exception:
+            pass
+
+
+async def estimate_carbon_strict(
+    product: ProductInfo,
+    destination: Optional[str],
+    origin: Optional[str],
+    shipping_mode: Optional[str],
+    deadline: Optional[Deadline] = None,
+) -> CarbonBreakdown:
+    """Estimate using only sourced data: mass from page, distance from geocoding, factors from Climatiq.
+    Missing inputs => component omitted (None). With a deadline, components not finished in time are
+    also left as None and 'deadline_exceeded' is recorded in sources['shipping_debug']."""
+    import aiohttp
 
+    carbon = CarbonBreakdown()
+    carbon.sources = {}
+    reasons: list[str] = []
+
+    try:
+        async with aiohttp.ClientSession() as session:
+            fill = _strict_components(session, product, destination, origin, shipping_mode, carbon, reasons)
+            if deadline is None:
+                await fill
+            else:
+                await asyncio.wait_for(fill, timeout=deadline.remaining())
+    except asyncio.TimeoutError:
+        # aiohttp's own request timeouts are TimeoutErrors too; only a spent budget is a deadline
+        reasons.append("deadline_exceeded" if deadline is not None and deadline.expired else "timeout")
     except Exception:
         # In strict mode, swallow internal errors and return what we have (likely None components)
         reasons.append("internal_error")
@@ -3,18 +3,21 @@ Dataset loader for ecommerce product data from Octaprice GitHub repository.
 Replaces web scraping with structured dataset access.
 """
 
-import pandas as pd
+from __future__ import annotations
+
 import json
 import re
-from typing import Optional, List, Dict, Any
+from typing import TYPE_CHECKING, Optional, List, Dict, Any
 from pathlib import Path
 
-import requests
 import zipfile
 import io
 
 from models import ProductInfo
-from utils import parse_price, parse_weight_kg, clean_text
+from utils import parse_price, parse_weight_kg, parse_dimensions_cm, clean_text
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 class DatasetLoader:
@@ -24,11 +27,15 @@ class DatasetLoader:
         self.dataset_path = dataset_path
         self.df = None
         self.metadata = None
+        self._similarity_index = None
         
     def load_local_dataset(self, csv_path: str, metadata_path: Optional[str] = None) -> bool:
         """Load dataset from local CSV file."""
+        import pandas as pd
+
         try:
             self.df = pd.read_csv(csv_path)
+            self._similarity_index = None
             if metadata_path and Path(metadata_path).exists():
                 with open(metadata_path, 'r') as f:
                     self.metadata = json.load(f)
@@ -40,6 +47,9 @@ class DatasetLoader:
     
     def download_dataset(self, dataset_url: str) -> bool:
         """Download and load dataset from GitHub repository."""
+        import pandas as pd
+        import requests
+
         try:
             print(f"Downloading dataset from {dataset_url}")
             response = requests.get(dataset_url)
@@ -58,6 +68,7 @@ class DatasetLoader:
                 # Load CSV
                 with zip_file.open(csv_files[0]) as csv_file:
                     self.df = pd.read_csv(csv_file)
+                    self._similarity_index = None
                 
                 # Load metadata if available
                 if json_files:
@@ -109,6 +120,27 @@ class DatasetLoader:
         results = self.df[mask].head(limit)
         return [self._row_to_product_info(row) for _, row in results.iterrows()]
     
+    def get_similarity_index(self):
+        """TF-IDF similarity index over the loaded rows, built on first use."""
+        if self.df is None:
+            return None
+        if self._similarity_index is None:
+            from similarity_index import build_from_dataframe
+
+            self._similarity_index = build_from_dataframe(self.df)
+            print(f"Built similarity index over {len(self._similarity_index)} products")
+        return self._similarity_index
+
+    def find_similar_asins(
+        self, title: Optional[str], brand: Optional[str] = None, category: Optional[str] = None,
+        k: int = 5, exclude_asin: Optional[str] = None, min_score: float = 0.0,
+    ) -> List[tuple]:
+        """Top-k (asin, score) pairs from the dataset most similar to the given product."""
+        index = self.get_similarity_index()
+        if index is None:
+            return []
+        return index.query(title, brand, category, k=k, exclude=[exclude_asin] if exclude_asin else (), min_score=min_score)
+
     def get_random_products(self, count: int = 10) -> List[ProductInfo]:
         """Get random products from the dataset."""
         if self.df is None:
@@ -119,6 +151,8 @@ class DatasetLoader:
     
     def _row_to_product_info(self, row: pd.Series) -> ProductInfo:
         """Convert a pandas row to ProductInfo object."""
+        import pandas as pd
+
         # Extract weight information
         weight_kg = None
         if pd.notna(row.get('weight_value')) and pd.notna(row.get('weight_unit')):
@@ -258,6 +292,12 @@ def get_product_by_asin(asin: str) -> Optional[ProductInfo]:
     return dataset_loader.get_product_by_sku(asin)
 
 
+def find_similar_asins(title: Optional[str], brand: Optional[str] = None, category: Optional[str] = None,
+                       k: int = 5, exclude_asin: Optional[str] = None, min_score: float = 0.0) -> List[tuple]:
+    """Most similar dataset products as (asin, score) pairs, best first."""
+    return dataset_loader.find_similar_asins(title, brand, category, k, exclude_asin, min_score)
+
+
 def search_products_by_name(query: str, limit: int = 10) -> List[ProductInfo]:
     """Search products by name in the dataset."""
     return dataset_loader.search_products(query, limit)
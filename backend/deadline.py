@@ -0,0 +1,44 @@
+"""
+Per-request deadlines.
+
+A Deadline is created once when a request arrives and handed down through
+fetch_html, extract_facts_claude and estimate_carbon_strict. Each stage asks
+for the remaining budget (optionally capped by its own timeout) instead of
+applying a fresh timeout per attempt.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Optional
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a stage is asked to start after the request budget has run out."""
+
+
+class Deadline:
+    def __init__(self, seconds: float):
+        self.budget_s = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+    def timeout(self, cap: Optional[float] = None) -> float:
+        """Remaining budget, capped by a stage's own timeout when given."""
+        remaining = self.remaining()
+        return remaining if cap is None else min(cap, remaining)
+
+    def check(self, stage: str) -> None:
+        if self.expired:
+            raise DeadlineExceeded(f"deadline of {self.budget_s:.1f}s exceeded before {stage}")
+
+
+def stage_timeout(deadline: Optional[Deadline], cap: float) -> float:
+    """Timeout for one stage: its own cap, or less if the request deadline is closer."""
+    return cap if deadline is None else deadline.timeout(cap)
@@ -0,0 +1,240 @@
+"""
+Generator for the browser extension's `carbon_footprint_cache.json`.
+
+Builds one entry per dataset product in the format `extension/src/content.jsx`
+reads (name, description, price, link, carbon_footprint_kg/_g, similar_asins,
+processed_date, destination_zip). Footprints come from the heuristic
+`estimate_carbon`, and `similar_asins` from the local similarity index. Rows
+are processed in parallel across worker processes.
+
+Rebuilds are incremental. A manifest next to the output keeps a fingerprint
+of every product's dataset row. Only new or changed products are recomputed,
+along with the products whose neighbour lists they can affect. Everything
+else, including its processed_date, is carried over. Use --full to recompute
+everything. Entries in the output that the generator didn't write (the
+hand-built ones) are left as they are. With --shards DIR the finished cache
+is also exported in the compact binary format of `cache_shards.py`.
+
+    python extension_cache.py path/to/dataset.csv [--out ../carbon_footprint_cache.json] [--workers 4] [--shards DIR]
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from similarity_index import SimilarityIndex
+
+
+DEFAULT_OUT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "carbon_footprint_cache.json")
+MANIFEST_VERSION = 1
+DESCRIPTION_CHARS = 500
+# Rows per worker task
+CHUNK_SIZE = 256
+
+# Set in each worker by _init_worker (and in the parent for inline builds)
+_similarity: Optional["SimilarityIndex"] = None
+_options: Dict[str, Any] = {}
+
+
+def _init_worker(similarity: Optional["SimilarityIndex"], options: Dict[str, Any]) -> None:
+    global _similarity, _options
+    _similarity = similarity
+    _options = options
+
+
+def row_fingerprint(row: Dict[str, Any]) -> str:
+    return hashlib.sha1(json.dumps(row, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _product(row: Dict[str, Any]):
+    import pandas as pd
+
+    from dataset_loader import DatasetLoader
+
+    return DatasetLoader()._row_to_product_info(pd.Series(row))
+
+
+def _entry_for_row(row: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    import pandas as pd
+
+    from carbon import estimate_carbon
+    from utils import clean_text
+
+    info = _product(row)
+    kg = round(estimate_carbon(info, _options["destination"], _options["shipping_mode"]).total, 3)
+    similar: List[str] = []
+    if _similarity is not None:
+        hits = _similarity.query(info.title, info.brand, info.category, k=_options["k"],
+                                 exclude=[info.asin], min_score=_options["min_score"])
+        similar = [asin for asin, _ in hits]
+    description = row.get("description")
+    description = clean_text(str(description))[:DESCRIPTION_CHARS] if description is not None and pd.notna(description) else ""
+    return info.asin or "", {
+        "name": info.title,
+        "description": description,
+        "price": info.price,
+        "link": str(info.url),
+        "carbon_footprint_kg": kg,
+        "carbon_footprint_g": int(round(kg * 1000)),
+        "similar_asins": similar,
+        "processed_date": datetime.now().isoformat(),
+        "destination_zip": _options["destination_zip"],
+    }
+
+
+def _process_chunk(rows: List[Dict[str, Any]]) -> List[Tuple[str, Dict[str, Any]]]:
+    return [_entry_for_row(row) for row in rows]
+
+
+def _read_json(path: Path) -> Dict[str, Any]:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_json(path: Path, payload: Any, indent: Optional[int] = None) -> None:
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(payload, indent=indent))
+    os.replace(tmp, path)
+
+
+def build_extension_cache(
+    loader,
+    out_path: str | Path = DEFAULT_OUT,
+    destination_zip: str = "02062",
+    k: int = 5,
+    min_score: float = 0.1,
+    workers: int = 0,
+    full: bool = False,
+    shards_dir: Optional[str | Path] = None,
+    shard_prefix_len: int = 4,
+) -> Dict[str, Any]:
+    """Write the extension cache for a loaded DatasetLoader; returns build stats."""
+    out_path = Path(out_path)
+    manifest_path = out_path.with_name(out_path.stem + ".manifest.json")
+    options = {
+        "destination": destination_zip,
+        "destination_zip": destination_zip,
+        "shipping_mode": "ground",
+        "k": k,
+        "min_score": min_score,
+    }
+    started = time.perf_counter()
+
+    rows: Dict[str, Dict[str, Any]] = {}
+    for row in loader.df.to_dict("records"):
+        sku = row.get("sku")
+        if isinstance(sku, str) and sku:
+            rows[sku] = row
+    fingerprints = {asin: row_fingerprint(row) for asin, row in rows.items()}
+    similarity = loader.get_similarity_index()
+
+    manifest = _read_json(manifest_path)
+    existing = _read_json(out_path)
+    generated: Dict[str, str] = manifest.get("products", {})
+    # Entries this generator never wrote (e.g. added by hand) are kept as they are
+    extra = {a: e for a, e in existing.items() if a not in generated and a not in rows}
+    previous = {a: e for a, e in existing.items() if a in generated}
+    if full or manifest.get("version") != MANIFEST_VERSION or manifest.get("options") != options:
+        # Different settings change every footprint and neighbour list
+        previous = {}
+    old_prints = {a: fp for a, fp in generated.items() if a in previous}
+
+    changed = {a for a, fp in fingerprints.items() if old_prints.get(a) != fp}
+    removed = set(previous) - set(rows)
+    stale = set(changed)
+    if changed or removed:
+        touched = changed | removed
+        # Lists that name a changed or removed product are out of date
+        stale |= {a for a, entry in previous.items() if a in rows and touched & set(entry.get("similar_asins", []))}
+        # So are the lists a changed product may now belong to: its own neighbourhood
+        if similarity is not None:
+            for asin in changed:
+                info = _product(rows[asin])
+                for other, _ in similarity.query(info.title, info.brand, info.category, k=4 * k, exclude=[asin],
+                                                 min_score=min_score):
+                    stale.add(other)
+    stale &= set(rows)
+
+    todo = [rows[a] for a in rows if a in stale]
+    chunks = [todo[i:i + CHUNK_SIZE] for i in range(0, len(todo), CHUNK_SIZE)]
+    computed: Dict[str, Dict[str, Any]] = {}
+    if workers > 0 and len(chunks) > 1:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(similarity, options),
+        ) as pool:
+            for results in pool.map(_process_chunk, chunks):
+                computed.update(results)
+    else:
+        _init_worker(similarity, options)
+        for chunk in chunks:
+            computed.update(_process_chunk(chunk))
+
+    # Dataset order, so unchanged inputs give an unchanged file
+    cache = {asin: computed.get(asin) or previous[asin] for asin in rows}
+    cache.update(extra)
+    _write_json(out_path, cache, indent=2)
+    _write_json(manifest_path, {"version": MANIFEST_VERSION, "options": options, "products": fingerprints})
+    shards = 0
+    if shards_dir is not None:
+        from cache_shards import export_shards
+
+        shards = len(export_shards(cache, shards_dir, shard_prefix_len)["shards"])
+    return {
+        "products": len(rows),
+        "recomputed": len(computed),
+        "reused": len(rows) - len(computed),
+        "kept": len(extra),
+        "removed": len(removed),
+        "shards": shards,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def main() -> None:
+    import argparse
+
+    from dataset_loader import DatasetLoader
+
+    parser = argparse.ArgumentParser(description="Generate the extension's carbon_footprint_cache.json from a dataset CSV")
+    parser.add_argument("csv", help="Dataset CSV (Octaprice layout)")
+    parser.add_argument("--out", default=DEFAULT_OUT)
+    parser.add_argument("--destination-zip", default="02062")
+    parser.add_argument("--k", type=int, default=5, help="similar_asins per product")
+    parser.add_argument("--min-score", type=float, default=0.1, help="Minimum similarity for similar_asins")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (0 = inline)")
+    parser.add_argument("--full", action="store_true", help="Ignore the manifest and recompute every product")
+    parser.add_argument("--shards", default=None, help="Also export the cache as binary shards into this directory")
+    parser.add_argument("--shard-prefix-len", type=int, default=4, help="ASIN prefix length that picks a shard")
+    args = parser.parse_args()
+
+    loader = DatasetLoader()
+    if not loader.load_local_dataset(args.csv):
+        raise SystemExit(1)
+    stats = build_extension_cache(
+        loader, args.out, args.destination_zip, args.k, args.min_score, args.workers, args.full,
+        args.shards, args.shard_prefix_len,
+    )
+    print(
+        f"Wrote {stats['products']} products to {args.out}: {stats['recomputed']} recomputed, "
+        f"{stats['reused']} reused, {stats['removed']} removed, {stats['kept']} hand-built kept in {stats['seconds']}s"
+    )
+    if args.shards:
+        print(f"Exported {stats['shards']} shards to {args.shards}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,13 +3,22 @@ from __future__ import annotations
 import json
 import asyncio
 from typing import List, Dict, Any, Optional
-import aiohttp
-from bs4 import BeautifulSoup
 
+from deadline import Deadline
+from dataset_loader import find_similar_asins, get_product_from_url
 from models import ProductInfo
+from politeness import HostScheduler
 from settings import settings
 from scrape import scrape_amazon_product
-from llm_extract import extract_facts_claude
+from fact_extract import extract_facts, extract_facts_many
+
+
+# Shared by all /api/similar requests: global cap on candidates in flight, token bucket per host
+similar_scheduler = HostScheduler(
+    max_concurrency=settings.SIMILAR_CONCURRENCY,
+    per_host_rate=settings.SCRAPE_HOST_RATE,
+    per_host_burst=settings.SCRAPE_HOST_BURST,
+)
 
 
 def get_exact_product_title(info: ProductInfo) -> str:
@@ -17,15 +26,27 @@ def get_exact_product_title(info: ProductInfo) -> str:
     return info.title or "Unknown Product"
 
 
+def find_similar_in_dataset(info: ProductInfo, k: int) -> List[str]:
+    """Product URLs of the k closest dataset products (by name, brand and category) above the minimum score."""
+    if not settings.SIMILAR_INDEX_ENABLED:
+        return []
+    hits = find_similar_asins(
+        info.title, info.brand, info.category, k=k,
+        exclude_asin=info.asin, min_score=settings.SIMILAR_INDEX_MIN_SCORE,
+    )
+    return [f"{settings.AMAZON_BASE_URL}/dp/{asin}" for asin, _ in hits]
+
+
 async def search_amazon_for_title(product_title: str, exclude_asin: str, limit: int = 5) -> List[str]:
     """Search Amazon with exact product title and get top 5 results"""
     
     # Use multiple scraping strategies like in scrape.py
+    from bs4 import BeautifulSoup
     from scrape import fetch_html
     
     # Clean the title for search
     search_query = product_title.replace(" ", "+").replace(",", "").replace("(", "").replace(")", "")
-    search_url = f"https://www.amazon.com/s?k={search_query}&ref=sr_pg_1"
+    search_url = f"{settings.AMAZON_BASE_URL}/s?k={search_query}&ref=sr_pg_1"
     
     try:
         print(f"Searching Amazon for: {product_title}")
@@ -47,7 +68,7 @@ async def search_amazon_for_title(product_title: str, exclude_asin: str, limit:
             for item in items:
                 asin = item.get('data-asin')
                 if asin and len(asin) == 10 and asin != exclude_asin:
-                    product_url = f"https://www.amazon.com/dp/{asin}"
+                    product_url = f"{settings.AMAZON_BASE_URL}/dp/{asin}"
                     if product_url not in product_urls:
                         product_urls.append(product_url)
                         if len(product_urls) >= limit:
@@ -63,7 +84,7 @@ async def search_amazon_for_title(product_title: str, exclude_asin: str, limit:
                     try:
                         asin = href.split('/dp/')[1].split('/')[0].split('?')[0]
                         if len(asin) == 10 and asin != exclude_asin:
-                            product_url = f"https://www.amazon.com/dp/{asin}"
+                            product_url = f"{settings.AMAZON_BASE_URL}/dp/{asin}"
                             if product_url not in product_urls:
                                 product_urls.append(product_url)
                                 if len(product_urls) >= limit:
@@ -114,67 +135,72 @@ def get_fallback_similar_products(product_title: str, exclude_asin: str, limit:
     
     # Filter out the excluded ASIN and convert to URLs
     filtered_asins = [asin for asin in category_asins if asin != exclude_asin][:limit]
-    return [f"https://www.amazon.com/dp/{asin}" for asin in filtered_asins]
+    return [f"{settings.AMAZON_BASE_URL}/dp/{asin}" for asin in filtered_asins]
 
 
-async def extract_similar_product_info(url: str) -> Optional[Dict[str, Any]]:
-    """Scrape and extract key info from a similar product"""
+async def scrape_similar_product(url: str, deadline: Optional[Deadline] = None) -> Optional[ProductInfo]:
+    """Dataset row or scraped page for a similar product; None if scraping fails"""
     try:
-        # Scrape the product page
-        info = await scrape_amazon_product(url)
+        # Dataset products need no request; anything else is scraped, paced per host
+        info = get_product_from_url(url)
+        if info is None:
+            await similar_scheduler.before_request(url)
+            info = await scrape_amazon_product(url, deadline=deadline)
         print(f"Scraped info - Title: {info.title}, ASIN: {info.asin}, Price: {info.price}")
-        
-        # Extract facts using Claude LLM
-        extracted_facts = {}
-        if info.raw and info.raw.get("text") and settings.ANTHROPIC_API_KEY:
-            extracted_facts = await extract_facts_claude(info.raw.get("text") or "")
-            print(f"LLM extracted facts: {len(extracted_facts)} fields")
-        
-        # Combine scraped info with LLM extracted facts
-        result = {
-            "url": str(info.url),
-            "title": info.title,
-            "brand": info.brand,
-            "asin": info.asin,
-            "price": info.price,
-            "currency": info.currency,
-            "weight_kg": info.weight_kg or extracted_facts.get("item_weight_kg"),
-            "shipping_weight_kg": info.shipping_weight_kg or extracted_facts.get("shipping_weight_kg"),
-            "dimensions_cm": info.dimensions_cm,
-            "materials": info.materials or extracted_facts.get("materials", []),
-            "materials_composition": extracted_facts.get("materials_composition", []),
-            "packaging_materials": extracted_facts.get("packaging_materials", []),
-            "packaging_weight_kg": extracted_facts.get("packaging_weight_kg"),
-            "country_of_origin": extracted_facts.get("country_of_origin"),
-            "bullets": info.bullets[:3] if info.bullets else [],  # First 3 bullets
-            "category": info.category,
-        }
-        
-        # If basic scraping failed, try to use fallback data
-        if not result["title"] and not result["asin"]:
-            print(f"Basic scraping failed for {url}, trying fallback...")
-            # Extract ASIN from URL as fallback
-            import re
-            asin_match = re.search(r'/dp/([A-Z0-9]{10})', url)
-            if asin_match:
-                result["asin"] = asin_match.group(1)
-                result["url"] = url
-                print(f"Extracted ASIN from URL: {result['asin']}")
-        
-        return result
-        
+        return info
     except Exception as e:
         print(f"Failed to extract info from {url}: {e}")
         return None
 
 
-async def extract_top_k_similar(info: ProductInfo, k: int = 5) -> List[Dict[str, Any]]:
+def similar_product_result(url: str, info: ProductInfo, extracted_facts: Dict[str, Any]) -> Dict[str, Any]:
+    """Combine scraped info with extracted facts"""
+    if extracted_facts["llm_fields"]:
+        print(f"LLM asked for: {', '.join(extracted_facts['llm_fields'])}")
+
+    result = {
+        "url": str(info.url),
+        "title": info.title,
+        "brand": info.brand,
+        "asin": info.asin,
+        "price": info.price,
+        "currency": info.currency,
+        "weight_kg": info.weight_kg or extracted_facts.get("item_weight_kg"),
+        "shipping_weight_kg": info.shipping_weight_kg or extracted_facts.get("shipping_weight_kg"),
+        "dimensions_cm": info.dimensions_cm,
+        "materials": info.materials or extracted_facts.get("materials", []),
+        "materials_composition": extracted_facts.get("materials_composition", []),
+        "packaging_materials": extracted_facts.get("packaging_materials", []),
+        "packaging_weight_kg": extracted_facts.get("packaging_weight_kg"),
+        "country_of_origin": extracted_facts.get("country_of_origin"),
+        "bullets": info.bullets[:3] if info.bullets else [],  # First 3 bullets
+        "category": info.category,
+    }
+
+    # If basic scraping failed, try to use fallback data
+    if not result["title"] and not result["asin"]:
+        print(f"Basic scraping failed for {url}, trying fallback...")
+        # Extract ASIN from URL as fallback
+        import re
+        asin_match = re.search(r'/dp/([A-Z0-9]{10})', url)
+        if asin_match:
+            result["asin"] = asin_match.group(1)
+            result["url"] = url
+            print(f"Extracted ASIN from URL: {result['asin']}")
+
+    return result
+
+
+async def extract_top_k_similar(
+    info: ProductInfo, k: int = 5, deadline: Optional[Deadline] = None
+) -> List[Dict[str, Any]]:
     """
     Main function: Extract top K similar products with their key information
     
     Args:
         info: ProductInfo object from the original product
         k: Number of similar products to find (default 5)
+        deadline: Request budget shared by the candidate scrapes and the LLM extraction
     
     Returns:
         List of dictionaries containing similar product information
@@ -185,24 +211,33 @@ async def extract_top_k_similar(info: ProductInfo, k: int = 5) -> List[Dict[str,
     product_title = get_exact_product_title(info)
     print(f"Using exact product title: {product_title}")
     
-    # Step 2: Search Amazon for that exact title
-    print("Searching Amazon for exact title...")
-    similar_urls = await search_amazon_for_title(product_title, info.asin or "", k)
+    # Step 2: Nearest products in the local dataset index
+    similar_urls = find_similar_in_dataset(info, k)
+    print(f"Found {len(similar_urls)} similar products in the dataset index")
+
+    # Step 3: Search Amazon for that exact title only if the index came up short
+    if len(similar_urls) < k:
+        print("Searching Amazon for exact title...")
+        searched = await search_amazon_for_title(product_title, info.asin or "", k)
+        similar_urls += [url for url in searched if url not in similar_urls][: k - len(similar_urls)]
     print(f"Found {len(similar_urls)} similar products")
     
-    # Step 3: Extract info from each similar product using llm_extract logic
+    # Step 4: Scrape all similar products concurrently
     print("Extracting information from similar products...")
-    similar_products = []
-    
-    for i, url in enumerate(similar_urls, 1):
-        print(f"Processing product {i}/{len(similar_urls)}: {url}")
-        product_info = await extract_similar_product_info(url)
-        if product_info:
-            similar_products.append(product_info)
-        
-        # Add small delay to avoid overwhelming Amazon
-        await asyncio.sleep(1)
-    
+
+    async def process(i: int, url: str) -> Optional[ProductInfo]:
+        async with similar_scheduler.slot():
+            print(f"Processing product {i}/{len(similar_urls)}: {url}")
+            return await scrape_similar_product(url, deadline)
+
+    # gather keeps results in rank order regardless of which finishes first
+    infos = await asyncio.gather(*[process(i, url) for i, url in enumerate(similar_urls, 1)])
+    scraped = [(url, info) for url, info in zip(similar_urls, infos) if info is not None]
+
+    # Step 5: Detail table and regexes per product; one batched Claude request for the facts they leave missing
+    facts = await extract_facts_many([info for _, info in scraped], deadline=deadline)
+    similar_products = [similar_product_result(url, info, f) for (url, info), f in zip(scraped, facts)]
+
     print(f"Successfully extracted info from {len(similar_products)} products")
     return similar_products
 
@@ -281,11 +316,10 @@ async def interactive_similar_analyzer():
         
         # Calculate carbon footprint for original
         from carbon import estimate_carbon, estimate_carbon_strict
-        from llm_extract import extract_facts_claude
         
         strict = bool(settings.CLIMATIQ_API_KEY)
-        if strict and original_info.raw and original_info.raw.get("text") and settings.ANTHROPIC_API_KEY:
-            extracted = await extract_facts_claude(original_info.raw.get("text") or "")
+        if strict:
+            extracted = await extract_facts(original_info)
             if not original_info.weight_kg and extracted.get("item_weight_kg"):
                 original_info.weight_kg = extracted.get("item_weight_kg")
         
@@ -330,8 +364,8 @@ async def interactive_similar_analyzer():
                     continue
                 
                 # LLM extraction if available
-                if strict and similar_info.raw and similar_info.raw.get("text") and settings.ANTHROPIC_API_KEY:
-                    extracted = await extract_facts_claude(similar_info.raw.get("text") or "")
+                if strict:
+                    extracted = await extract_facts(similar_info)
                     if not similar_info.weight_kg and extracted.get("item_weight_kg"):
                         similar_info.weight_kg = extracted.get("item_weight_kg")
                 
@@ -0,0 +1,104 @@
+"""
+Process pool for HTML -> ProductInfo field extraction.
+
+Parsing a product page is pure CPU work; on the event loop it stalls every other
+request. When the pool is running (started by the app on startup), pages of at
+least `inline_below_bytes` are sent to worker processes as UTF-8 bytes and only
+the extracted field dict comes back. Smaller pages, and every page when the pool
+is not running (CLI use, tests), are parsed inline.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional
+
+
+def _warm_up() -> None:
+    # Import the parsing stack once per worker so the first real page doesn't pay for it
+    import scrape  # noqa: F401
+    import fast_parse  # noqa: F401
+    import bs4  # noqa: F401
+
+    try:
+        import lxml.etree  # noqa: F401
+    except ImportError:
+        pass
+
+
+def _extract_in_worker(page: bytes, parser: str) -> Dict[str, Any]:
+    from scrape import extract_product_fields
+
+    return extract_product_fields(page, parser)
+
+
+class ExtractionPool:
+    def __init__(self, workers: int = 0, inline_below_bytes: int = 200_000):
+        self.workers = workers
+        self.inline_below_bytes = inline_below_bytes
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.offloaded = 0
+        self.inline = 0
+        self.restarts = 0
+
+    @property
+    def running(self) -> bool:
+        return self._executor is not None
+
+    def start(self, workers: Optional[int] = None, inline_below_bytes: Optional[int] = None) -> None:
+        if workers is not None:
+            self.workers = workers
+        if inline_below_bytes is not None:
+            self.inline_below_bytes = inline_below_bytes
+        if self.workers <= 0 or self._executor is not None:
+            return
+        # spawn, not fork: the parent has an event loop and threads that must not be copied
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_up,
+        )
+
+    def stop(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    async def extract(self, html: str, parser: str) -> Dict[str, Any]:
+        from scrape import extract_product_fields
+
+        # Character count stands in for the byte size; Amazon pages are nearly all ASCII
+        if self._executor is None or len(html) < self.inline_below_bytes:
+            self.inline += 1
+            return extract_product_fields(html, parser)
+        page = html.encode("utf-8")
+        loop = asyncio.get_running_loop()
+        try:
+            fields = await loop.run_in_executor(self._executor, _extract_in_worker, page, parser)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM); replace the pool and parse this page inline
+            print("   Extraction pool broken, restarting")
+            self.restarts += 1
+            self._executor = None
+            self.start()
+            self.inline += 1
+            return extract_product_fields(html, parser)
+        self.offloaded += 1
+        return fields
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "workers": self.workers,
+            "inline_below_bytes": self.inline_below_bytes,
+            "offloaded": self.offloaded,
+            "inline": self.inline,
+            "restarts": self.restarts,
+        }
+
+
+# Shared pool; the app starts it on startup and stops it on shutdown
+extraction_pool = ExtractionPool()
@@ -0,0 +1,217 @@
+"""
+Tiered product fact extraction: rules first, the LLM only for what's left.
+
+Each fact the strict estimate uses is resolved by the cheapest tier that can:
+
+1. "table": values the scraper already read from the product detail bullets/
+   table, or that the dataset row provides (weight, shipping weight,
+   materials, country of origin).
+2. "regex": deterministic patterns over the page text, such as labelled values
+   ("Item Weight : 3.14 ounces", "Country of Origin : China"), material names
+   after a "Material" label, and composition percentages ("85% copper").
+3. "llm": `extract_facts_claude`. It is called only when a field in
+   `EXTRACT_REQUIRED_FIELDS` is still unresolved, and the prompt asks only
+   for the fields that are still missing.
+
+The result has the keys `extract_facts_claude` returns, plus `provenance`
+(field -> {"tier": ..., ...}) and `llm_fields` (what the LLM was asked for).
+`extract_facts_many` does the same for several products, sending the LLM
+tier of all of them as one batched request.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+
+from llm_extract import FIELDS, LIST_FIELDS, extract_facts_claude, extract_facts_claude_batch
+from settings import settings
+from text_window import MATERIAL_NAMES, MATERIAL_RE
+from utils import parse_weight_kg
+
+if TYPE_CHECKING:
+    from deadline import Deadline
+    from models import ProductInfo
+
+
+_MATERIAL = r"(?:" + "|".join(re.escape(m) for m in MATERIAL_NAMES) + r")"
+_PERCENT_FIRST = re.compile(r"(\d{1,3}(?:\.\d+)?)\s*%\s*(?:of\s+)?(" + _MATERIAL + r")\b", re.I)
+_PERCENT_AFTER = re.compile(r"\b(" + _MATERIAL + r")\s*(\d{1,3}(?:\.\d+)?)\s*%", re.I)
+
+COUNTRIES = sorted(
+    [
+        "China", "United States", "USA", "Mexico", "Canada", "Japan", "South Korea", "Korea", "Taiwan", "Vietnam",
+        "India", "Bangladesh", "Indonesia", "Thailand", "Malaysia", "Philippines", "Cambodia", "Pakistan",
+        "Sri Lanka", "Turkey", "Germany", "France", "Italy", "Spain", "Portugal", "United Kingdom", "UK",
+        "Poland", "Czech Republic", "Netherlands", "Sweden", "Switzerland", "Israel", "Brazil", "Hong Kong",
+    ],
+    key=len,
+    reverse=True,
+)
+_COUNTRY_RE = re.compile(r"\b(" + "|".join(re.escape(c) for c in COUNTRIES) + r")\b")
+_MADE_IN = re.compile(r"\b(?i:made\s+in)\s+(?:the\s+)?([A-Z][A-Za-z]+(?:\s[A-Z][a-z]+)?)")
+
+_MARKS = r"[\s\u200e\u200f]*"
+# Where the next "Label :" of a flattened detail list starts; a word after a list comma never does
+_NEXT_LABEL = re.compile(r"(?<![,;/&])\s+[A-Z][A-Za-z]*(?:\s+[A-Za-z][\w/&-]*){0,4}" + _MARKS + r":")
+_ITEM_WEIGHT_LABEL = r"(?<!shipping )(?<!package )\b(?:item |product |net )?weight"
+_SHIPPING_WEIGHT_LABEL = r"\b(?:shipping|package) weight"
+_MATERIAL_LABEL = r"\b(?:materials?(?: type| composition)?|fabric type|made of)"
+_ORIGIN_LABEL = r"\bcountry of origin"
+
+
+def _labelled(text: str, label: str, colon: bool = True, width: int = 80) -> List[str]:
+    """Values that follow `label` (and a colon, when required), cut at the next label."""
+    sep = _MARKS + (":" if colon else ":?") + _MARKS
+    values = []
+    for m in re.finditer(label + sep, text, re.I):
+        value = text[m.end():m.end() + width]
+        cut = _NEXT_LABEL.search(value)
+        values.append((value[:cut.start()] if cut else value).strip())
+    return values
+
+
+def _first_weight(values: List[str]) -> Optional[float]:
+    # Only a value that starts with the number ("Weight Capacity: 300 lbs" is not a weight)
+    for value in values:
+        weight = parse_weight_kg(value) if value[:1].isdigit() else None
+        if weight:
+            return weight
+    return None
+
+
+def regex_item_weight(text: str) -> Optional[float]:
+    return _first_weight(_labelled(text, _ITEM_WEIGHT_LABEL, colon=False, width=30))
+
+
+def regex_shipping_weight(text: str) -> Optional[float]:
+    return _first_weight(_labelled(text, _SHIPPING_WEIGHT_LABEL, colon=False, width=30))
+
+
+def regex_composition(text: str) -> List[Dict[str, Any]]:
+    """Explicit percentages per material; dropped if they add up to more than 100%."""
+    fractions: Dict[str, float] = {}
+    for m in _PERCENT_FIRST.finditer(text):
+        fractions.setdefault(m.group(2).lower(), float(m.group(1)) / 100.0)
+    for m in _PERCENT_AFTER.finditer(text):
+        fractions.setdefault(m.group(1).lower(), float(m.group(2)) / 100.0)
+    if not fractions or sum(fractions.values()) > 1.01 or any(f <= 0 for f in fractions.values()):
+        return []
+    return [{"material": name, "fraction": round(f, 4)} for name, f in fractions.items()]
+
+
+def regex_materials(text: str) -> List[str]:
+    materials: List[str] = []
+    for value in _labelled(text, _MATERIAL_LABEL):
+        materials.extend(m.group(0).lower() for m in MATERIAL_RE.finditer(value))
+    if not materials:
+        materials = [entry["material"] for entry in regex_composition(text)]
+    return list(dict.fromkeys(materials))[:5]
+
+
+def regex_country(text: str) -> Optional[str]:
+    for value in _labelled(text, _ORIGIN_LABEL, colon=False, width=40):
+        m = _COUNTRY_RE.search(value)
+        if m:
+            return m.group(1)
+        words = value.split()
+        if words and words[0][:1].isupper():
+            return words[0].strip(".,;")
+    m = _MADE_IN.search(text)
+    return m.group(1) if m else None
+
+
+REGEX_RULES: Dict[str, Callable[[str], Any]] = {
+    "item_weight_kg": regex_item_weight,
+    "shipping_weight_kg": regex_shipping_weight,
+    "materials": regex_materials,
+    "materials_composition": regex_composition,
+    "country_of_origin": regex_country,
+}
+
+# Counters reported in /api/scrape/stats
+_stats: Dict[str, Any] = {"extractions": 0, "llm_calls": 0, "llm_skipped": 0, "fields": {}}
+
+
+def required_fields() -> List[str]:
+    return [f.strip() for f in settings.EXTRACT_REQUIRED_FIELDS.split(",") if f.strip() in FIELDS]
+
+
+def _present(value: Any) -> bool:
+    return value not in (None, "", [])
+
+
+class _Facts:
+    """One product's facts while the tiers fill them in."""
+
+    def __init__(self, info: "ProductInfo"):
+        self.text = (info.raw or {}).get("text") or ""
+        self.facts: Dict[str, Any] = {f: [] if f in LIST_FIELDS else None for f in FIELDS}
+        self.provenance: Dict[str, Dict[str, Any]] = {}
+        self.llm_fields: List[str] = []
+
+        for field, value in (
+            ("item_weight_kg", info.weight_kg),
+            ("shipping_weight_kg", info.shipping_weight_kg),
+            ("materials", info.materials),
+            ("country_of_origin", info.country_of_origin),
+        ):
+            self.resolve(field, value, {"tier": "table"})
+
+        if self.text:
+            for field, rule in REGEX_RULES.items():
+                if field not in self.provenance:
+                    self.resolve(field, rule(self.text), {"tier": "regex"})
+
+    def resolve(self, field: str, value: Any, source: Dict[str, Any]) -> None:
+        if _present(value) and field not in self.provenance:
+            self.facts[field] = value
+            self.provenance[field] = source
+
+    def missing(self) -> List[str]:
+        """Fields to ask the LLM for; empty unless a required field is unresolved."""
+        missing = [f for f in FIELDS if f not in self.provenance]
+        return missing if self.text and any(f in missing for f in required_fields()) else []
+
+    def apply_llm(self, fields: List[str], extracted: Dict[str, Any]) -> None:
+        self.llm_fields = fields
+        for field in fields:
+            source = (extracted.get("provenance") or {}).get(field, {"tier": "llm"})
+            self.resolve(field, extracted.get(field), source)
+
+    def finish(self) -> Dict[str, Any]:
+        _stats["llm_calls" if self.llm_fields else "llm_skipped"] += 1
+        _stats["extractions"] += 1
+        for source in self.provenance.values():
+            _stats["fields"][source["tier"]] = _stats["fields"].get(source["tier"], 0) + 1
+        return {**self.facts, "provenance": self.provenance, "llm_fields": self.llm_fields}
+
+
+async def extract_facts(info: "ProductInfo", deadline: Optional["Deadline"] = None) -> Dict[str, Any]:
+    """Resolve every fact with the cheapest tier that can; see the module docstring."""
+    product = _Facts(info)
+    missing = product.missing()
+    if missing:
+        product.apply_llm(missing, await extract_facts_claude(product.text, deadline=deadline, fields=missing))
+    return product.finish()
+
+
+async def extract_facts_many(infos: List["ProductInfo"], deadline: Optional["Deadline"] = None) -> List[Dict[str, Any]]:
+    """`extract_facts` for several products, with one batched LLM request for those that need it.
+
+    The batch asks for every field any of those products is missing; each product
+    keeps only the answers for its own missing fields.
+    """
+    products = [_Facts(info) for info in infos]
+    needs = {str(i): p.missing() for i, p in enumerate(products) if p.missing()}
+    if needs:
+        fields = [f for f in FIELDS if any(f in missing for missing in needs.values())]
+        texts = {i: products[int(i)].text for i in needs}
+        extracted = await extract_facts_claude_batch(texts, deadline=deadline, fields=fields)
+        for i, missing in needs.items():
+            products[int(i)].apply_llm(missing, extracted[i])
+    return [p.finish() for p in products]
+
+
+def stats() -> Dict[str, Any]:
+    return {**_stats, "fields": dict(_stats["fields"]), "required_fields": required_fields()}
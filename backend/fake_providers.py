@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Local stand-ins for the external providers the backend calls, for load testing
+without spending Climatiq, OpenCage, Anthropic or ScraperAPI quota.
+
+Serves, on one port, the exact endpoints used by carbon.py, llm_extract.py,
+scrape.fetch_html and extract_top_k_similar:
+
+    GET  /data/v1/search            Climatiq factor search
+    POST /data/v1/estimate          Climatiq estimate
+    POST /intermodal/v1/estimate    Climatiq intermodal freight
+    GET  /geocode/v1/json           OpenCage geocoding
+    POST /v1/messages               Anthropic Messages API
+    POST /v1/messages/batches       Anthropic Message Batches (create, then GET status and results)
+    GET  /?api_key=..&url=..        ScraperAPI
+    GET  /http/{target}             Jina Reader
+    GET  /dp/{asin}, GET /s?k=..    Amazon product and search pages
+
+Usage:
+    python fake_providers.py --port 9100 --latency-ms 150 --jitter-ms 50 --error-rate 0.02
+    python fake_providers.py --config providers.json
+
+In tests, `serve()` runs them on a free port and points the settings at them for the
+duration of an `async with` block; `serve_app()` does the same for any aiohttp app.
+
+Point the backend at it with:
+    CLIMATIQ_API_URL=http://127.0.0.1:9100 OPENCAGE_API_URL=http://127.0.0.1:9100
+    ANTHROPIC_API_URL=http://127.0.0.1:9100 SCRAPER_API_URL=http://127.0.0.1:9100
+    JINA_READER_URL=http://127.0.0.1:9100 AMAZON_BASE_URL=http://127.0.0.1:9100
+    CLIMATIQ_API_KEY=fake OPENCAGE_API_KEY=fake ANTHROPIC_API_KEY=fake SCRAPER_API_KEY=fake
+
+The optional --config JSON file overrides behaviour per provider, e.g.:
+    {
+      "anthropic": {"latency_ms": 1200, "jitter_ms": 400, "error_rate": 0.05, "error_status": 529},
+      "climatiq": {"latency_ms": 80},
+      "responses": {"anthropic_facts": {"item_weight_kg": 0.2, "materials": ["PET"]}}
+    }
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from aiohttp import web
+
+
+PROVIDERS = ["climatiq", "opencage", "anthropic", "scraperapi", "jina", "amazon"]
+URL_SETTINGS = ["CLIMATIQ_API_URL", "OPENCAGE_API_URL", "ANTHROPIC_API_URL", "SCRAPER_API_URL", "JINA_READER_URL", "AMAZON_BASE_URL"]
+
+FIXTURE_ASIN = "B000FAKE00"
+PRODUCT_PAGE = (Path(__file__).parent / "fixtures" / "amazon_product.html").read_text(encoding="utf-8")
+
+DEFAULT_RESPONSES: Dict[str, Any] = {
+    "anthropic_facts": {
+        "item_weight_kg": 0.089,
+        "shipping_weight_kg": 0.159,
+        "materials": ["Copper", "PVC"],
+        "materials_composition": [{"material": "copper", "fraction": 0.85}, {"material": "pvc", "fraction": 0.15}],
+        "packaging_materials": ["cardboard"],
+        "packaging_weight_kg": None,
+        "country_of_origin": "China",
+    },
+    # kgCO2e per kg of material / per tonne-km of freight
+    "climatiq_material_factor": 2.5,
+    "climatiq_freight_factor": 0.1,
+    "search_results": 12,
+}
+
+_FREIGHT_WORDS = ("freight", "truck", "lorry", "ship", "plane")
+_ITEM_LINE = re.compile(r"^### ITEM (\S+)$", re.M)
+
+
+class ProviderBehaviour:
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0, error_status: int = 503):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+
+    async def delay(self) -> None:
+        ms = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if ms > 0:
+            await asyncio.sleep(ms / 1000.0)
+
+    def should_fail(self) -> bool:
+        return self.error_rate > 0 and random.random() < self.error_rate
+
+
+class FakeProviders:
+    def __init__(self, behaviours: Dict[str, ProviderBehaviour], responses: Optional[Dict[str, Any]] = None):
+        self.behaviours = behaviours
+        self.responses = dict(DEFAULT_RESPONSES)
+        self.responses.update(responses or {})
+        self.counts: Dict[str, int] = {p: 0 for p in PROVIDERS}
+        self.batches: Dict[str, List[Dict[str, Any]]] = {}
+
+    async def _gate(self, provider: str) -> Optional[web.Response]:
+        """Apply latency and error injection; return an error response if this call should fail."""
+        self.counts[provider] += 1
+        behaviour = self.behaviours[provider]
+        await behaviour.delay()
+        if behaviour.should_fail():
+            headers = {"retry-after": "1"} if behaviour.error_status in (429, 529) else None
+            return web.json_response(
+                {"error": {"type": "fake_provider_error", "message": f"injected {provider} failure"}},
+                status=behaviour.error_status,
+                headers=headers,
+            )
+        return None
+
+    # ---------- Climatiq ----------
+    async def climatiq_search(self, request: web.Request) -> web.Response:
+        if (err := await self._gate("climatiq")) is not None:
+            return err
+        query = request.query.get("query", "")
+        if any(w in query.lower() for w in _FREIGHT_WORDS):
+            result = {"id": f"fake-freight-{_slug(query)}", "name": query, "unit": "tonne-km", "unit_type": "WeightOverDistance"}
+        else:
+            result = {"id": f"fake-material-{_slug(query)}", "name": query, "unit": "kg", "unit_type": "Weight"}
+        return web.json_response({"results": [result], "current_page": 1, "total_results": 1})
+
+    async def climatiq_estimate(self, request: web.Request) -> web.Response:
+        if (err := await self._gate("climatiq")) is not None:
+            return err
+        body = await request.json()
+        params = body.get("parameters") or {}
+        ef_id = str((body.get("emission_factor") or {}).get("id", ""))
+        kg = float(params.get("weight") or 0.0)
+        if "distance" in params:
+            co2e = kg / 1000.0 * float(params["distance"]) * self.responses["climatiq_freight_factor"]
+        else:
+            co2e = kg * self.responses["climatiq_material_factor"]
+        return web.json_response({"co2e": round(co2e, 6), "co2e_unit": "kg", "emission_factor": {"id": ef_id}})
+
+    async def climatiq_intermodal(self, request: web.Request) -> web.Response:
+        if (err := await self._gate("climatiq")) is not None:
+            return err
+        body = await request.json()
+        kg = float((body.get("weight") or {}).get("value") or 0.0)
+        km = sum(float((leg.get("distance") or {}).get("value") or 0.0) for leg in body.get("legs") or [])
+        return web.json_response({"co2e": round(kg / 1000.0 * km * self.responses["climatiq_freight_factor"], 6), "co2e_unit": "kg"})
+
+    # ---------- OpenCage ----------
+    async def opencage_geocode(self, request: web.Request) -> web.Response:
+        if (err := await self._gate("opencage")) is not None:
+            return err
+        digest = hashlib.sha256(request.query.get("q", "").encode("utf-8")).digest()
+        lat = (digest[0] / 255.0) * 120.0 - 60.0
+        lng = (digest[1] / 255.0) * 360.0 - 180.0
+        return web.json_response({"results": [{"geometry": {"lat": round(lat, 4), "lng": round(lng, 4)}}], "status": {"code": 200}})
+
+    # ---------- Anthropic ----------
+    async def anthropic_messages(self, request: web.Request) -> web.Response:
+        if (err := await self._gate("anthropic")) is not None:
+            return err
+        body = await request.json()
+        prompt = ""
+        for message in body.get("messages") or []:
+            content = message.get("content")
+            if isinstance(content, str):
+                prompt += content
+            else:
+                prompt += "".join(str(block.get("text", "")) for block in content or [])
+        return web.json_response(self._message(body.get("model"), prompt))
+
+    def _message(self, model: Optional[str], prompt: str) -> Dict[str, Any]:
+        facts = self.responses["anthropic_facts"]
+        # A batched prompt gets one answer per "### ITEM <id>" it contains
+        item_ids = _ITEM_LINE.findall(prompt)
+        text = json.dumps({item_id: facts for item_id in item_ids} if item_ids else facts)
+        return {
+            "id": "msg_fake",
+            "type": "message",
+            "role": "assistant",
+            "model": model,
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn",
+            "usage": {"input_tokens": max(1, len(prompt) // 4), "output_tokens": max(1, len(text) // 4)},
+        }
+
+    async def anthropic_create_batch(self, request: web.Request) -> web.Response:
+        if (err := await self._gate("anthropic")) is not None:
+            return err
+        body = await request.json()
+        batch_id = f"msgbatch_fake{len(self.batches)}"
+        # Answered at once; the batch reads as ended on the first poll
+        self.batches[batch_id] = [
+            {
+                "custom_id": entry["custom_id"],
+                "result": {
+                    "type": "succeeded",
+                    "message": self._message(
+                        entry["params"].get("model"),
+                        "".join(m.get("content", "") for m in entry["params"].get("messages") or []),
+                    ),
+                },
+            }
+            for entry in body.get("requests") or []
+        ]
+        return web.json_response({"id": batch_id, "type": "message_batch", "processing_status": "in_progress"})
+
+    async def anthropic_get_batch(self, request: web.Request) -> web.Response:
+        batch_id = request.match_info["batch_id"]
+        if batch_id not in self.batches:
+            return web.json_response({"error": {"type": "not_found_error"}}, status=404)
+        return web.json_response(
+            {
+                "id": batch_id,
+                "type": "message_batch",
+                "processing_status": "ended",
+                "results_url": str(request.url.with_path(f"/v1/messages/batches/{batch_id}/results").with_query(None)),
+            }
+        )
+
+    async def anthropic_batch_results(self, request: web.Request) -> web.Response:
+        lines = self.batches.get(request.match_info["batch_id"], [])
+        return web.Response(text="\n".join(json.dumps(line) for line in lines), content_type="application/x-jsonl")
+
+    # ---------- Scraping providers ----------
+    async def scraperapi(self, request: web.Request) -> web.Response:
+        if (err := await self._gate("scraperapi")) is not None:
+            return err
+        return self._page_for(request.query.get("url", ""))
+
+    async def jina(self, request: web.Request) -> web.Response:
+        if (err := await self._gate("jina")) is not None:
+            return err
+        return self._page_for(request.match_info.get("target", ""))
+
+    async def amazon_product(self, request: web.Request) -> web.Response:
+        if (err := await self._gate("amazon")) is not None:
+            return err
+        return self._product_page(request.match_info["asin"])
+
+    async def amazon_search(self, request: web.Request) -> web.Response:
+        if (err := await self._gate("amazon")) is not None:
+            return err
+        seed = int(hashlib.sha256(request.query.get("k", "").encode("utf-8")).hexdigest()[:8], 16)
+        items = "\n".join(
+            f'<div data-component-type="s-search-result" data-asin="{_fake_asin(seed + i)}">'
+            f'<a href="/dp/{_fake_asin(seed + i)}">Result {i}</a></div>'
+            for i in range(int(self.responses["search_results"]))
+        )
+        return web.Response(text=f"<html><body>{items}</body></html>", content_type="text/html")
+
+    def _page_for(self, target: str) -> web.Response:
+        m = re.search(r"/dp/([A-Z0-9]{10})", target)
+        return self._product_page(m.group(1) if m else FIXTURE_ASIN)
+
+    def _product_page(self, asin: str) -> web.Response:
+        return web.Response(text=PRODUCT_PAGE.replace(FIXTURE_ASIN, asin), content_type="text/html")
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.counts)
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.add_routes(
+            [
+                web.get("/data/v1/search", self.climatiq_search),
+                web.post("/data/v1/estimate", self.climatiq_estimate),
+                web.post("/intermodal/v1/estimate", self.climatiq_intermodal),
+                web.get("/geocode/v1/json", self.opencage_geocode),
+                web.post("/v1/messages", self.anthropic_messages),
+                web.post("/v1/messages/batches", self.anthropic_create_batch),
+                web.get("/v1/messages/batches/{batch_id}", self.anthropic_get_batch),
+                web.get("/v1/messages/batches/{batch_id}/results", self.anthropic_batch_results),
+                web.get("/", self.scraperapi),
+                web.get("/http/{target:.*}", self.jina),
+                web.get("/dp/{asin}", self.amazon_product),
+                web.get("/s", self.amazon_search),
+                web.get("/_fake/stats", self.stats),
+            ]
+        )
+        return app
+
+
+@asynccontextmanager
+async def serve_app(app: web.Application) -> AsyncIterator[str]:
+    """Run `app` on a free local port for the duration of the block; yields its base URL."""
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    try:
+        yield f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+    finally:
+        await runner.cleanup()
+
+
+@asynccontextmanager
+async def serve(
+    behaviours: Optional[Dict[str, ProviderBehaviour]] = None,
+    responses: Optional[Dict[str, Any]] = None,
+    **overrides: Any,
+) -> AsyncIterator[FakeProviders]:
+    """Serve the fake providers for the duration of the block, with the backend's settings pointed at them.
+
+    Providers missing from `behaviours` answer at once. Every URL in URL_SETTINGS and any other
+    `overrides` (e.g. ANTHROPIC_API_KEY="test-key") are set for the block and restored afterwards.
+    """
+    from settings import settings
+
+    behaviours = behaviours or {}
+    providers = FakeProviders({p: behaviours.get(p, ProviderBehaviour()) for p in PROVIDERS}, responses)
+    async with serve_app(providers.make_app()) as base_url:
+        values = {name: base_url for name in URL_SETTINGS}
+        values.update(overrides)
+        saved = {name: getattr(settings, name) for name in values}
+        for name, value in values.items():
+            setattr(settings, name, value)
+        try:
+            yield providers
+        finally:
+            for name, value in saved.items():
+                setattr(settings, name, value)
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-") or "factor"
+
+
+def _fake_asin(n: int) -> str:
+    return f"B0{n % 10**8:08d}"
+
+
+def build_behaviours(args: argparse.Namespace, config: Dict[str, Any]) -> Dict[str, ProviderBehaviour]:
+    behaviours = {}
+    for provider in PROVIDERS:
+        overrides = config.get(provider) or {}
+        behaviours[provider] = ProviderBehaviour(
+            latency_ms=float(overrides.get("latency_ms", args.latency_ms)),
+            jitter_ms=float(overrides.get("jitter_ms", args.jitter_ms)),
+            error_rate=float(overrides.get("error_rate", args.error_rate)),
+            error_status=int(overrides.get("error_status", 529 if provider == "anthropic" else 503)),
+        )
+    return behaviours
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fake Climatiq/OpenCage/Anthropic/ScraperAPI/Jina/Amazon servers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="Mean added latency per call")
+    parser.add_argument("--jitter-ms", type=float, default=30.0, help="Uniform +/- jitter around the mean")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls that fail (0..1)")
+    parser.add_argument("--config", help="JSON file with per-provider overrides and canned responses")
+    args = parser.parse_args()
+
+    config: Dict[str, Any] = {}
+    if args.config:
+        config = json.loads(Path(args.config).read_text(encoding="utf-8"))
+
+    fakes = FakeProviders(build_behaviours(args, config), responses=config.get("responses"))
+    print(f"Fake providers listening on http://{args.host}:{args.port}")
+    web.run_app(fakes.make_app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Fast parsing of Amazon product pages for scrape_amazon_product_fallback.
+
+Instead of building a BeautifulSoup tree of the whole 1-2 MB page with the
+pure-Python html.parser, the page is parsed once with lxml (C). The regions
+the extractors read (title, price, detail bullets/table, feature bullets,
+breadcrumbs, images) are found in the same single walk that collects the
+page's visible text, and only they are handed to BeautifulSoup. The result is
+the same (soup, text) pair the html.parser path produces.
+
+Falls back to html.parser when lxml is not installed or cannot parse a page.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Tuple
+
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
+
+
+# Elements whose subtrees the field extractors look at
+REGION_IDS = (
+    "productTitle",
+    "bylineInfo",
+    "corePrice_feature_div",
+    "price_inside_buybox",
+    "tp_price_block_total_price_ww",
+    "tp_price_block_total_price",
+    "detailBullets_feature_div",
+    "productDetails_detailBullets_sections1",
+    "productDetails_techSpec_section_1",
+    "feature-bullets",
+    "wayfinding-breadcrumbs_container",
+    "altImages",
+    "imgTagWrapperId",
+)
+
+_REGION_IDS = frozenset(REGION_IDS)
+# Contents BeautifulSoup.get_text leaves out (comments are skipped separately)
+_HIDDEN_TAGS = {"script", "style", "template"}
+
+
+def _walk(root):
+    """One pass over an lxml tree: outermost region elements, first data-asin value, and
+    the equivalent of soup.get_text(" ", strip=True)."""
+    from lxml import etree
+
+    regions = []
+    open_region = None
+    first_asin = None
+    parts = []
+    hidden = 0
+    for event, el in etree.iterwalk(root, events=("start", "end", "comment", "pi")):
+        if event == "comment" or event == "pi":
+            # Only the text after a comment/processing instruction is page text
+            if not hidden and el.tail:
+                parts.append(el.tail)
+            continue
+        tag = el.tag
+        if event == "start":
+            if tag in _HIDDEN_TAGS:
+                hidden += 1
+            elif not hidden and el.text:
+                parts.append(el.text)
+            if open_region is None and el.get("id") in _REGION_IDS:
+                open_region = el
+                regions.append(el)
+            if first_asin is None:
+                first_asin = el.get("data-asin")
+        else:
+            if tag in _HIDDEN_TAGS:
+                hidden -= 1
+            if el == open_region:
+                open_region = None
+            # A tail follows the element, so it is visible even after a hidden element
+            if not hidden and el.tail:
+                parts.append(el.tail)
+    text = " ".join(s for s in (p.strip() for p in parts) if s)
+    return regions, first_asin, text
+
+
+def parse_html_parser(html: str) -> Tuple["BeautifulSoup", str]:
+    """Reference path: full html.parser tree and its text."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    return soup, soup.get_text(" ", strip=True)
+
+
+def parse_fast(html: str) -> Tuple["BeautifulSoup", str]:
+    """Region-restricted soup plus full visible text, built from one lxml parse."""
+    from bs4 import BeautifulSoup
+    from lxml import etree
+
+    root = etree.HTML(html)
+    if root is None:
+        raise ValueError("lxml produced no document")
+    regions, first_asin, text = _walk(root)
+
+    parts = []
+    if first_asin is not None:
+        # Keep the document's first data-asin value, which _extract_asin checks before the tables
+        parts.append(f'<div data-asin="{_escape_attr(first_asin)}"></div>')
+    for el in regions:
+        parts.append(etree.tostring(el, encoding="unicode", method="html", with_tail=False))
+    soup = BeautifulSoup("<html><body>" + "".join(parts) + "</body></html>", "lxml")
+    return soup, text
+
+
+def _escape_attr(value: str) -> str:
+    return value.replace("&", "&amp;").replace('"', "&quot;").replace("<", "&lt;")
+
+
+def parse_product_page(html: str, engine: str = "fast") -> Tuple["BeautifulSoup", str]:
+    """(soup, visible text) for the field extractors, using `engine` ("fast" or "html.parser")."""
+    if engine == "fast" and html:
+        try:
+            return parse_fast(html)
+        except ImportError:
+            pass
+        except Exception as e:  # lxml rejects some inputs, e.g. str with an XML encoding declaration
+            print(f"   Fast parse failed ({e}); using html.parser")
+    return parse_html_parser(html)
+
+
+# Sections a streamed product page must have completed before the download can stop;
+# each group is satisfied by any one of its ids
+STREAM_TARGET_GROUPS = (
+    ("productTitle",),
+    ("corePrice_feature_div", "price_inside_buybox", "tp_price_block_total_price_ww", "tp_price_block_total_price"),
+    ("feature-bullets",),
+    ("detailBullets_feature_div", "productDetails_detailBullets_sections1", "productDetails_techSpec_section_1"),
+    ("wayfinding-breadcrumbs_container",),
+)
+
+
+class SectionWatcher:
+    """Parses a page incrementally as it downloads and reports when every target group has a
+    fully closed section, i.e. when the rest of the page holds nothing the extractors read."""
+
+    def __init__(self, groups=STREAM_TARGET_GROUPS):
+        from lxml import etree
+
+        self._parser = etree.HTMLPullParser(events=("end",))
+        self._pending = [frozenset(group) for group in groups]
+
+    @classmethod
+    def create(cls) -> "SectionWatcher | None":
+        try:
+            return cls()
+        except ImportError:
+            return None
+
+    @property
+    def done(self) -> bool:
+        return not self._pending
+
+    def feed(self, text: str) -> bool:
+        self._parser.feed(text)
+        for _, el in self._parser.read_events():
+            el_id = el.get("id")
+            if el_id:
+                self._pending = [group for group in self._pending if el_id not in group]
+        return self.done
+
@@ -0,0 +1,108 @@
+"""
+Persistent cache of LLM extraction results.
+
+Entries are keyed by (text hash, prompt version, model): the SHA-256 of the
+whitespace-normalized text sent to the model, a fingerprint of the prompt, and
+the model name. Changing the prompt or the model therefore never serves an old
+answer. Results live in a small SQLite database. When it holds more than
+`max_entries` rows, the least recently used ones are evicted. Only successful
+extractions are stored, so an error or timeout is retried next time.
+
+Methods do blocking SQLite I/O; async callers run them in a thread.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(_WHITESPACE.sub(" ", text).strip().encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, path: str | Path, max_entries: int):
+        self.path = Path(path)
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        # Opened on first use, so importing the module creates no file
+        self._db: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS extractions ("
+                " text_hash TEXT NOT NULL, prompt_version TEXT NOT NULL, model TEXT NOT NULL,"
+                " result TEXT NOT NULL, created_at REAL NOT NULL, used_at REAL NOT NULL,"
+                " PRIMARY KEY (text_hash, prompt_version, model))"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS extractions_used_at ON extractions (used_at)")
+        return self._db
+
+    def get(self, digest: str, prompt_version: str, model: str) -> Optional[Dict[str, Any]]:
+        """The stored result plus its `created_at`, or None."""
+        key = (digest, prompt_version, model)
+        with self._lock:
+            db = self._conn()
+            row = db.execute(
+                "SELECT result, created_at FROM extractions WHERE text_hash=? AND prompt_version=? AND model=?", key
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            db.execute(
+                "UPDATE extractions SET used_at=? WHERE text_hash=? AND prompt_version=? AND model=?", (time.time(), *key)
+            )
+            self.hits += 1
+        return {"result": json.loads(row[0]), "created_at": row[1]}
+
+    def put(self, digest: str, prompt_version: str, model: str, result: Dict[str, Any]) -> float:
+        """Store a result; returns its `created_at`."""
+        now = time.time()
+        with self._lock:
+            db = self._conn()
+            db.execute(
+                "INSERT OR REPLACE INTO extractions VALUES (?, ?, ?, ?, ?, ?)",
+                (digest, prompt_version, model, json.dumps(result), now, now),
+            )
+            count = db.execute("SELECT COUNT(*) FROM extractions").fetchone()[0]
+            if count > self.max_entries:
+                excess = count - self.max_entries
+                db.execute(
+                    "DELETE FROM extractions WHERE rowid IN (SELECT rowid FROM extractions ORDER BY used_at LIMIT ?)",
+                    (excess,),
+                )
+                self.evictions += excess
+        return now
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._conn().execute("SELECT COUNT(*) FROM extractions").fetchone()[0]
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -1,72 +1,369 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import json
-from typing import Any, Dict, Optional
-import aiohttp
+import sqlite3
+import time
+from typing import Any, Dict, Optional, Sequence
 
+import llm_scheduler
+from deadline import Deadline, stage_timeout
+from llm_cache import LLMCache, text_hash
+from llm_scheduler import RateLimited, retry_after_seconds
 from settings import settings
+from text_window import CHARS_PER_TOKEN, reduce_text
 
 
-PROMPT = (
+PROMPT_HEADER = (
     "You are a strict information extraction tool. Given raw page text from an Amazon product, "
     "extract ONLY facts explicitly stated in the text. Do not infer or estimate. "
     "If a field is not clearly present, research and use relatively accurate estimates specific to the product. Convert units where needed. Return compact JSON.\n\n"
     "Fields to extract (null if not present):\n"
-    "- item_weight_kg: number in kilograms (exactly as stated; convert lb/oz/g to kg).\n"
-    "- shipping_weight_kg: number in kilograms (if a 'Shipping Weight' is explicitly stated).\n"
-    "- materials: array of material strings exactly as listed (e.g., 'HDPE', 'PET', 'Glass').\n"
-    "- materials_composition: array of { material: string, fraction: number in [0,1] } only if explicit percents/fractions are stated. Convert percent to fraction.\n"
-    "- packaging_materials: array of material strings for packaging if explicitly stated (e.g., 'cardboard', 'paper', 'plastic film').\n"
-    "- packaging_weight_kg: number in kilograms for packaging mass if explicitly stated.\n"
-    "- country_of_origin: string if explicitly stated.\n"
-    "Output keys: item_weight_kg, shipping_weight_kg, materials, materials_composition, packaging_materials, packaging_weight_kg, country_of_origin.\n"
 )
+FIELD_INSTRUCTIONS = {
+    "item_weight_kg": "number in kilograms (exactly as stated; convert lb/oz/g to kg).",
+    "shipping_weight_kg": "number in kilograms (if a 'Shipping Weight' is explicitly stated).",
+    "materials": "array of material strings exactly as listed (e.g., 'HDPE', 'PET', 'Glass').",
+    "materials_composition": "array of { material: string, fraction: number in [0,1] } only if explicit percents/fractions are stated. Convert percent to fraction.",
+    "packaging_materials": "array of material strings for packaging if explicitly stated (e.g., 'cardboard', 'paper', 'plastic film').",
+    "packaging_weight_kg": "number in kilograms for packaging mass if explicitly stated.",
+    "country_of_origin": "string if explicitly stated.",
+}
+FIELDS = tuple(FIELD_INSTRUCTIONS)
+LIST_FIELDS = {"materials", "materials_composition", "packaging_materials"}
 
 
-async def extract_facts_claude(raw_text: str) -> Dict[str, Any]:
-    if not settings.ANTHROPIC_API_KEY:
-        return {"item_weight_kg": None, "shipping_weight_kg": None, "materials": [], "country_of_origin": None}
+def build_prompt(fields=FIELDS) -> str:
+    """The extraction prompt asking for `fields` only."""
+    lines = "".join(f"- {f}: {FIELD_INSTRUCTIONS[f]}\n" for f in fields)
+    return PROMPT_HEADER + lines + f"Output keys: {', '.join(fields)}.\n"
 
-    headers = {
+
+def prompt_version(prompt: str) -> str:
+    # Changes whenever the prompt does, so answers cached for an older prompt are never served
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+
+
+PROMPT = build_prompt()
+
+
+MODEL = "claude-3-haiku-20240307"
+PROMPT_VERSION = prompt_version(PROMPT)
+
+llm_cache: Optional[LLMCache] = (
+    LLMCache(settings.LLM_CACHE_PATH, settings.LLM_CACHE_MAX_ENTRIES) if settings.LLM_CACHE_ENABLED else None
+)
+
+
+def _empty() -> Dict[str, Any]:
+    return {"item_weight_kg": None, "shipping_weight_kg": None, "materials": [], "country_of_origin": None}
+
+
+def _requested(fields: Optional[Sequence[str]]) -> tuple:
+    # In FIELDS order, so the same set of fields always builds the same prompt
+    return tuple(f for f in FIELDS if f in fields) if fields is not None else FIELDS
+
+
+def _with_provenance(result: Dict[str, Any], version: str, cached: bool, extracted_at: float) -> Dict[str, Any]:
+    """Attach where each extracted field came from under `provenance`."""
+    source = {"tier": "llm", "model": MODEL, "prompt_version": version, "cached": cached, "extracted_at": extracted_at}
+    result = dict(result)
+    result["provenance"] = {f: dict(source) for f in FIELDS if result.get(f) not in (None, [])}
+    return result
+
+
+async def _cached(digest: str, version: str) -> Optional[Dict[str, Any]]:
+    if llm_cache is None:
+        return None
+    try:
+        return await asyncio.to_thread(llm_cache.get, digest, version, MODEL)
+    except sqlite3.Error as e:
+        print(f"WARNING: LLM cache lookup failed: {e}")
+        return None
+
+
+async def _store(digest: str, version: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    """Cache a fresh result and return it with provenance."""
+    extracted_at = time.time()
+    if llm_cache is not None:
+        try:
+            extracted_at = await asyncio.to_thread(llm_cache.put, digest, version, MODEL, result)
+        except sqlite3.Error as e:
+            print(f"WARNING: LLM cache store failed: {e}")
+    return _with_provenance(result, version, False, extracted_at)
+
+
+async def extract_facts_claude(
+    raw_text: str,
+    deadline: Optional[Deadline] = None,
+    fields: Optional[Sequence[str]] = None,
+    lane: str = "interactive",
+) -> Dict[str, Any]:
+    """Facts stated in `raw_text`; `fields` limits the request to those keys (default: all of FIELDS).
+
+    `lane` is the scheduler lane the request waits in (see llm_scheduler).
+    """
+    if not settings.ANTHROPIC_API_KEY or (deadline is not None and deadline.expired):
+        return _empty()
+
+    fields = _requested(fields)
+    if not fields:
+        return _empty()
+    prompt = build_prompt(fields)
+    version = prompt_version(prompt)
+    # Only the parts of the page that state facts, within the input token budget
+    text = reduce_text(raw_text, settings.LLM_INPUT_TOKEN_BUDGET)
+    digest = text_hash(text)
+    hit = await _cached(digest, version)
+    if hit is not None:
+        return _with_provenance(hit["result"], version, True, hit["created_at"])
+
+    result = await _call_claude(prompt, fields, text, deadline, lane)
+    if result is None:
+        return _empty()
+    return await _store(digest, version, result)
+
+
+def _normalize(parsed: Any, fields: Sequence[str]) -> Optional[Dict[str, Any]]:
+    # Normalize types; keys that weren't asked for are dropped
+    if not isinstance(parsed, dict):
+        return None
+    return {f: (parsed.get(f) or []) if f in LIST_FIELDS else parsed.get(f) for f in fields}
+
+
+def _headers() -> Dict[str, str]:
+    return {
         "x-api-key": settings.ANTHROPIC_API_KEY,
         "anthropic-version": "2023-06-01",
         "content-type": "application/json",
     }
-    body = {
-        "model": "claude-3-haiku-20240307",
-        "max_tokens": 400,
+
+
+def _message_params(content: str, max_tokens: int) -> Dict[str, Any]:
+    return {
+        "model": MODEL,
+        "max_tokens": max_tokens,
         "messages": [
-            {"role": "user", "content": PROMPT + "\nTEXT:\n" + raw_text[:8000]},
+            {"role": "user", "content": content},
         ],
         "temperature": 0.0,
     }
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post("https://api.anthropic.com/v1/messages", headers=headers, data=json.dumps(body)) as resp:
+
+
+def _message_text(data: Dict[str, Any]) -> str:
+    # Response content is an array of content blocks; take the first text block
+    content = data.get("content", [])
+    if content and isinstance(content, list) and content[0].get("type") == "text":
+        return content[0].get("text", "")
+    return ""
+
+
+def _usage(data: Optional[Dict[str, Any]]) -> Optional[int]:
+    usage = (data or {}).get("usage") or {}
+    if "input_tokens" not in usage:
+        return None
+    return int(usage["input_tokens"]) + int(usage.get("output_tokens") or 0)
+
+
+async def _post_messages(
+    content: str, max_tokens: int, deadline: Optional[Deadline], lane: str = "interactive"
+) -> Optional[str]:
+    """The reply text of one Messages API request, sent through the shared scheduler; None on any error."""
+    import aiohttp
+
+    async def call() -> Optional[Dict[str, Any]]:
+        # Timed from when the scheduler lets the request start
+        timeout = aiohttp.ClientTimeout(total=stage_timeout(deadline, settings.LLM_TIMEOUT))
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            body = json.dumps(_message_params(content, max_tokens))
+            async with session.post(f"{settings.ANTHROPIC_API_URL}/v1/messages", headers=_headers(), data=body) as resp:
+                if resp.status in (429, 529):
+                    raise RateLimited(resp.status, retry_after_seconds(resp.headers.get("retry-after")))
                 if resp.status != 200:
                     error_text = await resp.text()
                     print(f"CLAUDE API ERROR: Status {resp.status} - {error_text}")
-                    return {"item_weight_kg": None, "shipping_weight_kg": None, "materials": [], "country_of_origin": None}
-                data = await resp.json()
-                # Response content is an array of content blocks; take the first text block
-                content = data.get("content", [])
-                text = ""
-                if content and isinstance(content, list) and content[0].get("type") == "text":
-                    text = content[0].get("text", "")
-                # Try parsing as JSON, else return empty
-                try:
-                    parsed = json.loads(text)
-                    # Normalize types
-                    return {
-                        "item_weight_kg": parsed.get("item_weight_kg"),
-                        "shipping_weight_kg": parsed.get("shipping_weight_kg"),
-                        "materials": parsed.get("materials") or [],
-                        "materials_composition": parsed.get("materials_composition") or [],
-                        "packaging_materials": parsed.get("packaging_materials") or [],
-                        "packaging_weight_kg": parsed.get("packaging_weight_kg"),
-                        "country_of_origin": parsed.get("country_of_origin"),
-                    }
-                except Exception:
-                    return {"item_weight_kg": None, "shipping_weight_kg": None, "materials": [], "country_of_origin": None}
+                    return None
+                return await resp.json()
+
+    estimated_tokens = len(content) // CHARS_PER_TOKEN + max_tokens
+    try:
+        data = await llm_scheduler.scheduler.submit(call, estimated_tokens, lane=lane, deadline=deadline, usage=_usage)
+    except RateLimited as e:
+        print(f"CLAUDE API ERROR: {e}, giving up after retries")
+        return None
+    except Exception:
+        return None
+    return _message_text(data) if data is not None else None
+
+
+async def _call_claude(
+    prompt: str, fields: Sequence[str], text: str, deadline: Optional[Deadline], lane: str = "interactive"
+) -> Optional[Dict[str, Any]]:
+    """One extraction request; None on any error, so failures are never cached."""
+    reply = await _post_messages(prompt + "\nTEXT:\n" + text, 400, deadline, lane)
+    try:
+        return _normalize(json.loads(reply), fields) if reply is not None else None
+    except Exception:
+        return None
+
+
+# ---------- Batches ----------
+
+BATCH_INSTRUCTIONS = (
+    "The text below holds several products, each starting with a line '### ITEM <id>'. "
+    "Return one JSON object that maps every item id to an object with the output keys above.\n"
+)
+
+
+def _batch_content(prompt: str, texts: Dict[str, str]) -> str:
+    items = "".join(f"### ITEM {item_id}\n{text}\n" for item_id, text in texts.items())
+    return prompt + BATCH_INSTRUCTIONS + "\nTEXT:\n" + items
+
+
+async def _call_claude_batch(
+    prompt: str, fields: Sequence[str], texts: Dict[str, str], deadline: Optional[Deadline], lane: str
+) -> Dict[str, Dict[str, Any]]:
+    """One request for several products; only the items whose answer parsed are returned."""
+    # Items are numbered within the request, so caller ids never reach the prompt
+    numbered = {str(n): item_id for n, item_id in enumerate(texts, 1)}
+    content = _batch_content(prompt, {n: texts[item_id] for n, item_id in numbered.items()})
+    reply = await _post_messages(content, 400 * len(texts), deadline, lane)
+    try:
+        parsed = json.loads(reply) if reply is not None else {}
     except Exception:
-        return {"item_weight_kg": None, "shipping_weight_kg": None, "materials": [], "country_of_origin": None}
+        parsed = {}
+    if not isinstance(parsed, dict):
+        return {}
+    results = {}
+    for n, item_id in numbered.items():
+        result = _normalize(parsed.get(n), fields)
+        if result is not None:
+            results[item_id] = result
+    return results
+
+
+async def extract_facts_claude_batch(
+    texts: Dict[str, str],
+    deadline: Optional[Deadline] = None,
+    fields: Optional[Sequence[str]] = None,
+    lane: str = "batch",
+) -> Dict[str, Dict[str, Any]]:
+    """`extract_facts_claude` for several products (id -> text), packed `LLM_BATCH_SIZE` to a request.
+
+    Items whose answer is missing or unparseable are retried on their own batch, up to
+    `LLM_BATCH_RETRIES` times; the rest come back empty. Results share cache entries with
+    `extract_facts_claude`, since both ask the same question of the same text. Requests wait
+    in the "batch" scheduler lane by default, behind interactive ones.
+    """
+    if not settings.ANTHROPIC_API_KEY or (deadline is not None and deadline.expired):
+        return {item_id: _empty() for item_id in texts}
+    fields = _requested(fields)
+    if not fields:
+        return {item_id: _empty() for item_id in texts}
+    if len(texts) == 1:
+        ((item_id, text),) = texts.items()
+        return {item_id: await extract_facts_claude(text, deadline=deadline, fields=fields, lane=lane)}
+
+    prompt = build_prompt(fields)
+    version = prompt_version(prompt)
+    reduced = {item_id: reduce_text(text, settings.LLM_INPUT_TOKEN_BUDGET) for item_id, text in texts.items()}
+    digests = {item_id: text_hash(text) for item_id, text in reduced.items()}
+    results: Dict[str, Dict[str, Any]] = {}
+    pending = []
+    for item_id, digest in digests.items():
+        hit = await _cached(digest, version)
+        if hit is not None:
+            results[item_id] = _with_provenance(hit["result"], version, True, hit["created_at"])
+        else:
+            pending.append(item_id)
+
+    size = max(1, settings.LLM_BATCH_SIZE)
+    for _ in range(1 + max(0, settings.LLM_BATCH_RETRIES)):
+        if not pending or (deadline is not None and deadline.expired):
+            break
+        chunks = [pending[i:i + size] for i in range(0, len(pending), size)]
+        answers = await asyncio.gather(
+            *[
+                _call_claude_batch(prompt, fields, {item_id: reduced[item_id] for item_id in chunk}, deadline, lane)
+                for chunk in chunks
+            ]
+        )
+        for answer in answers:
+            for item_id, result in answer.items():
+                results[item_id] = await _store(digests[item_id], version, result)
+        pending = [item_id for item_id in pending if item_id not in results]
+
+    for item_id in pending:
+        results[item_id] = _empty()
+    return {item_id: results[item_id] for item_id in texts}
+
+
+async def submit_extraction_batch(texts: Dict[str, str], fields: Optional[Sequence[str]] = None) -> Optional[str]:
+    """Queue one extraction per product (id -> text) with the Message Batches API, for offline jobs.
+
+    Ids must be 1-64 characters of letters, digits, '-' and '_'. Returns the batch id, or None on error.
+    """
+    fields = _requested(fields)
+    prompt = build_prompt(fields)
+    requests = [
+        {
+            "custom_id": item_id,
+            "params": _message_params(prompt + "\nTEXT:\n" + reduce_text(text, settings.LLM_INPUT_TOKEN_BUDGET), 400),
+        }
+        for item_id, text in texts.items()
+    ]
+    import aiohttp
+
+    try:
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=settings.LLM_TIMEOUT)) as session:
+            async with session.post(
+                f"{settings.ANTHROPIC_API_URL}/v1/messages/batches", headers=_headers(), data=json.dumps({"requests": requests})
+            ) as resp:
+                if resp.status != 200:
+                    print(f"CLAUDE BATCH ERROR: Status {resp.status} - {await resp.text()}")
+                    return None
+                return (await resp.json()).get("id")
+    except Exception as e:
+        print(f"CLAUDE BATCH ERROR: {e}")
+        return None
+
+
+async def collect_extraction_batch(
+    batch_id: str, texts: Dict[str, str], fields: Optional[Sequence[str]] = None
+) -> Optional[Dict[str, Dict[str, Any]]]:
+    """Results of a submitted batch (id -> facts), or None while it is still processing.
+
+    Pass the same `texts` and `fields` given to `submit_extraction_batch`; successful
+    answers are stored in the cache so the online path reuses them.
+    """
+    fields = _requested(fields)
+    version = prompt_version(build_prompt(fields))
+    import aiohttp
+
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=settings.LLM_TIMEOUT)) as session:
+        url = f"{settings.ANTHROPIC_API_URL}/v1/messages/batches/{batch_id}"
+        async with session.get(url, headers=_headers()) as resp:
+            resp.raise_for_status()
+            batch = await resp.json()
+        if batch.get("processing_status") != "ended":
+            return None
+        async with session.get(batch["results_url"], headers=_headers()) as resp:
+            resp.raise_for_status()
+            lines = (await resp.text()).splitlines()
+
+    results = {item_id: _empty() for item_id in texts}
+    for line in lines:
+        entry = json.loads(line) if line.strip() else {}
+        item_id = entry.get("custom_id")
+        outcome = entry.get("result") or {}
+        if item_id not in texts or outcome.get("type") != "succeeded":
+            continue
+        try:
+            result = _normalize(json.loads(_message_text(outcome.get("message") or {})), fields)
+        except Exception:
+            result = None
+        if result is not None:
+            digest = text_hash(reduce_text(texts[item_id], settings.LLM_INPUT_TOKEN_BUDGET))
+            results[item_id] = await _store(digest, version, result)
+    return results
@@ -0,0 +1,207 @@
+"""
+Shared scheduler for Anthropic API calls.
+
+Every LLM request in the backend goes through one `LLMScheduler`, which
+
+- caps how many requests are in flight at once,
+- keeps a sliding one-minute count of tokens (estimated when a request starts,
+  corrected with the reported usage when it ends) and holds new requests while
+  the next one would exceed the per-minute budget,
+- retries calls the API rejected with 429 (rate limited) or 529 (overloaded)
+  after a backoff with jitter. The backoff uses Retry-After when the response
+  has one and pauses the whole scheduler, since the limits are per account.
+- serves waiting requests by lane: "interactive" (a user is waiting on the
+  answer) always goes before "batch" (similar-product enrichment, offline
+  jobs). Within a lane, requests are served in arrival order.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple, TypeVar
+
+from deadline import Deadline
+from settings import settings
+
+T = TypeVar("T")
+
+LANES = {"interactive": 0, "batch": 1}
+WINDOW_S = 60.0
+
+
+class RateLimited(Exception):
+    """Raised by a scheduled call when the API answered 429 or 529."""
+
+    def __init__(self, status: int, retry_after: Optional[float] = None):
+        super().__init__(f"Anthropic API returned {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    try:
+        return max(0.0, float(value)) if value else None
+    except ValueError:
+        return None
+
+
+class LLMScheduler:
+    def __init__(
+        self,
+        max_concurrency: int,
+        tokens_per_minute: int,
+        max_retries: int = 3,
+        base_backoff_s: float = 1.0,
+        max_backoff_s: float = 30.0,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.tokens_per_minute = max(1, tokens_per_minute)
+        self.max_retries = max(0, max_retries)
+        self.base_backoff_s = base_backoff_s
+        self.max_backoff_s = max_backoff_s
+        self._active = 0
+        # (lane priority, arrival, tokens, future granted with the window entry)
+        self._waiters: List[Tuple[int, int, int, asyncio.Future]] = []
+        self._arrivals = itertools.count()
+        # [started_at, tokens] per request in the last minute; entries are corrected in place
+        self._window: Deque[List[float]] = deque()
+        self._paused_until = 0.0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.started = 0
+        self.rate_limited = 0
+        self.gave_up = 0
+        self.waited_s = 0.0
+
+    def _tokens_in_window(self, now: float) -> float:
+        while self._window and self._window[0][0] <= now - WINDOW_S:
+            self._window.popleft()
+        return sum(entry[1] for entry in self._window)
+
+    def _wake(self) -> None:
+        """Start waiting requests, best lane first, while a slot and the token budget allow."""
+        now = time.monotonic()
+        while self._waiters and self._active < self.max_concurrency:
+            _, _, tokens, fut = self._waiters[0]
+            if fut.done():
+                # Cancelled while waiting
+                heapq.heappop(self._waiters)
+                continue
+            wait = self._paused_until - now
+            used = self._tokens_in_window(now)
+            # A request larger than the whole budget still runs, alone in its window
+            if wait <= 0 and used and used + tokens > self.tokens_per_minute:
+                wait = self._window[0][0] + WINDOW_S - now
+            if wait > 0:
+                self._wake_in(wait)
+                return
+            heapq.heappop(self._waiters)
+            entry = [now, float(tokens)]
+            self._window.append(entry)
+            self._active += 1
+            self.started += 1
+            fut.set_result(entry)
+
+    def _wake_in(self, delay: float) -> None:
+        loop = asyncio.get_running_loop()
+        timer = self._timer
+        if timer is not None and self._timer_loop is loop and not timer.cancelled() and timer.when() <= loop.time() + delay:
+            return
+        if timer is not None:
+            timer.cancel()
+        self._timer, self._timer_loop = loop.call_later(delay, self._wake), loop
+
+    async def _acquire(self, lane: str, tokens: int) -> List[float]:
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (LANES[lane], next(self._arrivals), tokens, fut))
+        self._wake()
+        try:
+            return await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # Granted just as the caller gave up
+                self._release()
+            raise
+
+    def _release(self) -> None:
+        self._active -= 1
+        self._wake()
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        if retry_after is not None:
+            return min(self.max_backoff_s, retry_after) + random.uniform(0, self.base_backoff_s)
+        # Full jitter, so callers that were rejected together don't retry together
+        return random.uniform(0, min(self.max_backoff_s, self.base_backoff_s * 2**attempt))
+
+    async def submit(
+        self,
+        call: Callable[[], Awaitable[T]],
+        estimated_tokens: int,
+        lane: str = "interactive",
+        deadline: Optional[Deadline] = None,
+        usage: Optional[Callable[[T], Optional[int]]] = None,
+    ) -> T:
+        """Run `call` when the scheduler allows, retrying it on `RateLimited`.
+
+        `usage` reads the tokens a result actually used, to correct the estimate.
+        Raises the last `RateLimited` when retries run out, and `asyncio.TimeoutError`
+        if `deadline` passes while waiting.
+        """
+        if lane not in LANES:
+            raise ValueError(f"unknown LLM lane {lane!r}")
+        attempt = 0
+        while True:
+            queued = time.monotonic()
+            acquire = self._acquire(lane, estimated_tokens)
+            entry = await (asyncio.wait_for(acquire, deadline.remaining()) if deadline is not None else acquire)
+            self.waited_s += time.monotonic() - queued
+            try:
+                result = await call()
+            except RateLimited as e:
+                self.rate_limited += 1
+                if attempt >= self.max_retries:
+                    self.gave_up += 1
+                    raise
+                limited = e
+                delay = self._backoff(attempt, e.retry_after)
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            else:
+                used = usage(result) if usage is not None else None
+                if used is not None:
+                    entry[1] = float(used)
+                return result
+            finally:
+                self._release()
+            if deadline is not None and deadline.remaining() < delay:
+                self.gave_up += 1
+                raise limited
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self._active,
+            "waiting": {lane: sum(1 for w in self._waiters if w[0] == p and not w[3].done()) for lane, p in LANES.items()},
+            "max_concurrency": self.max_concurrency,
+            "tokens_per_minute": self.tokens_per_minute,
+            "tokens_last_minute": int(self._tokens_in_window(time.monotonic())),
+            "paused_for_s": round(max(0.0, self._paused_until - time.monotonic()), 3),
+            "started": self.started,
+            "rate_limited": self.rate_limited,
+            "gave_up": self.gave_up,
+            "waited_s": round(self.waited_s, 3),
+        }
+
+
+scheduler = LLMScheduler(
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    tokens_per_minute=settings.LLM_TOKENS_PER_MINUTE,
+    max_retries=settings.LLM_RATE_LIMIT_RETRIES,
+    base_backoff_s=settings.LLM_BACKOFF_BASE_S,
+    max_backoff_s=settings.LLM_BACKOFF_MAX_S,
+)
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Open-loop load generator for the analysis API.
+
+Fires requests at a fixed target rate (independent of response times) against
+/api/analyze, /api/analyze-product and /api/similar, then reports per-endpoint
+throughput and p50/p95/p99 latency.
+
+Usage (with fake_providers.py on :9100 and the API on :8001):
+    python loadgen.py --base-url http://127.0.0.1:8001 --rps 20 --duration 30 \\
+        --product-base http://127.0.0.1:9100 --mix analyze=5,analyze-product=3,similar=1
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+import aiohttp
+
+
+ENDPOINTS = {
+    "analyze": "/api/analyze",
+    "analyze-product": "/api/analyze-product",
+    "similar": "/api/similar",
+}
+
+
+class EndpointStats:
+    def __init__(self) -> None:
+        self.latencies_ms: List[float] = []
+        self.statuses: Counter = Counter()
+        self.errors = 0
+        self.elapsed_s = 0.0
+
+    def record(self, latency_ms: float, status: Optional[int]) -> None:
+        self.latencies_ms.append(latency_ms)
+        if status is None:
+            self.errors += 1
+            self.statuses["conn_error"] += 1
+        else:
+            self.statuses[str(status)] += 1
+            if status >= 400:
+                self.errors += 1
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile; 0.0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100.0 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix: Dict[str, float] = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise SystemExit(f"Unknown endpoint '{name}' (choose from {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+async def _fire(
+    session: aiohttp.ClientSession,
+    base_url: str,
+    endpoint: str,
+    payload: dict,
+    stats: EndpointStats,
+) -> None:
+    start = time.perf_counter()
+    status: Optional[int] = None
+    try:
+        async with session.post(base_url + ENDPOINTS[endpoint], json=payload) as resp:
+            await resp.read()
+            status = resp.status
+    except Exception:
+        status = None
+    stats.record((time.perf_counter() - start) * 1000.0, status)
+
+
+async def run_load(
+    base_url: str,
+    rps: float,
+    duration_s: float,
+    mix: Dict[str, float],
+    product_urls: List[str],
+    destination: str = "Boston",
+    origin: Optional[str] = "Shenzhen",
+    timeout_s: float = 120.0,
+) -> Dict[str, EndpointStats]:
+    stats = {name: EndpointStats() for name in mix}
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    interval = 1.0 / rps
+    tasks: List[asyncio.Task] = []
+
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout_s)) as session:
+        start = time.perf_counter()
+        n = 0
+        while True:
+            # Open loop: schedule by wall clock, never wait for responses
+            target = start + n * interval
+            if target - start >= duration_s:
+                break
+            delay = target - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            endpoint = random.choices(names, weights=weights)[0]
+            payload = {
+                "url": random.choice(product_urls),
+                "destination": destination,
+                "origin": origin,
+                "shipping_mode": "auto",
+            }
+            tasks.append(asyncio.create_task(_fire(session, base_url, endpoint, payload, stats[endpoint])))
+            n += 1
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+
+    for s in stats.values():
+        s.elapsed_s = elapsed
+    return stats
+
+
+def print_report(stats: Dict[str, EndpointStats], target_rps: float) -> None:
+    print(f"\nLOAD TEST REPORT (target {target_rps:g} rps)")
+    print("=" * 86)
+    print(f"{'endpoint':<17}{'requests':>9}{'errors':>8}{'thru/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  statuses")
+    print("-" * 86)
+    for name, s in stats.items():
+        elapsed = s.elapsed_s or 1.0
+        ok = len(s.latencies_ms) - s.errors
+        statuses = " ".join(f"{k}:{v}" for k, v in sorted(s.statuses.items()))
+        print(
+            f"{name:<17}{len(s.latencies_ms):>9}{s.errors:>8}{ok / elapsed:>9.2f}"
+            f"{percentile(s.latencies_ms, 50):>10.1f}{percentile(s.latencies_ms, 95):>10.1f}"
+            f"{percentile(s.latencies_ms, 99):>10.1f}  {statuses}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Drive the analysis API at a target request rate")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8001")
+    parser.add_argument("--rps", type=float, default=10.0)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to keep sending")
+    parser.add_argument("--mix", default="analyze=5,analyze-product=3,similar=1", help="Weighted endpoint mix")
+    parser.add_argument("--product-base", default="http://127.0.0.1:9100", help="Base URL serving /dp/{asin} pages")
+    parser.add_argument("--asins", default="B0CYLKRRQX,B01741GFR4,B0DTQCFGX3,B00MW8G62E,B0C8V88Z9D")
+    parser.add_argument("--destination", default="Boston")
+    parser.add_argument("--origin", default="Shenzhen")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request client timeout in seconds")
+    args = parser.parse_args()
+
+    product_urls = [f"{args.product_base.rstrip('/')}/dp/{a.strip()}" for a in args.asins.split(",") if a.strip()]
+    stats = asyncio.run(
+        run_load(
+            args.base_url.rstrip("/"),
+            args.rps,
+            args.duration,
+            parse_mix(args.mix),
+            product_urls,
+            destination=args.destination,
+            origin=args.origin,
+            timeout_s=args.timeout,
+        )
+    )
+    print_report(stats, args.rps)
+
+
+if __name__ == "__main__":
+    main()
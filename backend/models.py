@@ -18,6 +18,22 @@ class AnalyzeRequest(BaseModel):
     shipping_mode: Optional[str] = Field(
         "auto", description="one of: auto, ground, air, sea"
     )
+    deadline_s: Optional[float] = Field(
+        None, gt=0, description="Overall time budget in seconds (capped by the server's ANALYZE_DEADLINE)"
+    )
+    hedge: Optional[bool] = Field(
+        None, description="Race fetch strategies for lower tail latency (defaults to the server's SCRAPE_HEDGE)"
+    )
+    fields: Optional[list[str]] = Field(
+        None, description="Only return these response fields, as dotted paths (e.g. 'total_kgco2e', 'product.title')"
+    )
+    include: Optional[list[str]] = Field(
+        None, description="Opt in to heavy fields left out by default (e.g. 'product.raw')"
+    )
+
+
+class CoverageRequest(BaseModel):
+    asins: list[str] = Field(..., max_length=5000, description="ASINs to check")
 
 
 class ProductInfo(BaseModel):
@@ -34,6 +50,8 @@ class ProductInfo(BaseModel):
     bullets: list[str] = []
     materials: list[str] = []
     images: list[str] = []
+    country_of_origin: Optional[str] = None
+    manufacturer: Optional[str] = None
     raw: dict[str, Any] = {}
 
 
@@ -0,0 +1,191 @@
+"""
+On-disk cache of fetched pages.
+
+Pages are stored gzip-compressed under a key derived from the URL: the host
+plus ASIN for product pages (so /dp/X, /gp/product/X and tracking-laden
+variants share one entry), otherwise a hash of the normalized URL. Each entry
+keeps the ETag/Last-Modified validators so a stale page can be revalidated
+with a conditional GET. Entries older than the TTL are stale; total size on
+disk is capped by evicting the least recently used entries.
+
+Methods do blocking file I/O; async callers run them in a thread.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+_ASIN_RE = re.compile(r"/(?:dp|gp/product|gp/aw/d)/([A-Z0-9]{10})(?:[/?]|$)")
+# Query parameters that don't change the page content
+_TRACKING_PARAMS = {"ref", "ref_", "tag", "psc", "th", "smid", "pd_rd_i", "pd_rd_r", "pd_rd_w", "pd_rd_wg", "pf_rd_p", "pf_rd_r", "qid", "sr", "crid", "sprefix"}
+
+
+def normalize_url(url: str) -> str:
+    parsed = urlparse(str(url))
+    host = (parsed.hostname or "").lower()
+    if host.startswith("m.amazon."):
+        host = "www." + host[2:]
+    query = sorted((k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True) if k not in _TRACKING_PARAMS)
+    path = parsed.path.rstrip("/") or "/"
+    return f"{parsed.scheme.lower() or 'https'}://{host}{path}" + (f"?{urlencode(query)}" if query else "")
+
+
+def cache_key(url: str) -> str:
+    normalized = normalize_url(url)
+    match = _ASIN_RE.search(urlparse(normalized).path + "/")
+    if match:
+        host = urlparse(normalized).hostname or ""
+        return f"{host.replace('.', '_')}-{match.group(1)}"
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:32]
+
+
+class CachedPage:
+    def __init__(self, html: str, meta: Dict[str, object], fresh: bool):
+        self.html = html
+        self.meta = meta
+        self.fresh = fresh
+
+    @property
+    def validators(self) -> Dict[str, str]:
+        """Conditional request headers for revalidating this page."""
+        headers = {}
+        if self.meta.get("etag"):
+            headers["If-None-Match"] = str(self.meta["etag"])
+        if self.meta.get("last_modified"):
+            headers["If-Modified-Since"] = str(self.meta["last_modified"])
+        return headers
+
+
+class PageCache:
+    def __init__(self, directory: str | Path, ttl_s: float, max_bytes: int):
+        self.directory = Path(directory)
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # key -> (bytes on disk, last access); loaded from the directory on first use
+        self._index: Optional[Dict[str, Tuple[int, float]]] = None
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.evictions = 0
+
+    def _paths(self, key: str) -> Tuple[Path, Path]:
+        return self.directory / f"{key}.html.gz", self.directory / f"{key}.json"
+
+    def _load_index(self) -> Dict[str, Tuple[int, float]]:
+        if self._index is None:
+            self._index = {}
+            self.directory.mkdir(parents=True, exist_ok=True)
+            for page in self.directory.glob("*.html.gz"):
+                key = page.name[: -len(".html.gz")]
+                meta = page.with_name(f"{key}.json")
+                try:
+                    st = page.stat()
+                    size = st.st_size + (meta.stat().st_size if meta.exists() else 0)
+                except OSError:
+                    continue
+                self._index[key] = (size, st.st_mtime)
+        return self._index
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        key = cache_key(url)
+        page_path, meta_path = self._paths(key)
+        with self._lock:
+            index = self._load_index()
+            if key not in index:
+                self.misses += 1
+                return None
+            try:
+                meta = json.loads(meta_path.read_text())
+                html = gzip.decompress(page_path.read_bytes()).decode("utf-8")
+            except (OSError, ValueError):
+                self._remove(key)
+                self.misses += 1
+                return None
+            index[key] = (index[key][0], time.time())
+            try:
+                # mtime doubles as last access, so LRU order survives restarts
+                os.utime(page_path)
+            except OSError:
+                pass
+            fresh = time.time() - float(meta.get("fetched_at", 0)) < self.ttl_s
+            if fresh:
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+            return CachedPage(html, meta, fresh)
+
+    def put(self, url: str, html: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> None:
+        key = cache_key(url)
+        page_path, meta_path = self._paths(key)
+        data = gzip.compress(html.encode("utf-8"), compresslevel=5)
+        meta = json.dumps(
+            {"url": str(url), "etag": etag, "last_modified": last_modified, "fetched_at": time.time(), "bytes": len(html)}
+        )
+        with self._lock:
+            index = self._load_index()
+            # Write then rename so a concurrent reader never sees half a page
+            for path, payload in ((page_path, data), (meta_path, meta.encode("utf-8"))):
+                tmp = path.with_suffix(path.suffix + ".tmp")
+                tmp.write_bytes(payload)
+                os.replace(tmp, path)
+            index[key] = (len(data) + len(meta), time.time())
+            self._evict(index)
+
+    def mark_revalidated(self, url: str) -> None:
+        """Restart the TTL of an entry after the origin answered 304 Not Modified."""
+        key = cache_key(url)
+        _, meta_path = self._paths(key)
+        with self._lock:
+            try:
+                meta = json.loads(meta_path.read_text())
+            except (OSError, ValueError):
+                return
+            meta["fetched_at"] = time.time()
+            meta_path.write_text(json.dumps(meta))
+            self.revalidated += 1
+
+    def _remove(self, key: str) -> None:
+        for path in self._paths(key):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+        if self._index is not None:
+            self._index.pop(key, None)
+
+    def _evict(self, index: Dict[str, Tuple[int, float]]) -> None:
+        total = sum(size for size, _ in index.values())
+        if total <= self.max_bytes:
+            return
+        for key, (size, _) in sorted(index.items(), key=lambda item: item[1][1]):
+            if total <= self.max_bytes:
+                break
+            self._remove(key)
+            total -= size
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            index = self._load_index()
+            return {
+                "entries": len(index),
+                "bytes": sum(size for size, _ in index.values()),
+                "max_bytes": self.max_bytes,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "revalidated": self.revalidated,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,66 @@
+"""
+Politeness scheduling for concurrent scraping.
+
+A HostScheduler caps how many jobs run at once overall and rate-limits new
+requests per host with a token bucket, so fanning out over several product
+pages doesn't hit one site with a burst it would answer with a robot check.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict
+from urllib.parse import urlparse
+
+
+class TokenBucket:
+    """`rate` tokens per second, holding at most `burst`; acquire() waits for a token."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = max(rate, 1e-6)
+        self.capacity = max(1.0, burst)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        # Waiters are served in arrival order
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            self._refill()
+            if self.tokens < 1.0:
+                await asyncio.sleep((1.0 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1.0
+
+
+class HostScheduler:
+    def __init__(self, max_concurrency: int, per_host_rate: float, per_host_burst: float):
+        self.max_concurrency = max(1, max_concurrency)
+        self.per_host_rate = per_host_rate
+        self.per_host_burst = per_host_burst
+        self._sem = asyncio.Semaphore(self.max_concurrency)
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def bucket(self, url: str) -> TokenBucket:
+        host = (urlparse(str(url)).hostname or "").lower()
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = TokenBucket(self.per_host_rate, self.per_host_burst)
+        return bucket
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """One of the `max_concurrency` job slots."""
+        async with self._sem:
+            yield
+
+    async def before_request(self, url: str) -> None:
+        """Wait until the URL's host may be sent another request."""
+        await self.bucket(url).acquire()
@@ -2,21 +2,27 @@ from __future__ import annotations
 
 import asyncio
 import re
-from typing import Optional
+import time
+from typing import TYPE_CHECKING, Awaitable, Callable, Optional
 
-import aiohttp
 import ssl
 import certifi
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 from typing import List, Dict, Any, Optional, Tuple
 import os
 import json
 
+from deadline import Deadline, DeadlineExceeded, stage_timeout
 from models import ProductInfo
+from page_cache import CachedPage, PageCache
 from settings import settings
+from strategy_scheduler import StrategyScheduler
 from utils import parse_price, parse_weight_kg, parse_dimensions_cm, clean_text
 
+if TYPE_CHECKING:
+    import aiohttp
+    from bs4 import BeautifulSoup
+
 
 HEADERS_BASE = {
     "accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
@@ -27,147 +33,510 @@ HEADERS_BASE = {
 }
 
 
-async def fetch_html(url: str) -> str:
-    headers = dict(HEADERS_BASE)
-    if settings.USER_AGENT:
-        headers["user-agent"] = settings.USER_AGENT
+DESKTOP_USER_AGENT = (
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0 Safari/537.36"
+)
+
+MOBILE_USER_AGENT = (
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 16_0 like Mac OS X) AppleWebKit/605.1.15 "
+    "(KHTML, like Gecko) Version/16.0 Mobile/15E148 Safari/604.1"
+)
+
+
+class _FetchContext:
+    """State handed to a fetch strategy for one attempt."""
+
+    def __init__(self, url: str, headers: Dict[str, str], session: "aiohttp.ClientSession"):
+        self.url = url
+        self.headers = headers
+        self.session = session
+        # Budget for this attempt; each attempt (including hedged racers) gets its own context
+        self.timeout_s: float = float(settings.REQUEST_TIMEOUT)
+        # Lower-cased headers of the final response, kept for cache validators
+        self.response_headers: Dict[str, str] = {}
+        # Product pages are streamed and cut off once the sections we parse have arrived
+        self.stream = settings.SCRAPE_STREAM and _is_product_url(url)
+        self.truncated = False
+
+    def client_timeout(self) -> "aiohttp.ClientTimeout":
+        import aiohttp
+
+        return aiohttp.ClientTimeout(total=self.timeout_s)
+
+
+async def _get_text(ctx: _FetchContext, target_url: str, ssl_ctx, session: "aiohttp.ClientSession | None" = None) -> str:
+    session = session or ctx.session
+    async with session.get(target_url, allow_redirects=True, ssl=ssl_ctx, timeout=ctx.client_timeout()) as resp:
+        resp.raise_for_status()
+        ctx.response_headers = {k.lower(): v for k, v in resp.headers.items()}
+        if ctx.stream:
+            return await _read_streaming(ctx, resp)
+        return await resp.text()
+
+
+async def _read_streaming(ctx: _FetchContext, resp: "aiohttp.ClientResponse") -> str:
+    """Read the body in chunks, stopping once the watched sections are complete or at SCRAPE_STREAM_MAX_BYTES.
+
+    A cut-off page is just unclosed HTML, which both parsers handle; a multi-byte character split at the
+    cut is dropped by the incremental decoder.
+    """
+    import codecs
+
+    from fast_parse import SectionWatcher
+
+    try:
+        decoder = codecs.getincrementaldecoder(resp.charset or "utf-8")(errors="replace")
+    except LookupError:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    watcher = SectionWatcher.create()
+    parts: List[str] = []
+    received = 0
+    async for chunk in resp.content.iter_chunked(64 * 1024):
+        received += len(chunk)
+        text = decoder.decode(chunk)
+        parts.append(text)
+        if (watcher is not None and watcher.feed(text)) or received >= settings.SCRAPE_STREAM_MAX_BYTES:
+            ctx.truncated = not resp.content.at_eof()
+            break
     else:
-        headers["user-agent"] = (
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0 Safari/537.36"
+        parts.append(decoder.decode(b"", final=True))
+    return "".join(parts)
+
+
+# 1) Direct with proper SSL
+async def _fetch_direct(ctx: _FetchContext) -> str:
+    ssl_ctx = ssl.create_default_context(cafile=certifi.where())
+    return await _get_text(ctx, ctx.url, ssl_ctx)
+
+
+# 2) Direct with less strict SSL (fallback)
+async def _fetch_insecure(ctx: _FetchContext) -> str:
+    insecure_ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    insecure_ctx.check_hostname = False
+    insecure_ctx.verify_mode = ssl.CERT_NONE
+    return await _get_text(ctx, ctx.url, insecure_ctx)
+
+
+# 3) Mobile user-agent (some Amazon pages are laxer on m-dot)
+async def _fetch_mobile(ctx: _FetchContext) -> str:
+    import aiohttp
+
+    m_headers = dict(ctx.headers)
+    m_headers["user-agent"] = MOBILE_USER_AGENT
+    async with aiohttp.ClientSession(headers=m_headers) as m_session:
+        ssl_ctx = ssl.create_default_context(cafile=certifi.where())
+        return await _get_text(ctx, ctx.url.replace("www.amazon.", "m.amazon."), ssl_ctx, session=m_session)
+
+
+# 4) curl_cffi to better mimic a browser without headless overhead
+async def _fetch_curl_cffi(ctx: _FetchContext) -> str:
+    from curl_cffi.requests import AsyncSession  # type: ignore
+
+    # Async session so the request runs on the event loop instead of blocking it
+    async with AsyncSession() as cffi_session:
+        resp = await cffi_session.get(
+            ctx.url,
+            headers=ctx.headers,
+            impersonate=settings.CURL_CFFI_IMPERSONATE,
+            timeout=ctx.timeout_s,
+            allow_redirects=True,
+            verify=True,
         )
+    resp.raise_for_status()
+    ctx.response_headers = {k.lower(): v for k, v in resp.headers.items()}
+    return resp.text
 
-    timeout = aiohttp.ClientTimeout(total=settings.REQUEST_TIMEOUT)
 
-    # Try multiple strategies: direct, relaxed SSL, and optional scraper API
-    async def _try(session: aiohttp.ClientSession, target_url: str, ssl_ctx):
-        async with session.get(target_url, allow_redirects=True, ssl=ssl_ctx) as resp:
-            resp.raise_for_status()
-            return await resp.text()
+# 5) Playwright headless browser, can render and bypass lightweight bot checks
+async def _render_playwright_page(page, url: str) -> str:
+    await page.goto(url, wait_until="domcontentloaded")
+    # Try scrolling a bit then wait network idle
+    await page.wait_for_timeout(500)
+    await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+    await page.wait_for_load_state("networkidle")
+    return await page.content()
 
-    async with aiohttp.ClientSession(timeout=timeout, headers=headers) as session:
-        # 1) Direct with proper SSL
-        try:
-            ssl_ctx = ssl.create_default_context(cafile=certifi.where())
-            return await _try(session, url, ssl_ctx)
-        except Exception:
-            pass
 
-        # 2) Direct with less strict SSL (fallback)
-        try:
-            insecure_ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
-            insecure_ctx.check_hostname = False
-            insecure_ctx.verify_mode = ssl.CERT_NONE
-            return await _try(session, url, insecure_ctx)
-        except Exception:
-            pass
+async def _fetch_playwright(ctx: _FetchContext) -> str:
+    import browser_pool
 
-        # 3) Try mobile user-agent (some Amazon pages are laxer on m-dot)
-        if settings.SCRAPE_TRY_MOBILE:
-            try:
-                m_headers = dict(headers)
-                m_headers["user-agent"] = (
-                    "Mozilla/5.0 (iPhone; CPU iPhone OS 16_0 like Mac OS X) AppleWebKit/605.1.15 "
-                    "(KHTML, like Gecko) Version/16.0 Mobile/15E148 Safari/604.1"
-                )
-                async with aiohttp.ClientSession(timeout=timeout, headers=m_headers) as m_session:
-                    ssl_ctx = ssl.create_default_context(cafile=certifi.where())
-                    return await _try(m_session, url.replace("www.amazon.", "m.amazon."), ssl_ctx)
-            except Exception:
-                pass
-
-        # 4) curl_cffi (optional) to better mimic a browser without headless overhead
-        if settings.SCRAPE_TRY_CURL_CFFI:
+    pool = browser_pool.browser_pool
+    if pool is not None:
+        # Shared browser started with the app
+        async with pool.page() as page:
+            content = await _render_playwright_page(page, ctx.url)
+    else:
+        from playwright.async_api import async_playwright  # type: ignore
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True)
             try:
-                from curl_cffi import requests as cffi_requests  # type: ignore
-                resp = cffi_requests.get(
-                    url,
-                    headers=headers,
-                    impersonate=settings.CURL_CFFI_IMPERSONATE,
-                    timeout=settings.REQUEST_TIMEOUT,
-                    allow_redirects=True,
-                    verify=True,
+                context = await browser.new_context(
+                    user_agent=ctx.headers.get("user-agent"),
+                    viewport={"width": 1366, "height": 900},
                 )
-                resp.raise_for_status()
-                return resp.text
-            except Exception:
-                pass
+                page = await context.new_page()
+                content = await _render_playwright_page(page, ctx.url)
+                await context.close()
+            finally:
+                await browser.close()
+    if not content:
+        raise RuntimeError("Playwright returned an empty page")
+    return content
+
+
+# 6) Scraper API (requires SCRAPER_API_KEY)
+async def _fetch_scraper_api(ctx: _FetchContext) -> str:
+    import aiohttp
+
+    # Ensure url is a string before encoding
+    url_str = str(ctx.url) if ctx.url is not None else ""
+    scraper_url = (
+        f"{settings.SCRAPER_API_URL}/?api_key={settings.SCRAPER_API_KEY}&url={aiohttp.helpers.quote(url_str, safe='')}"
+    )
+    ssl_ctx = ssl.create_default_context(cafile=certifi.where())
+    return await _get_text(ctx, scraper_url, ssl_ctx)
+
+
+# 7) Jina Reader proxy (free, text-oriented) as a last resort
+async def _fetch_jina(ctx: _FetchContext) -> str:
+    url_str = str(ctx.url) if ctx.url is not None else ""
+    alt = f"{settings.JINA_READER_URL}/http/" + url_str.replace("https://", "").replace("http://", "")
+    ssl_ctx = ssl.create_default_context(cafile=certifi.where())
+    return await _get_text(ctx, alt, ssl_ctx)
+
+
+FETCH_STRATEGIES: Dict[str, Callable[[_FetchContext], Awaitable[str]]] = {
+    "direct": _fetch_direct,
+    "insecure": _fetch_insecure,
+    "mobile": _fetch_mobile,
+    "curl_cffi": _fetch_curl_cffi,
+    "playwright": _fetch_playwright,
+    "scraper_api": _fetch_scraper_api,
+    "jina": _fetch_jina,
+}
 
-        # 5) Playwright headless browser (optional), can render and bypass lightweight bot checks
-        if settings.SCRAPE_TRY_PLAYWRIGHT:
-            try:
-                from playwright.async_api import async_playwright  # type: ignore
-                async with async_playwright() as p:
-                    browser = await p.chromium.launch(headless=True)
-                    context = await browser.new_context(
-                        user_agent=headers.get("user-agent"),
-                        viewport={"width": 1366, "height": 900},
-                    )
-                    page = await context.new_page()
-                    await page.goto(url, wait_until="domcontentloaded")
-                    # Try scrolling a bit then wait network idle
-                    await page.wait_for_timeout(500)
-                    await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                    await page.wait_for_load_state("networkidle")
-                    content = await page.content()
-                    await context.close()
-                    await browser.close()
-                    if content:
-                        return content
-            except Exception:
-                pass
-
-        # 6) Use optional scraper API if configured
-        if settings.SCRAPER_API_KEY:
-            # Ensure url is a string before encoding
-            url_str = str(url) if url is not None else ""
-            scraper_url = (
-                f"{settings.SCRAPER_API_URL}/?api_key={settings.SCRAPER_API_KEY}&url={aiohttp.helpers.quote(url_str, safe='')}"
-            )
-            try:
-                ssl_ctx = ssl.create_default_context(cafile=certifi.where())
-                return await _try(session, scraper_url, ssl_ctx)
-            except Exception:
-                pass
 
-        # 7) Jina Reader proxy (free, text-oriented) as a last resort
+strategy_scheduler = StrategyScheduler(
+    failure_threshold=settings.SCRAPE_STRATEGY_FAILURES,
+    cooldown_s=settings.SCRAPE_STRATEGY_COOLDOWN,
+    failure_prior_s=float(settings.REQUEST_TIMEOUT),
+)
+
+page_cache: Optional[PageCache] = (
+    PageCache(settings.PAGE_CACHE_DIR, settings.PAGE_CACHE_TTL, settings.PAGE_CACHE_MAX_MB * 1024 * 1024)
+    if settings.PAGE_CACHE_ENABLED
+    else None
+)
+
+
+def enabled_strategies() -> List[str]:
+    """Strategy names in default order, minus those disabled in settings."""
+    enabled = {
+        "mobile": settings.SCRAPE_TRY_MOBILE,
+        "curl_cffi": settings.SCRAPE_TRY_CURL_CFFI,
+        "playwright": settings.SCRAPE_TRY_PLAYWRIGHT,
+        "scraper_api": bool(settings.SCRAPER_API_KEY),
+    }
+    return [name for name in FETCH_STRATEGIES if enabled.get(name, True)]
+
+
+# Markers of Amazon's robot check / error pages, which come back as HTTP 200
+_BLOCKED_MARKERS = (
+    "/errors/validateCaptcha",
+    "Type the characters you see in this image",
+    "api-services-support@amazon.com",
+)
+
+
+# Strategies that return the page as Reader text/markdown rather than HTML
+TEXT_STRATEGIES = {"jina"}
+_URL_ASIN = re.compile(r"/(?:dp|gp/product)/([A-Z0-9]{10})")
+
+
+def _is_product_url(url: str) -> bool:
+    return "/dp/" in url or "/gp/product/" in url
+
+
+def _is_product_page(url: str, html: str, text_proxy: bool = False) -> bool:
+    """Whether a fetched page is usable: not a robot check, and for /dp/ URLs an actual product page.
+
+    Text proxies drop the element ids, so their output counts when it has a "Title:" header or the URL's ASIN.
+    """
+    if not html or any(marker in html for marker in _BLOCKED_MARKERS):
+        return False
+    if not _is_product_url(url):
+        return True
+    if text_proxy:
+        asin = _URL_ASIN.search(url)
+        return "Title:" in html[:2000] or bool(asin and asin.group(1) in html)
+    return "productTitle" in html
+
+
+def hedge_strategies() -> List[str]:
+    return [name.strip() for name in settings.SCRAPE_HEDGE_STRATEGIES.split(",") if name.strip()]
+
+
+async def _attempt(
+    url: str,
+    headers: Dict[str, str],
+    session: "aiohttp.ClientSession",
+    name: str,
+    budget: float,
+    require_product: bool = False,
+) -> Tuple[str, Dict[str, str]]:
+    """Run one strategy within `budget` seconds and record the outcome with the scheduler.
+
+    Returns the page and its (lower-cased) response headers.
+    """
+    ctx = _FetchContext(url, headers, session)
+    ctx.timeout_s = budget
+    started = time.monotonic()
+    try:
+        html = await asyncio.wait_for(FETCH_STRATEGIES[name](ctx), timeout=budget)
+        if require_product and not _is_product_page(url, html, text_proxy=name in TEXT_STRATEGIES):
+            raise RuntimeError(f"{name} returned a blocked or non-product page")
+    except asyncio.CancelledError:
+        # Lost a hedged race; says nothing about the strategy
+        raise
+    except Exception:
+        strategy_scheduler.record(url, name, ok=False, latency_s=time.monotonic() - started)
+        raise
+    strategy_scheduler.record(url, name, ok=True, latency_s=time.monotonic() - started)
+    response_headers = ctx.response_headers
+    if ctx.truncated:
+        # The validators describe the full page; revalidating against them would keep serving the cut-off body
+        response_headers = {k: v for k, v in response_headers.items() if k not in ("etag", "last-modified")}
+    return html, response_headers
+
+
+async def _race(
+    url: str,
+    headers: Dict[str, str],
+    session: "aiohttp.ClientSession",
+    racers: List[str],
+    deadline: Optional[Deadline],
+    tried: List[str],
+) -> Optional[Tuple[str, Dict[str, str]]]:
+    """Start racers one hedge delay apart (or at once when the previous one failed); first valid page wins.
+
+    Returns None when every racer failed. Losers are cancelled and awaited before returning.
+    """
+    pending: Dict[asyncio.Task, str] = {}
+    queue = list(racers)
+
+    def launch() -> bool:
+        budget = stage_timeout(deadline, settings.REQUEST_TIMEOUT)
+        if budget <= 0:
+            return False
+        name = queue.pop(0)
+        tried.append(name)
+        task = asyncio.ensure_future(_attempt(url, headers, session, name, budget, require_product=True))
+        pending[task] = name
+        return True
+
+    try:
+        while queue or pending:
+            if not pending and not launch():
+                break
+            wait_s = settings.SCRAPE_HEDGE_DELAY if queue else None
+            done, _ = await asyncio.wait(pending, timeout=wait_s, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                pending.pop(task)
+                if task.exception() is None:
+                    return task.result()
+            if not done and queue:
+                # Hedge: the leader is slow, start the next strategy alongside it
+                launch()
+        return None
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def _fetch_live(
+    url: str,
+    headers: Dict[str, str],
+    session: "aiohttp.ClientSession",
+    deadline: Optional[Deadline],
+    hedge: bool,
+) -> Tuple[str, Dict[str, str]]:
+    strategies = enabled_strategies()
+    if settings.SCRAPE_ADAPTIVE:
+        strategies = strategy_scheduler.order(url, strategies)
+
+    tried: List[str] = []
+    if hedge:
+        allowed = set(hedge_strategies())
+        racers = [name for name in strategies if name in allowed]
+        strategies = [name for name in strategies if name not in allowed]
+        result = await _race(url, headers, session, racers, deadline, tried)
+        if result is not None:
+            return result
+
+    for name in strategies:
+        budget = stage_timeout(deadline, settings.REQUEST_TIMEOUT)
+        if budget <= 0:
+            raise DeadlineExceeded(f"deadline exceeded while fetching (tried: {', '.join(tried) or 'none'})")
+        tried.append(name)
         try:
-            url_str = str(url) if url is not None else ""
-            alt = "https://r.jina.ai/http/" + url_str.replace("https://", "").replace("http://", "")
-            async with aiohttp.ClientSession(timeout=timeout, headers=headers) as s2:
-                ssl_ctx = ssl.create_default_context(cafile=certifi.where())
-                return await _try(s2, alt, ssl_ctx)
+            # A 200 robot-check page counts as a failure, so a blocked strategy cools down
+            return await _attempt(url, headers, session, name, budget, require_product=True)
         except Exception:
-            pass
+            continue
+
+    if deadline is not None and deadline.expired:
+        raise DeadlineExceeded(f"deadline exceeded while fetching (tried: {', '.join(tried) or 'none'})")
+    # If all fail, raise the last exception generically
+    raise RuntimeError(
+        f"Failed to fetch URL via all strategies ({', '.join(tried)})"
+    )
+
+
+async def _revalidate(
+    url: str,
+    session: "aiohttp.ClientSession",
+    cached: CachedPage,
+    deadline: Optional[Deadline],
+) -> Optional[Tuple[str, Dict[str, str]]]:
+    """Conditional GET for a stale cached page; None if the origin can't confirm or replace it."""
+    import aiohttp
+
+    budget = stage_timeout(deadline, settings.REQUEST_TIMEOUT)
+    if budget <= 0:
+        return None
+    ssl_ctx = ssl.create_default_context(cafile=certifi.where())
+    try:
+        async with session.get(
+            url, headers=cached.validators, ssl=ssl_ctx, timeout=aiohttp.ClientTimeout(total=budget)
+        ) as resp:
+            response_headers = {k.lower(): v for k, v in resp.headers.items()}
+            if resp.status == 304:
+                await asyncio.to_thread(page_cache.mark_revalidated, url)
+                return cached.html, response_headers
+            if resp.status == 200:
+                html = await resp.text()
+                if _is_product_page(url, html):
+                    return html, response_headers
+    except Exception as e:
+        print(f"   Cache revalidation failed for {url}: {e}")
+    return None
+
 
-        # If all fail, raise the last exception generically
-        raise RuntimeError(
-            "Failed to fetch URL via all strategies (direct, insecure, mobile, curl_cffi, playwright, scraper API, jina reader)"
+async def fetch_html(
+    url: str,
+    deadline: Optional[Deadline] = None,
+    hedge: Optional[bool] = None,
+    use_cache: bool = True,
+) -> str:
+    """Fetch a page, trying each strategy in turn.
+
+    Each attempt gets REQUEST_TIMEOUT, or only what is left of `deadline` when one is given;
+    DeadlineExceeded is raised once the budget is spent. With `hedge` (default SCRAPE_HEDGE) the
+    strategies in SCRAPE_HEDGE_STRATEGIES race first, staggered by SCRAPE_HEDGE_DELAY, and the rest
+    are tried in turn only if none of them returns a valid product page.
+
+    Fresh pages in the on-disk cache are returned without a request. Stale ones are revalidated
+    when they carry an ETag/Last-Modified, and served anyway if every strategy fails.
+    """
+    import aiohttp
+
+    headers = dict(HEADERS_BASE)
+    headers["user-agent"] = settings.USER_AGENT or DESKTOP_USER_AGENT
+
+    url = str(url)
+    if hedge is None:
+        hedge = settings.SCRAPE_HEDGE
+    cache = page_cache if use_cache else None
+
+    cached: Optional[CachedPage] = None
+    if cache is not None:
+        cached = await asyncio.to_thread(cache.get, url)
+        if cached is not None and cached.fresh:
+            return cached.html
+
+    async with aiohttp.ClientSession(headers=headers) as session:
+        result = None
+        if cached is not None and cached.validators:
+            result = await _revalidate(url, session, cached, deadline)
+        if result is None:
+            try:
+                result = await _fetch_live(url, headers, session, deadline, hedge)
+            except (DeadlineExceeded, RuntimeError) as e:
+                if cached is None:
+                    raise
+                print(f"   Serving stale cached page for {url} ({e})")
+                return cached.html
+
+    html, response_headers = result
+    # A 304 hands back the cached page itself, whose TTL has already been restarted
+    revalidated = cached is not None and html is cached.html
+    if cache is not None and not revalidated and _is_product_page(url, html):
+        await asyncio.to_thread(
+            cache.put, url, html, response_headers.get("etag"), response_headers.get("last-modified")
         )
+    return html
+
 
+# Selectors of the label/value detail sections read by _detail_map
+DETAIL_BULLETS_SELECTOR = "#detailBullets_feature_div li"
+DETAIL_TABLE_SELECTOR = "#productDetails_detailBullets_sections1 th, #productDetails_techSpec_section_1 th"
 
-def _extract_asin(soup: BeautifulSoup) -> Optional[str]:
+# Bidi marks Amazon puts around the ":" in detail bullets ("Item Weight \u200f : \u200e 3.14 ounces")
+_BIDI_MARKS = dict.fromkeys(map(ord, "\u200e\u200f\u202a\u202b\u202c\u202d\u202e"), None)
+
+
+def _detail_key(label: str) -> str:
+    return re.sub(r"\s+", " ", label.translate(_BIDI_MARKS)).strip(" :").lower()
+
+
+def _detail_map(soup: BeautifulSoup) -> Dict[str, str]:
+    """Product detail labels (lower-cased, e.g. "item weight") to their values, in one pass.
+
+    Reads the detail bullets first, then the detail tables; the first value seen for a label wins.
+    """
+    details: Dict[str, str] = {}
+    for li in soup.select(DETAIL_BULLETS_SELECTOR):
+        label, sep, value = li.get_text(" ", strip=True).translate(_BIDI_MARKS).partition(":")
+        if sep and value.strip():
+            details.setdefault(_detail_key(label), clean_text(value) or "")
+    for th in soup.select(DETAIL_TABLE_SELECTOR):
+        td = th.find_next("td")
+        if td:
+            value = clean_text(td.get_text(" ", strip=True).translate(_BIDI_MARKS))
+            if value:
+                details.setdefault(_detail_key(th.get_text(" ", strip=True)), value)
+    return details
+
+
+def _detail_values(details: Dict[str, str], *needles: str, exclude: Tuple[str, ...] = ()) -> List[str]:
+    """Values whose label contains any of `needles` (and none of `exclude`), in page order."""
+    return [
+        value
+        for key, value in details.items()
+        if any(n in key for n in needles) and not any(x in key for x in exclude)
+    ]
+
+
+def _first_parsed(values: List[str], parse: Callable[[str], Any]) -> Any:
+    for value in values:
+        parsed = parse(value)
+        if parsed:
+            return parsed
+    return None
+
+
+def _extract_asin(soup: BeautifulSoup, details: Dict[str, str]) -> Optional[str]:
     # Try from data-asin
     tag = soup.find(attrs={"data-asin": True})
     if tag and tag.get("data-asin"):
         return tag.get("data-asin")
-    # From product details table
-    for th in soup.select("#productDetails_detailBullets_sections1 th"):
-        if "ASIN" in th.get_text(strip=True):
-            td = th.find_next("td")
-            if td:
-                return td.get_text(strip=True)
-    # From bullets list
-    for li in soup.select("#detailBullets_feature_div li"):
-        text = li.get_text(" ", strip=True)
-        if text.lower().startswith("asin"):
-            parts = text.split(":", 1)
-            if len(parts) == 2:
-                return parts[1].strip()
-    return None
+    return details.get("asin")
 
 
-def _extract_price_currency(soup: BeautifulSoup):
+def _extract_price_currency(soup: BeautifulSoup, text: Optional[str] = None):
     # Try buybox price
     sel = [
         "#corePrice_feature_div span.a-offscreen",
@@ -180,75 +549,29 @@ def _extract_price_currency(soup: BeautifulSoup):
         if el:
             return parse_price(el.get_text(" ", strip=True))
     # Fallback search anywhere
-    txt = soup.get_text(" ", strip=True)
+    txt = text if text is not None else soup.get_text(" ", strip=True)
     return parse_price(txt)
 
 
-def _extract_weight(soup: BeautifulSoup) -> Optional[float]:
-    # Look in product details bullets
-    for li in soup.select("#detailBullets_feature_div li"):
-        text = li.get_text(" ", strip=True)
-        if any(k in text.lower() for k in ["weight", "item weight", "shipping weight"]):
-            w = parse_weight_kg(text)
-            if w:
-                return w
-    # Details table
-    for th in soup.select("#productDetails_detailBullets_sections1 th"):
-        label = th.get_text(strip=True).lower()
-        if "weight" in label:
-            td = th.find_next("td")
-            if td:
-                w = parse_weight_kg(td.get_text(" ", strip=True))
-                if w:
-                    return w
-    # Generic search text
-    txt = soup.get_text(" ", strip=True)
-    return parse_weight_kg(txt)
-
-
-def _extract_shipping_weight(soup: BeautifulSoup) -> Optional[float]:
+def _extract_weight(details: Dict[str, str], text: str) -> Optional[float]:
+    # Item or shipping weight from the details, else anything that looks like a weight on the page
+    return _first_parsed(_detail_values(details, "weight"), parse_weight_kg) or parse_weight_kg(text)
+
+
+def _extract_shipping_weight(details: Dict[str, str]) -> Optional[float]:
     # Amazon often lists Shipping Weight separately
-    for li in soup.select("#detailBullets_feature_div li"):
-        text = li.get_text(" ", strip=True)
-        if "shipping weight" in text.lower():
-            w = parse_weight_kg(text)
-            if w:
-                return w
-    for th in soup.select("#productDetails_detailBullets_sections1 th"):
-        label = th.get_text(strip=True).lower()
-        if "shipping weight" in label:
-            td = th.find_next("td")
-            if td:
-                w = parse_weight_kg(td.get_text(" ", strip=True))
-                if w:
-                    return w
-    return None
+    return _first_parsed(_detail_values(details, "shipping weight"), parse_weight_kg)
 
 
-def _extract_dimensions(soup: BeautifulSoup):
-    for li in soup.select("#detailBullets_feature_div li"):
-        text = li.get_text(" ", strip=True)
-        if any(k in text.lower() for k in ["dimension", "product dimensions"]):
-            d = parse_dimensions_cm(text)
-            if d:
-                return d
-    for th in soup.select("#productDetails_detailBullets_sections1 th"):
-        if "dimension" in th.get_text(strip=True).lower():
-            td = th.find_next("td")
-            if td:
-                d = parse_dimensions_cm(td.get_text(" ", strip=True))
-                if d:
-                    return d
-    return None
+def _extract_dimensions(details: Dict[str, str]):
+    return _first_parsed(_detail_values(details, "dimension"), parse_dimensions_cm)
 
 
-def _extract_materials(soup: BeautifulSoup):
-    materials = []
-    for li in soup.select("#detailBullets_feature_div li"):
-        t = li.get_text(" ", strip=True)
-        if any(k in t.lower() for k in ["material", "materials", "fabric"]):
-            materials.append(t)
-    return materials[:5]
+def _extract_materials(details: Dict[str, str]):
+    materials: List[str] = []
+    for value in _detail_values(details, "material", "fabric", exclude=("free", "feature")):
+        materials.extend(m.strip() for m in re.split(r"[,;/]", value) if m.strip())
+    return list(dict.fromkeys(materials))[:5]
 
 
 def _extract_category(soup: BeautifulSoup) -> Optional[str]:
@@ -295,9 +618,9 @@ def _extract_product_info_from_url(url: str) -> ProductInfo:
         shipping_weight_kg=None,
         dimensions_cm=None,
         category=None,
-        materials=None,
-        bullets=None,
-        images=None,
+        materials=[],
+        bullets=[],
+        images=[],
         raw={"text": "", "html": ""}
     )
 
@@ -346,13 +669,33 @@ async def scrape_amazon_product_claude(html: str, url: str) -> ProductInfo:
     
     try:
         import anthropic
-        client = anthropic.Anthropic(api_key=settings.ANTHROPIC_API_KEY)
-        
-        response = client.messages.create(
-            model="claude-3-5-sonnet-20240620",
-            max_tokens=2000,
-            messages=[{"role": "user", "content": prompt}]
-        )
+        import llm_scheduler
+        from llm_scheduler import RateLimited, retry_after_seconds
+
+        # Closing the client releases its connection pool; retries are left to the shared scheduler
+        async with anthropic.AsyncAnthropic(
+            api_key=settings.ANTHROPIC_API_KEY,
+            base_url=settings.ANTHROPIC_API_URL,
+            timeout=settings.LLM_TIMEOUT,
+            max_retries=0,
+        ) as client:
+            async def call():
+                try:
+                    return await client.messages.create(
+                        model="claude-3-5-sonnet-20240620",
+                        max_tokens=2000,
+                        messages=[{"role": "user", "content": prompt}]
+                    )
+                except anthropic.APIStatusError as e:
+                    if e.status_code in (429, 529):
+                        raise RateLimited(e.status_code, retry_after_seconds(e.response.headers.get("retry-after"))) from e
+                    raise
+
+            response = await llm_scheduler.scheduler.submit(
+                call,
+                estimated_tokens=len(prompt) // 4 + 2000,
+                usage=lambda r: r.usage.input_tokens + r.usage.output_tokens,
+            )
         
         import json
         import re
@@ -392,45 +735,61 @@ async def scrape_amazon_product_claude(html: str, url: str) -> ProductInfo:
         return await scrape_amazon_product_fallback(html, url)
 
 
-async def scrape_amazon_product_fallback(html: str, url: str) -> ProductInfo:
-    """Fallback scraping using BeautifulSoup"""
-    soup = BeautifulSoup(html, "html.parser")
+def extract_product_fields(page: str | bytes, parser: str = "fast") -> Dict[str, Any]:
+    """Parse a product page into ProductInfo fields (everything but `url`).
+
+    Synchronous and self-contained so it can run in an extraction worker process; `page` may be
+    the UTF-8 encoded HTML.
+    """
+    from fast_parse import parse_product_page
+
+    html = page.decode("utf-8", errors="replace") if isinstance(page, bytes) else page
+    # `soup` may only hold the regions the extractors read; `text` is always the whole page
+    soup, text = parse_product_page(html, parser)
 
     title_el = soup.select_one("#productTitle")
     brand_el = soup.select_one("#bylineInfo")
 
-    price, currency = _extract_price_currency(soup)
-    weight_kg = _extract_weight(soup)
-    shipping_weight_kg = _extract_shipping_weight(soup)
-    dimensions_cm = _extract_dimensions(soup)
-    asin = _extract_asin(soup)
-    category = _extract_category(soup)
-    bullets = _extract_bullets(soup)
-    materials = _extract_materials(soup)
-    images = _extract_images(soup)
+    details = _detail_map(soup)
+    price, currency = _extract_price_currency(soup, text)
+
+    return {
+        "title": title_el.get_text(strip=True) if title_el else None,
+        "brand": brand_el.get_text(strip=True) if brand_el else None,
+        "asin": _extract_asin(soup, details),
+        "price": price,
+        "currency": currency,
+        "weight_kg": _extract_weight(details, text),
+        "shipping_weight_kg": _extract_shipping_weight(details),
+        "dimensions_cm": _extract_dimensions(details),
+        "category": _extract_category(soup),
+        "materials": _extract_materials(details),
+        "bullets": _extract_bullets(soup),
+        "images": _extract_images(soup),
+        "country_of_origin": details.get("country of origin"),
+        "manufacturer": details.get("manufacturer"),
+        "raw": {"text": text[:100000]},
+    }
 
-    return ProductInfo(
-        url=url,
-        title=title_el.get_text(strip=True) if title_el else None,
-        brand=brand_el.get_text(strip=True) if brand_el else None,
-        asin=asin,
-        price=price,
-        currency=currency,
-        weight_kg=weight_kg,
-        shipping_weight_kg=shipping_weight_kg,
-        dimensions_cm=dimensions_cm,
-        category=category,
-        materials=materials,
-        bullets=bullets,
-        images=images,
-        raw={"text": soup.get_text(" ", strip=True)[:100000]},
-    )
+
+async def scrape_amazon_product_fallback(html: str, url: str) -> ProductInfo:
+    """Fallback scraping using BeautifulSoup"""
+    from extraction_pool import extraction_pool
+
+    # Large pages are parsed in a worker process when the pool is running, small ones inline
+    fields = await extraction_pool.extract(html, settings.SCRAPE_PARSER)
+    return ProductInfo(url=url, **fields)
 
 
-async def scrape_amazon_product(url: str, html: str | None = None) -> ProductInfo:
+async def scrape_amazon_product(
+    url: str,
+    html: str | None = None,
+    deadline: Optional[Deadline] = None,
+    hedge: Optional[bool] = None,
+) -> ProductInfo:
     if html is None:
         try:
-            html = await fetch_html(url)
+            html = await fetch_html(url, deadline=deadline, hedge=hedge)
             print(f"   Fetched HTML length: {len(html)} characters")
         except Exception as e:
             print(f"   AMAZON SCRAPING ERROR: Failed to fetch HTML: {e}")
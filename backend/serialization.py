@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import json
+import math
+from typing import Any, Iterable, Optional
+
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    orjson = None  # type: ignore[assignment]
+
+
+# Heavy fields left out of responses unless explicitly requested via `include`
+SLIM_EXCLUDE: dict[str, Any] = {"product": {"raw": True}}
+
+
+def _finite(obj: Any) -> Any:
+    """Replace NaN/Infinity with None, as orjson does; stdlib json would emit invalid JSON for them."""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: _finite(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(value) for value in obj]
+    return obj
+
+
+def _json_default(obj: Any) -> Any:
+    # numpy arrays expose .tolist() and numpy scalars (dataset rows) .item();
+    # everything else (AnyUrl, Timestamp, ...) becomes a string
+    for name in ("tolist", "item"):
+        convert = getattr(obj, name, None)
+        if callable(convert):
+            try:
+                return _finite(convert())
+            except Exception:
+                pass
+    return str(obj)
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(
+            content,
+            default=_json_default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+        )
+    return json.dumps(
+        _finite(content), default=_json_default, ensure_ascii=False, separators=(",", ":"), allow_nan=False
+    ).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """JSON response rendered with orjson when installed, stdlib json otherwise; both write NaN as null and accept numpy values."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def _paths_to_tree(paths: Iterable[str]) -> dict[str, Any]:
+    """Turn dotted paths (`product.title`) into a pydantic include/exclude tree."""
+    tree: dict[str, Any] = {}
+    for path in paths:
+        parts = [p for p in path.strip().split(".") if p]
+        if not parts:
+            continue
+        node = tree
+        for part in parts[:-1]:
+            child = node.get(part)
+            if child is True:
+                break  # parent already fully included
+            node = node.setdefault(part, {})
+        else:
+            node[parts[-1]] = True
+    return tree
+
+
+def _without_opted_in(tree: dict[str, Any], opt_in: set[str], prefix: str = "") -> dict[str, Any]:
+    """Drop the parts of an exclude tree that an opted-in path names or reaches into."""
+    kept: dict[str, Any] = {}
+    for key, sub in tree.items():
+        path = f"{prefix}{key}"
+        if sub is True:
+            if not any(p == path or p.startswith(path + ".") for p in opt_in):
+                kept[key] = True
+        else:
+            sub = _without_opted_in(sub, opt_in, path + ".")
+            if sub:
+                kept[key] = sub
+    return kept
+
+
+def project(
+    model: BaseModel,
+    fields: Optional[list[str]] = None,
+    include: Optional[list[str]] = None,
+) -> dict[str, Any]:
+    """Dump `model` in slim form.
+
+    - `fields`: only return these dotted paths (e.g. ["total_kgco2e", "product.title"]).
+    - `include`: opt back in to fields excluded by default (e.g. ["product.raw"]).
+
+    Naming an excluded field or anything inside it (`product.raw.text`) opts in.
+    """
+    opt_in = {p.strip() for p in (include or []) + (fields or [])}
+    exclude = _without_opted_in(SLIM_EXCLUDE, opt_in) or None
+    include_tree = _paths_to_tree(fields) if fields else None
+    return model.model_dump(include=include_tree, exclude=exclude)
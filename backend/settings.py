@@ -13,20 +13,93 @@ class Settings:
     CLIMATE_LLM_PROVIDER: str | None = os.getenv("CLAUDE") or os.getenv("ANTHROPIC_API_KEY")
     # Network
     REQUEST_TIMEOUT: int = int(os.getenv("REQUEST_TIMEOUT", "20"))
+    # Overall budget for one analysis request; every stage only gets what is left of it
+    ANALYZE_DEADLINE: float = float(os.getenv("ANALYZE_DEADLINE", "30"))
+    LLM_TIMEOUT: float = float(os.getenv("LLM_TIMEOUT", "30"))
+    # Extraction results keyed by (text hash, prompt version, model), in SQLite with LRU eviction
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "true").lower() in {"1", "true", "yes"}
+    LLM_CACHE_PATH: str = os.getenv("LLM_CACHE_PATH", os.path.join(os.path.dirname(__file__), ".llm_cache.sqlite"))
+    LLM_CACHE_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "50000"))
+    # Page text sent to the LLM is cut to its most fact-dense sentences within this many tokens
+    LLM_INPUT_TOKEN_BUDGET: int = int(os.getenv("LLM_INPUT_TOKEN_BUDGET", "1500"))
+    # Products packed into one extraction request, and extra rounds for items whose answer didn't parse
+    LLM_BATCH_SIZE: int = int(os.getenv("LLM_BATCH_SIZE", "8"))
+    LLM_BATCH_RETRIES: int = int(os.getenv("LLM_BATCH_RETRIES", "1"))
+    # Shared limits for all Anthropic calls: requests in flight, token budget per minute, retries on 429/529
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+    LLM_TOKENS_PER_MINUTE: int = int(os.getenv("LLM_TOKENS_PER_MINUTE", "50000"))
+    LLM_RATE_LIMIT_RETRIES: int = int(os.getenv("LLM_RATE_LIMIT_RETRIES", "3"))
+    LLM_BACKOFF_BASE_S: float = float(os.getenv("LLM_BACKOFF_BASE_S", "1"))
+    LLM_BACKOFF_MAX_S: float = float(os.getenv("LLM_BACKOFF_MAX_S", "30"))
+    # Facts strict mode needs; the LLM is called only when table/regex extraction leaves one of these unresolved
+    EXTRACT_REQUIRED_FIELDS: str = os.getenv("EXTRACT_REQUIRED_FIELDS", "item_weight_kg,materials")
     USER_AGENT: str | None = os.getenv("USER_AGENT")
     SCRAPER_API_KEY: str | None = os.getenv("SCRAPER_API_KEY")
     SCRAPER_API_URL: str = os.getenv("SCRAPER_API_URL", "https://api.scraperapi.com")
+    JINA_READER_URL: str = os.getenv("JINA_READER_URL", "https://r.jina.ai").rstrip("/")
+    AMAZON_BASE_URL: str = os.getenv("AMAZON_BASE_URL", "https://www.amazon.com").rstrip("/")
     SCRAPE_TRY_MOBILE: bool = os.getenv("SCRAPE_TRY_MOBILE", "true").lower() in {"1", "true", "yes"}
     SCRAPE_TRY_CURL_CFFI: bool = os.getenv("SCRAPE_TRY_CURL_CFFI", "true").lower() in {"1", "true", "yes"}
     CURL_CFFI_IMPERSONATE: str = os.getenv("CURL_CFFI_IMPERSONATE", "chrome120")
     SCRAPE_TRY_PLAYWRIGHT: bool = os.getenv("SCRAPE_TRY_PLAYWRIGHT", "true").lower() in {"1", "true", "yes"}
+    # Shared headless browser started with the app (contexts in use at once, navigations before recycling)
+    PLAYWRIGHT_POOL_SIZE: int = int(os.getenv("PLAYWRIGHT_POOL_SIZE", "2"))
+    PLAYWRIGHT_MAX_PAGES_PER_CONTEXT: int = int(os.getenv("PLAYWRIGHT_MAX_PAGES_PER_CONTEXT", "50"))
+    PLAYWRIGHT_BLOCK_RESOURCES: str = os.getenv("PLAYWRIGHT_BLOCK_RESOURCES", "image,font,media")
+    # Reorder fetch strategies per host by observed success rate/latency; failing ones cool down
+    SCRAPE_ADAPTIVE: bool = os.getenv("SCRAPE_ADAPTIVE", "true").lower() in {"1", "true", "yes"}
+    SCRAPE_STRATEGY_FAILURES: int = int(os.getenv("SCRAPE_STRATEGY_FAILURES", "3"))
+    SCRAPE_STRATEGY_COOLDOWN: float = float(os.getenv("SCRAPE_STRATEGY_COOLDOWN", "300"))
+    # Compressed on-disk cache of fetched pages (fresh for PAGE_CACHE_TTL seconds, LRU-capped in size)
+    PAGE_CACHE_ENABLED: bool = os.getenv("PAGE_CACHE_ENABLED", "true").lower() in {"1", "true", "yes"}
+    PAGE_CACHE_DIR: str = os.getenv("PAGE_CACHE_DIR", os.path.join(os.path.dirname(__file__), ".page_cache"))
+    PAGE_CACHE_TTL: float = float(os.getenv("PAGE_CACHE_TTL", "21600"))
+    PAGE_CACHE_MAX_MB: int = int(os.getenv("PAGE_CACHE_MAX_MB", "512"))
+    # Worker processes for HTML parsing (0 = parse on the event loop); smaller pages stay inline
+    EXTRACT_WORKERS: int = int(os.getenv("EXTRACT_WORKERS", "2"))
+    EXTRACT_INLINE_BELOW_BYTES: int = int(os.getenv("EXTRACT_INLINE_BELOW_BYTES", "200000"))
+    # Similar products: candidates processed at once, and requests per second (burst) to one host
+    SIMILAR_CONCURRENCY: int = int(os.getenv("SIMILAR_CONCURRENCY", "5"))
+    SCRAPE_HOST_RATE: float = float(os.getenv("SCRAPE_HOST_RATE", "2"))
+    SCRAPE_HOST_BURST: float = float(os.getenv("SCRAPE_HOST_BURST", "3"))
+    # Look similar products up in the local dataset index first; live search only fills what's missing
+    SIMILAR_INDEX_ENABLED: bool = os.getenv("SIMILAR_INDEX_ENABLED", "true").lower() in {"1", "true", "yes"}
+    SIMILAR_INDEX_MIN_SCORE: float = float(os.getenv("SIMILAR_INDEX_MIN_SCORE", "0.2"))
+    # Precomputed per-category carbon rankings for /api/alternatives (built from the dataset if the file is missing)
+    ALTERNATIVES_INDEX_PATH: str = os.getenv("ALTERNATIVES_INDEX_PATH", os.path.join(os.path.dirname(__file__), "alternatives_index.json"))
+    ALTERNATIVES_BUILD_ON_STARTUP: bool = os.getenv("ALTERNATIVES_BUILD_ON_STARTUP", "false").lower() in {"1", "true", "yes"}
+    ALTERNATIVES_CLUSTER_MIN_SCORE: float = float(os.getenv("ALTERNATIVES_CLUSTER_MIN_SCORE", "0.35"))
+    # Bloom filter of known ASINs; answers /api/coverage and skips dataset lookups for unknown products
+    COVERAGE_FILTER_ENABLED: bool = os.getenv("COVERAGE_FILTER_ENABLED", "true").lower() in {"1", "true", "yes"}
+    COVERAGE_FALSE_POSITIVE_RATE: float = float(os.getenv("COVERAGE_FALSE_POSITIVE_RATE", "0.001"))
+    # Stream product pages and stop downloading once the parsed sections are complete (or at the byte cap)
+    SCRAPE_STREAM: bool = os.getenv("SCRAPE_STREAM", "true").lower() in {"1", "true", "yes"}
+    SCRAPE_STREAM_MAX_BYTES: int = int(os.getenv("SCRAPE_STREAM_MAX_BYTES", "2000000"))
+    # Page parser for field extraction: "fast" (lxml, only the regions we read) or "html.parser"
+    SCRAPE_PARSER: str = os.getenv("SCRAPE_PARSER", "fast")
+    # Hedged fetch: start the next racing strategy if the current one hasn't answered within the delay
+    SCRAPE_HEDGE: bool = os.getenv("SCRAPE_HEDGE", "false").lower() in {"1", "true", "yes"}
+    SCRAPE_HEDGE_DELAY: float = float(os.getenv("SCRAPE_HEDGE_DELAY", "1.5"))
+    SCRAPE_HEDGE_STRATEGIES: str = os.getenv("SCRAPE_HEDGE_STRATEGIES", "direct,curl_cffi,mobile")
     # Emission factor providers
     CLIMATIQ_API_KEY: str | None = os.getenv("CLIMATIQ_API_KEY")
     OPENCAGE_API_KEY: str | None = os.getenv("OPENCAGE_API_KEY")
     CLIMATIQ_DATA_VERSION: str = os.getenv("CLIMATIQ_DATA_VERSION", "^21")
     ANTHROPIC_API_KEY: str | None = os.getenv("CLAUDE") or os.getenv("ANTHROPIC_API_KEY")
+    # Provider base URLs (point these at fake_providers.py for load tests)
+    CLIMATIQ_API_URL: str = os.getenv("CLIMATIQ_API_URL", "https://api.climatiq.io").rstrip("/")
+    OPENCAGE_API_URL: str = os.getenv("OPENCAGE_API_URL", "https://api.opencagedata.com").rstrip("/")
+    ANTHROPIC_API_URL: str = os.getenv("ANTHROPIC_API_URL", "https://api.anthropic.com").rstrip("/")
     # Behavior
     STRICT_SOURCED_ONLY: bool = os.getenv("STRICT_SOURCED_ONLY", "false").lower() in {"1", "true", "yes"}
+    # Admission control (per-endpoint concurrency, bounded wait queue with deadline)
+    ADMISSION_ANALYZE_CONCURRENCY: int = int(os.getenv("ADMISSION_ANALYZE_CONCURRENCY", "8"))
+    ADMISSION_ANALYZE_QUEUE: int = int(os.getenv("ADMISSION_ANALYZE_QUEUE", "32"))
+    ADMISSION_SIMILAR_CONCURRENCY: int = int(os.getenv("ADMISSION_SIMILAR_CONCURRENCY", "2"))
+    ADMISSION_SIMILAR_QUEUE: int = int(os.getenv("ADMISSION_SIMILAR_QUEUE", "4"))
+    ADMISSION_QUEUE_TIMEOUT: float = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "5"))
+    # Serve shed /api/analyze requests from the heuristic estimate instead of returning 429/503
+    ADMISSION_SHED_TO_HEURISTIC: bool = os.getenv("ADMISSION_SHED_TO_HEURISTIC", "true").lower() in {"1", "true", "yes"}
     # CORS
     CORS_ALLOW_ORIGINS: list[str] = (
         [o.strip() for o in os.getenv("CORS_ALLOW_ORIGINS", "*").split(",") if o.strip()]
@@ -0,0 +1,164 @@
+"""
+Local similarity index over the loaded product dataset.
+
+Each product becomes a sparse TF-IDF vector of hashed features: word unigrams
+and bigrams of the name, the brand, and the category/breadcrumb words, each
+field weighted separately. Vectors are L2-normalized and stored as posting
+lists (feature -> product ids, weights), so a query is an exact cosine
+similarity computed with a few NumPy scatter-adds, followed by a top-k
+partition. Hashing uses crc32, so results are identical across processes
+and runs.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import re
+import zlib
+from collections import Counter, defaultdict
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+
+N_FEATURES = 1 << 20
+FIELD_WEIGHTS = {"name": 1.0, "brand": 0.5, "category": 0.7}
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset("a an and for in of on the to with by from x".split())
+
+
+def _tokens(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS and len(t) > 1]
+
+
+def _feature(kind: str, term: str) -> int:
+    return zlib.crc32(f"{kind}:{term}".encode("utf-8")) % N_FEATURES
+
+
+def features(name: Optional[str], brand: Optional[str] = None, category: Optional[str] = None) -> Dict[int, float]:
+    """Field-weighted term counts keyed by hashed feature id."""
+    counts: Dict[int, float] = defaultdict(float)
+    words = _tokens(name)
+    for w in words:
+        counts[_feature("n", w)] += FIELD_WEIGHTS["name"]
+    for a, b in zip(words, words[1:]):
+        counts[_feature("n2", f"{a} {b}")] += FIELD_WEIGHTS["name"]
+    brand_tokens = _tokens(brand)
+    if brand_tokens:
+        counts[_feature("b", " ".join(brand_tokens))] += FIELD_WEIGHTS["brand"]
+    for w in _tokens(category):
+        counts[_feature("c", w)] += FIELD_WEIGHTS["category"]
+    return counts
+
+
+class SimilarityIndex:
+    def __init__(self) -> None:
+        self.asins: List[str] = []
+        self._idf: Dict[int, float] = {}
+        # feature -> (product ids, weights)
+        self._postings: Dict[int, Tuple["np.ndarray", "np.ndarray"]] = {}
+
+    def __len__(self) -> int:
+        return len(self.asins)
+
+    def build(self, products: Iterable[Tuple[str, Optional[str], Optional[str], Optional[str]]]) -> "SimilarityIndex":
+        """Index (asin, name, brand, category) tuples."""
+        import numpy as np
+
+        docs: List[Dict[int, float]] = []
+        asins: List[str] = []
+        for asin, name, brand, category in products:
+            feats = features(name, brand, category)
+            if asin and feats:
+                asins.append(asin)
+                docs.append(feats)
+
+        n_docs = len(docs)
+        df: Counter = Counter()
+        for feats in docs:
+            df.update(feats.keys())
+        self._idf = {f: math.log((1 + n_docs) / (1 + c)) + 1.0 for f, c in df.items()}
+
+        postings: Dict[int, Tuple[List[int], List[float]]] = defaultdict(lambda: ([], []))
+        for doc_id, feats in enumerate(docs):
+            vec = self._weigh(feats)
+            for f, w in vec.items():
+                ids, weights = postings[f]
+                ids.append(doc_id)
+                weights.append(w)
+        self._postings = {
+            f: (np.asarray(ids, dtype=np.int32), np.asarray(weights, dtype=np.float32))
+            for f, (ids, weights) in postings.items()
+        }
+        self.asins = asins
+        return self
+
+    def _weigh(self, feats: Dict[int, float]) -> Dict[int, float]:
+        # Sublinear tf * idf, L2-normalized; features never seen in the dataset can't match anything
+        vec = {f: (1.0 + math.log(c)) * self._idf[f] for f, c in feats.items() if f in self._idf and c > 0}
+        norm = math.sqrt(sum(w * w for w in vec.values()))
+        return {f: w / norm for f, w in vec.items()} if norm else {}
+
+    def query(
+        self,
+        name: Optional[str],
+        brand: Optional[str] = None,
+        category: Optional[str] = None,
+        k: int = 5,
+        exclude: Iterable[str] = (),
+        min_score: float = 0.0,
+    ) -> List[Tuple[str, float]]:
+        """Top-k (asin, cosine similarity) pairs, best first; ties broken by ASIN."""
+        import numpy as np
+
+        if not self.asins or k <= 0:
+            return []
+        vec = self._weigh(features(name, brand, category))
+        if not vec:
+            return []
+        scores = np.zeros(len(self.asins), dtype=np.float32)
+        for f, w in vec.items():
+            ids, weights = self._postings[f]
+            # A product appears at most once per posting list, so fancy-index += is exact
+            scores[ids] += w * weights
+
+        excluded = set(exclude)
+        # Take a few extra so excluded products can't leave the result short
+        take = min(len(scores), k + len(excluded))
+        top = np.argpartition(-scores, take - 1)[:take] if take < len(scores) else np.arange(len(scores))
+        ranked = sorted(
+            ((self.asins[i], float(scores[i])) for i in top if scores[i] > min_score),
+            key=lambda pair: (-round(pair[1], 6), pair[0]),
+        )
+        return [(asin, score) for asin, score in ranked if asin not in excluded][:k]
+
+
+def _breadcrumb_text(value: Any) -> Optional[str]:
+    try:
+        crumbs = json.loads(str(value))
+    except (json.JSONDecodeError, TypeError):
+        return None
+    if isinstance(crumbs, list):
+        return " ".join(c.get("name", "") for c in crumbs if isinstance(c, dict))
+    return None
+
+
+def build_from_dataframe(df: "pd.DataFrame") -> SimilarityIndex:
+    """Index a dataset in the Octaprice column layout (sku, name, brandName, breadcrumbs, nodeName)."""
+    import pandas as pd
+
+    def text(row: "pd.Series", column: str) -> Optional[str]:
+        value = row.get(column)
+        return str(value) if value is not None and pd.notna(value) else None
+
+    def rows():
+        for _, row in df.iterrows():
+            category = _breadcrumb_text(row.get("breadcrumbs")) if text(row, "breadcrumbs") else None
+            yield text(row, "sku"), text(row, "name"), text(row, "brandName"), category or text(row, "nodeName")
+
+    return SimilarityIndex().build(rows())
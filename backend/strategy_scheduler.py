@@ -0,0 +1,119 @@
+"""
+Adaptive ordering of fetch strategies per host.
+
+Tracks success rate and latency (EWMA) for every (host, strategy) pair that
+fetch_html tries. Strategies are ordered by expected time to a successful
+fetch, and a strategy that keeps failing on a host is put on cooldown and
+tried only after everything else.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+
+class StrategyStats:
+    def __init__(self, prior_latency_s: float, prior_failure_s: float):
+        # Optimistic priors so untried strategies keep their default position
+        self.success_rate = 1.0
+        self.latency_s = prior_latency_s
+        self.failure_latency_s = prior_failure_s
+        self.attempts = 0
+        self.successes = 0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+
+    def to_dict(self, now: float) -> Dict[str, Any]:
+        return {
+            "attempts": self.attempts,
+            "successes": self.successes,
+            "success_rate": round(self.success_rate, 3),
+            "latency_s": round(self.latency_s, 3),
+            "failure_latency_s": round(self.failure_latency_s, 3),
+            "consecutive_failures": self.consecutive_failures,
+            "cooldown_s": round(max(0.0, self.cooldown_until - now), 1),
+        }
+
+
+class StrategyScheduler:
+    def __init__(
+        self,
+        alpha: float = 0.3,
+        failure_threshold: int = 3,
+        cooldown_s: float = 300.0,
+        failure_prior_s: float = 20.0,
+    ):
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.cooldown_s = cooldown_s
+        # Assumed cost of a failed attempt until real failures have been timed
+        self.failure_prior_s = failure_prior_s
+        self._stats: Dict[Tuple[str, str], StrategyStats] = {}
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        return (urlparse(str(url)).hostname or "").lower()
+
+    def _get(self, host: str, strategy: str, position: int) -> StrategyStats:
+        key = (host, strategy)
+        stats = self._stats.get(key)
+        if stats is None:
+            # Untried strategies are assumed slower than a proven one but far cheaper than a failing one;
+            # the small per-position offset keeps the default order as the tiebreak
+            stats = StrategyStats(
+                prior_latency_s=self.failure_prior_s / 4 + 0.01 * position,
+                prior_failure_s=self.failure_prior_s,
+            )
+            self._stats[key] = stats
+        return stats
+
+    def _expected_cost(self, stats: StrategyStats) -> float:
+        # Expected seconds spent on this strategy per successful fetch
+        p = max(stats.success_rate, 0.01)
+        return stats.latency_s + (1.0 - p) / p * stats.failure_latency_s
+
+    def order(self, url: str, strategies: List[str]) -> List[str]:
+        """Strategies sorted by expected cost; those on cooldown go last (still tried as a last resort)."""
+        host = self.host_of(url)
+        now = time.monotonic()
+        ranked = []
+        for position, name in enumerate(strategies):
+            stats = self._get(host, name, position)
+            cooling = stats.cooldown_until > now
+            ranked.append((cooling, self._expected_cost(stats), position, name))
+        ranked.sort()
+        return [name for _, _, _, name in ranked]
+
+    def record(self, url: str, strategy: str, ok: bool, latency_s: float) -> None:
+        host = self.host_of(url)
+        stats = self._stats.get((host, strategy)) or self._get(host, strategy, 0)
+        stats.attempts += 1
+        stats.success_rate = (1 - self.alpha) * stats.success_rate + self.alpha * (1.0 if ok else 0.0)
+        if ok:
+            stats.successes += 1
+            stats.consecutive_failures = 0
+            stats.cooldown_until = 0.0
+            stats.latency_s = (1 - self.alpha) * stats.latency_s + self.alpha * latency_s
+        else:
+            stats.failure_latency_s = (1 - self.alpha) * stats.failure_latency_s + self.alpha * latency_s
+            stats.consecutive_failures += 1
+            if stats.consecutive_failures >= self.failure_threshold:
+                stats.cooldown_until = time.monotonic() + self.cooldown_s
+
+    def snapshot(self, host: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """Per-host stats plus the order the scheduler would currently use for that host."""
+        now = time.monotonic()
+        per_host: Dict[str, List[str]] = {}
+        for h, name in self._stats:
+            if host and h != host:
+                continue
+            per_host.setdefault(h, []).append(name)
+        out: Dict[str, Dict[str, Any]] = {}
+        for h, names in per_host.items():
+            out[h] = {
+                "order": self.order(f"https://{h}/", names),
+                "strategies": {name: self._stats[(h, name)].to_dict(now) for name in names},
+            }
+        return out
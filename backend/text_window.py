@@ -0,0 +1,87 @@
+"""
+Cut page text down to the parts that state product facts, within a token budget.
+
+Scraped pages are mostly navigation and boilerplate, so the first few thousand
+characters often miss the detail table entirely. `reduce_text` splits the text
+into sentences (runs without punctuation, such as a flattened detail table,
+into windows of about `WINDOW_CHARS`), scores each piece for fact signals
+(weights with units, percentages, material names, "Country of Origin") and
+keeps the best-scoring pieces, once each and in page order, until the budget
+is spent.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import List
+
+# Rough size of a token for English product text
+CHARS_PER_TOKEN = 4
+WINDOW_CHARS = 300
+
+# Longest names first, so "stainless steel" wins over "steel"
+MATERIAL_NAMES = sorted(
+    [
+        "stainless steel", "carbon fiber", "carbon fibre", "polypropylene", "polycarbonate", "polyethylene",
+        "polyurethane", "polyester", "fiberglass", "aluminium", "aluminum", "cardboard", "porcelain", "silicone",
+        "spandex", "elastane", "titanium", "ceramic", "acrylic", "leather", "bamboo", "cotton", "copper", "rubber",
+        "nylon", "linen", "brass", "glass", "paper", "steel", "resin", "vinyl", "wool", "silk", "wood", "iron",
+        "zinc", "foam", "plastic", "metal", "hdpe", "ldpe", "abs", "pvc", "pet", "tpu", "eva",
+    ],
+    key=len,
+    reverse=True,
+)
+MATERIAL_RE = re.compile(r"\b(?:" + "|".join(re.escape(m) for m in MATERIAL_NAMES) + r")\b", re.I)
+
+# (pattern, points per match); matches are counted up to 3 per piece so one long list doesn't win alone
+_SIGNALS = [
+    (re.compile(r"\b(?:country of origin|made in)\b", re.I), 4),
+    (re.compile(r"\d(?:[.,]\d+)?\s*(?:kg|kilograms?|g|grams?|lbs?|pounds?|oz|ounces?)\b", re.I), 3),
+    (re.compile(r"\d\s*%"), 2),
+    (MATERIAL_RE, 2),
+    (re.compile(r"\b(?:weight|materials?|fabric|composition|packaging)\b", re.I), 1),
+]
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def _pieces(text: str) -> List[str]:
+    pieces = []
+    for sentence in _SENTENCE_END.split(text):
+        sentence = sentence.strip()
+        while len(sentence) > WINDOW_CHARS:
+            cut = sentence.rfind(" ", 0, WINDOW_CHARS)
+            cut = cut if cut > 0 else WINDOW_CHARS
+            pieces.append(sentence[:cut])
+            sentence = sentence[cut:].strip()
+        if sentence:
+            pieces.append(sentence)
+    return pieces
+
+
+def score(piece: str) -> int:
+    return sum(points * min(len(pattern.findall(piece)), 3) for pattern, points in _SIGNALS)
+
+
+def reduce_text(text: str, max_tokens: int) -> str:
+    """The highest-scoring pieces of `text` that fit in `max_tokens`, in their original order.
+
+    Text that already fits is returned unchanged; text with no fact signals at all is truncated.
+    """
+    budget = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= budget:
+        return text
+    pieces = _pieces(text)
+    scores = [score(p) for p in pieces]
+    ranked = sorted((i for i, s in enumerate(scores) if s > 0), key=lambda i: (-scores[i], i))
+    if not ranked:
+        return text[:budget]
+
+    chosen, seen, used = [], set(), 0
+    for i in ranked:
+        # Pages repeat blocks (detail lists, "also viewed" carousels); each piece is sent once.
+        # +1 for the newline joining pieces
+        if pieces[i] not in seen and used + len(pieces[i]) + 1 <= budget:
+            chosen.append(i)
+            seen.add(pieces[i])
+            used += len(pieces[i]) + 1
+    return "\n".join(pieces[i] for i in sorted(chosen))
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Test admission control: concurrency cap, bounded queue (429) and queue deadline (503).
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+from admission import AdmissionController, Overloaded
+
+
+async def _hold(controller: AdmissionController, seconds: float, results: list):
+    try:
+        async with controller.admit():
+            await asyncio.sleep(seconds)
+            results.append("ok")
+    except Overloaded as e:
+        results.append(e.status_code)
+
+
+def test_rejects_when_queue_full():
+    async def run():
+        controller = AdmissionController("test", max_concurrency=1, max_queue=1, queue_timeout_s=5.0)
+        results: list = []
+        await asyncio.gather(*[_hold(controller, 0.05, results) for _ in range(4)])
+        return controller, results
+
+    controller, results = asyncio.run(run())
+    # one running, one queued, two rejected immediately
+    assert sorted(results, key=str) == [429, 429, "ok", "ok"]
+    assert controller.rejected == 2 and controller.admitted == 2
+
+
+def test_sheds_after_queue_deadline():
+    async def run():
+        controller = AdmissionController("test", max_concurrency=1, max_queue=5, queue_timeout_s=0.05)
+        results: list = []
+        await asyncio.gather(_hold(controller, 0.3, results), _hold(controller, 0.01, results))
+        return controller, results
+
+    controller, results = asyncio.run(run())
+    assert sorted(results, key=str) == [503, "ok"]
+    assert controller.timed_out == 1
+
+
+def test_retry_after_is_positive():
+    async def run():
+        controller = AdmissionController("test", max_concurrency=2, max_queue=0, queue_timeout_s=1.0)
+        results: list = []
+        errors: list = []
+
+        async def hold_and_capture():
+            try:
+                async with controller.admit():
+                    await asyncio.sleep(0.05)
+                    results.append("ok")
+            except Overloaded as e:
+                errors.append(e)
+
+        await asyncio.gather(*[hold_and_capture() for _ in range(3)])
+        return results, errors
+
+    results, errors = asyncio.run(run())
+    assert results == ["ok", "ok"]
+    assert len(errors) == 1 and errors[0].status_code == 429 and errors[0].retry_after >= 1
+
+
+if __name__ == "__main__":
+    for test in [test_rejects_when_queue_full, test_sheds_after_queue_deadline, test_retry_after_is_positive]:
+        test()
+        print(f"✓ {test.__name__}")
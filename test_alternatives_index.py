@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Test the precomputed lower-carbon alternatives index: rankings, clusters, incremental updates, persistence.
+"""
+
+import asyncio
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+from alternatives_index import AlternativesIndex, build_from_dataset
+from dataset_loader import DatasetLoader
+from models import ProductInfo
+
+
+def _crumbs(*names):
+    return json.dumps([{"name": n} for n in names])
+
+
+LIGHTS = _crumbs("Home", "Lighting", "String Lights")
+BATH = _crumbs("Beauty", "Bath", "Body Wash")
+DATASET = pd.DataFrame(
+    [
+        ("B000000001", "LED Fairy String Lights 100ft", "Brightown", LIGHTS, 0.9),
+        ("B000000002", "LED Fairy String Lights 33ft", "Brightown", LIGHTS, 0.3),
+        ("B000000003", "LED Fairy String Lights 66ft", "Minetom", LIGHTS, 0.6),
+        ("B000000004", "Outdoor Patio Globe Bulb Lights", "Addlon", LIGHTS, 0.2),
+        ("B000000005", "Moisturizing Body Wash", "Dove", BATH, 0.1),
+        ("B000000006", "Body Wash for Sensitive Skin", "Cetaphil", BATH, 0.5),
+    ],
+    columns=["sku", "name", "brandName", "breadcrumbs", "weight_value"],
+).assign(weight_unit="kg")
+
+
+def _index() -> AlternativesIndex:
+    loader = DatasetLoader()
+    loader.df = DATASET
+    return build_from_dataset(loader)
+
+
+def _asins(result):
+    return [alt["asin"] for alt in result["alternatives"]]
+
+
+def test_alternatives_are_lower_carbon_same_cluster_first():
+    index = _index()
+    assert len(index) == 6
+    result = index.alternatives("B000000001", limit=5)
+    assert result["product"]["category"] == "Home > Lighting > String Lights"
+    # The other fairy lights cluster together; the globe lights only share the category
+    assert _asins(result) == ["B000000002", "B000000003", "B000000004"]
+    assert [alt["same_cluster"] for alt in result["alternatives"]] == [True, True, False]
+    assert all(alt["savings_kgco2e"] > 0 for alt in result["alternatives"])
+
+    # Never crosses categories, never suggests something worse
+    assert _asins(index.alternatives("B000000006")) == ["B000000005"]
+    assert _asins(index.alternatives("B000000004")) == []
+    assert index.alternatives("B0UNKNOWN0") is None
+
+
+def test_upsert_moves_product_in_rankings():
+    index = _index()
+    assert "B000000003" in _asins(index.alternatives("B000000001"))
+
+    # Re-scored heavier than the product it used to beat
+    url = "https://www.amazon.com/dp/B000000003"
+    index.upsert(ProductInfo(url=url, asin="B000000003", title="LED Fairy String Lights 66ft",
+                             brand="Minetom", category="Home > Lighting > String Lights", weight_kg=2.0))
+    assert _asins(index.alternatives("B000000001")) == ["B000000002", "B000000004"]
+    assert _asins(index.alternatives("B000000003"))[:2] == ["B000000002", "B000000001"]
+
+    # A new product joins the cluster of its nearest neighbour
+    entry = index.upsert(ProductInfo(url="https://www.amazon.com/dp/B000000009", asin="B000000009",
+                                     title="LED Fairy String Lights 10ft", brand="Brightown",
+                                     category="Home > Lighting > String Lights", weight_kg=0.05))
+    assert entry.cluster == index.entries["B000000001"].cluster
+    assert _asins(index.alternatives("B000000001"))[0] == "B000000009"
+    assert index.dirty
+
+
+def test_analysis_only_rescores_real_products():
+    import app
+    import alternatives_index
+    from deadline import Deadline
+    from models import AnalyzeRequest
+
+    async def failing_scrape(*args, **kwargs):
+        raise RuntimeError("blocked")
+
+    saved = alternatives_index.alternatives_index, app.scrape_amazon_product, app.get_product_from_url
+    alternatives_index.alternatives_index = index = _index()
+    app.scrape_amazon_product = failing_scrape
+    app.get_product_from_url = lambda url: None
+    try:
+        req = AnalyzeRequest(url="https://www.amazon.com/dp/B0REALPROD")
+        asyncio.run(app._run_analysis(req, Deadline(5)))
+        # The mock product stands in for the failed scrape but never enters the rankings
+        assert set(index.entries) == set(DATASET["sku"])
+
+        app._rescore_alternative(app._extract_product_info_from_url(str(req.url)), "url")
+        assert set(index.entries) == set(DATASET["sku"])
+
+        scraped = ProductInfo(url=req.url, asin="B0REALPROD", title="LED Fairy String Lights 50ft",
+                              category="Home > Lighting > String Lights", weight_kg=0.4)
+        app._rescore_alternative(scraped, "scrape")
+        assert "B0REALPROD" in index.entries
+    finally:
+        alternatives_index.alternatives_index, app.scrape_amazon_product, app.get_product_from_url = saved
+
+
+def test_save_and_load_round_trip():
+    index = _index()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "alternatives.json"
+        index.save(path)
+        assert not index.dirty
+        loaded = AlternativesIndex.load(path)
+    assert loaded.stats()["products"] == 6
+    assert loaded.alternatives("B000000001") == index.alternatives("B000000001")
+
+
+if __name__ == "__main__":
+    for test in [
+        test_alternatives_are_lower_carbon_same_cluster_first,
+        test_upsert_moves_product_in_rankings,
+        test_analysis_only_rescores_real_products,
+        test_save_and_load_round_trip,
+    ]:
+        test()
+        print(f"✓ {test.__name__}")
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Test the ASIN coverage Bloom filter, /api/coverage and the dataset-lookup prefilter.
+"""
+
+import asyncio
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+import app
+import asin_coverage
+from asin_coverage import BloomFilter, Coverage, asin_from_url, build_filter
+from cache_shards import ShardReader, export_shards
+from models import CoverageRequest, ProductInfo
+
+HAND_BUILT = json.loads((Path(__file__).parent / "carbon_footprint_cache.json").read_text())
+
+
+def _asins(n, prefix="B0"):
+    return [f"{prefix}{i:08d}" for i in range(n)]
+
+
+def test_no_false_negatives_and_bounded_false_positives():
+    known = _asins(20000)
+    bloom = build_filter(known, error_rate=0.01, headroom=1.0)
+    assert all(asin in bloom for asin in known)
+    probes = _asins(20000, prefix="X9")
+    false_positives = sum(asin in bloom for asin in probes)
+    assert false_positives / len(probes) < 0.02
+    assert 0.005 < bloom.error_rate() < 0.015
+
+
+def test_round_trip_through_bytes():
+    bloom = build_filter(HAND_BUILT)
+    with tempfile.TemporaryDirectory() as tmp:
+        bloom.save(Path(tmp) / "coverage.bin")
+        loaded = BloomFilter.load(Path(tmp) / "coverage.bin")
+    assert (loaded.bits, loaded.hashes, len(loaded)) == (bloom.bits, bloom.hashes, len(bloom))
+    assert all(asin in loaded for asin in HAND_BUILT)
+
+
+def test_asin_from_url():
+    assert asin_from_url("https://www.amazon.com/Some-Title/dp/B09JVCL7JR?ref=x") == "B09JVCL7JR"
+    assert asin_from_url("https://www.amazon.com/gp/product/B0D1XD1ZV3") == "B0D1XD1ZV3"
+    assert asin_from_url("https://www.amazon.com/s?k=earbuds") is None
+
+
+def test_shard_reader_skips_shards_for_misses():
+    with tempfile.TemporaryDirectory() as tmp:
+        manifest = export_shards(HAND_BUILT, tmp)
+        reader = ShardReader(tmp)
+        assert manifest["coverage"]["file"] == "coverage.bin"
+        # Same prefix as a real shard, but not in the filter: nothing is loaded
+        assert reader.get("B09JZZZZZZ") is None
+        assert len(reader._loaded) == 0
+        assert reader.get("B09JVCL7JR") == HAND_BUILT["B09JVCL7JR"]
+
+
+def test_coverage_endpoint_and_dataset_prefilter():
+    lookups = []
+    saved = asin_coverage.coverage, app.get_product_from_url
+    asin_coverage.coverage = Coverage(build_filter(["B09JVCL7JR"]))
+    app.get_product_from_url = lambda url: lookups.append(url)
+    try:
+        result = asyncio.run(app.get_coverage(CoverageRequest(asins=["B09JVCL7JR", "b09jvcl7jr", "B000000000"])))
+        assert result["covered"] == {"B09JVCL7JR": True, "b09jvcl7jr": True, "B000000000": False}
+        assert result["stats"]["asins"] == 1
+
+        # Unknown ASINs never reach the dataset; known ones and ASIN-less URLs still do
+        assert app._dataset_product("https://www.amazon.com/dp/B000000000") is None and lookups == []
+        app._dataset_product("https://www.amazon.com/dp/B09JVCL7JR")
+        app._dataset_product("https://www.amazon.com/s?k=earbuds")
+        assert len(lookups) == 2
+
+        # A newly analysed product joins the filter
+        scraped = ProductInfo(url="https://www.amazon.com/dp/B0NEWPROD1", asin="B0NEWPROD1", title="New")
+        app._rescore_alternative(scraped, "scrape")
+        assert "B0NEWPROD1" in asin_coverage.coverage
+    finally:
+        asin_coverage.coverage, app.get_product_from_url = saved
+
+
+if __name__ == "__main__":
+    for test in [
+        test_no_false_negatives_and_bounded_false_positives,
+        test_round_trip_through_bytes,
+        test_asin_from_url,
+        test_shard_reader_skips_shards_for_misses,
+        test_coverage_endpoint_and_dataset_prefilter,
+    ]:
+        test()
+        print(f"✓ {test.__name__}")
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Test the Playwright browser pool against stubbed browser/context/page objects:
+context recycling, relaunch after a disconnect, and resource blocking.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+from browser_pool import BrowserPool
+
+
+class FakePage:
+    def __init__(self):
+        self.closed = False
+
+    def is_closed(self):
+        return self.closed
+
+
+class FakeContext:
+    def __init__(self, browser):
+        self.browser = browser
+        self.page = FakePage()
+        self.routes = []
+        self.closed = False
+
+    async def route(self, pattern, handler):
+        self.routes.append((pattern, handler))
+
+    async def new_page(self):
+        return self.page
+
+    async def close(self):
+        await asyncio.sleep(0)
+        self.closed = True
+        self.page.closed = True
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.connected = True
+        self.contexts = []
+        self.closed = False
+
+    def is_connected(self):
+        return self.connected
+
+    async def new_context(self, **kwargs):
+        context = FakeContext(self)
+        self.contexts.append(context)
+        return context
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeChromium:
+    def __init__(self):
+        self.browsers = []
+
+    async def launch(self, headless=True):
+        browser = FakeBrowser()
+        self.browsers.append(browser)
+        return browser
+
+
+class FakePlaywright:
+    def __init__(self):
+        self.chromium = FakeChromium()
+        self.stopped = False
+
+    async def stop(self):
+        self.stopped = True
+
+
+class FakeRequest:
+    def __init__(self, resource_type):
+        self.resource_type = resource_type
+
+
+class FakeRoute:
+    def __init__(self, resource_type):
+        self.request = FakeRequest(resource_type)
+        self.outcome = None
+
+    async def abort(self):
+        self.outcome = "abort"
+
+    async def continue_(self):
+        self.outcome = "continue"
+
+
+async def _started_pool(**kwargs):
+    pool = BrowserPool(**kwargs)
+    pool._playwright = FakePlaywright()
+    await pool._launch()
+    return pool
+
+
+async def _use(pool):
+    async with pool.page() as page:
+        return page
+
+
+def test_context_recycled_after_max_pages():
+    async def run():
+        pool = await _started_pool(size=1, max_pages_per_context=2)
+        first = await _use(pool)
+        assert await _use(pool) is first
+        # Worn out after two pages: the next borrow gets a fresh context
+        third = await _use(pool)
+        assert third is not first
+        await pool.stop()
+        return pool, first
+
+    pool, first = asyncio.run(run())
+    assert first.closed
+    assert pool.contexts_created == 2 and pool.recycled == 1 and pool.pages_served == 3
+
+
+def test_context_recycled_after_error():
+    async def run():
+        pool = await _started_pool(size=1)
+        with pytest.raises(ValueError):
+            async with pool.page() as page:
+                broken = page
+                raise ValueError("navigation failed")
+        assert pool.recycled == 1 and pool._idle == []
+        assert await _use(pool) is not broken
+        await pool.stop()
+        return broken
+
+    assert asyncio.run(run()).closed
+
+
+def test_context_recycled_after_cancellation():
+    async def run():
+        pool = await _started_pool(size=1)
+        borrowed = asyncio.Event()
+        pages = []
+
+        async def fetch():
+            async with pool.page() as page:
+                pages.append(page)
+                borrowed.set()
+                await asyncio.sleep(10)
+
+        task = asyncio.create_task(fetch())
+        await borrowed.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # The close runs in the background, and the pool holds on to it until it's done
+        assert pool.recycled == 1 and len(pool._closing) == 1
+        await pool.stop()
+        assert pool._closing == set()
+        return pages[0]
+
+    assert asyncio.run(run()).closed
+
+
+def test_relaunch_after_disconnect():
+    async def run():
+        pool = await _started_pool(size=1)
+        await _use(pool)
+        old = pool._browser
+        old.connected = False
+        page = await _use(pool)
+        new = pool._browser
+        await pool.stop()
+        return pool, old, new, page
+
+    pool, old, new, page = asyncio.run(run())
+    assert pool.launches == 2 and new is not old
+    # The idle context from the dead browser isn't reused
+    assert page is new.contexts[0].page and len(old.contexts) == 1
+
+
+def test_heavy_resources_blocked():
+    async def run():
+        pool = await _started_pool(size=1)
+        await _use(pool)
+        context = pool._browser.contexts[0]
+        (pattern, handler), = context.routes
+        outcomes = {}
+        for kind in ("image", "font", "media", "document", "script", "xhr"):
+            route = FakeRoute(kind)
+            await handler(route)
+            outcomes[kind] = route.outcome
+        await pool.stop()
+        return pattern, outcomes
+
+    pattern, outcomes = asyncio.run(run())
+    assert pattern == "**/*"
+    assert outcomes == {"image": "abort", "font": "abort", "media": "abort",
+                        "document": "continue", "script": "continue", "xhr": "continue"}
+
+
+def test_no_routing_when_blocking_disabled():
+    async def run():
+        pool = await _started_pool(size=1, block_resources=())
+        await _use(pool)
+        routes = pool._browser.contexts[0].routes
+        await pool.stop()
+        return routes
+
+    assert asyncio.run(run()) == []
+
+
+if __name__ == "__main__":
+    for test in [
+        test_context_recycled_after_max_pages,
+        test_context_recycled_after_error,
+        test_context_recycled_after_cancellation,
+        test_relaunch_after_disconnect,
+        test_heavy_resources_blocked,
+        test_no_routing_when_blocking_disabled,
+    ]:
+        test()
+        print(f"✓ {test.__name__}")
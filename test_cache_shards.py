@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Test the sharded binary extension cache: the reader returns exactly what the JSON cache holds.
+"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+from cache_shards import RECORD_SIZE, ShardReader, export_shards
+from dataset_loader import DatasetLoader
+from extension_cache import build_extension_cache
+
+HAND_BUILT = json.loads((Path(__file__).parent / "carbon_footprint_cache.json").read_text())
+
+
+def _loader(n_per_group=4):
+    """A dataset whose ASINs fall under three prefixes: B00, B01 and B02."""
+    groups = [("LED String Lights", "Lighting"), ("Body Wash", "Bath"), ("USB C Charger", "Chargers")]
+    rows = []
+    for g, (name, category) in enumerate(groups):
+        for i in range(n_per_group):
+            crumbs = json.dumps([{"name": "Home"}, {"name": category}])
+            rows.append((f"B0{g}{i:07d}", f"{name} {i + 1}", "Acme", crumbs, 0.1 * (i + 1), "kg", name.lower(), 9.99 + i))
+    loader = DatasetLoader()
+    loader.df = pd.DataFrame(rows, columns=["sku", "name", "brandName", "breadcrumbs", "weight_value", "weight_unit",
+                                            "description", "salePrice"])
+    return loader
+
+
+def test_hand_built_cache_round_trips():
+    with tempfile.TemporaryDirectory() as tmp:
+        manifest = export_shards(HAND_BUILT, tmp)
+        reader = ShardReader(tmp)
+        assert len(reader) == len(HAND_BUILT) == manifest["products"]
+        for asin, entry in HAND_BUILT.items():
+            assert reader.get(asin) == entry
+        assert reader.get("B000NOTHERE") is None
+        assert reader.get("ZZZZNOTHERE") is None
+        assert "bad-key" not in reader
+
+
+def test_generated_cache_parity():
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp) / "carbon_footprint_cache.json"
+        stats = build_extension_cache(_loader(), out, shards_dir=Path(tmp) / "shards", shard_prefix_len=3)
+        cache = json.loads(out.read_text())
+        reader = ShardReader(Path(tmp) / "shards")
+        # One shard per three-character prefix: B00, B01, B02
+        assert stats["shards"] == 3 and sorted(reader.manifest["shards"]) == ["B00", "B01", "B02"]
+        assert {asin: reader.get(asin) for asin in cache} == cache
+
+
+def test_records_are_fixed_width_and_strings_shared():
+    entries = {
+        f"B0SHARE{i:03d}": {"name": "Same product", "description": "", "price": None, "link": "",
+                             "carbon_footprint_kg": 0.5, "carbon_footprint_g": 500, "similar_asins": [],
+                             "processed_date": "2025-09-14T04:18:30", "destination_zip": "02062"}
+        for i in range(50)
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        manifest = export_shards(entries, tmp)
+        size = manifest["shards"]["B0SH"]["bytes"]
+        assert size == 12 + 50 * RECORD_SIZE + len("Same product2025-09-14T04:18:3002062")
+        assert ShardReader(tmp).get("B0SHARE007")["price"] is None
+
+        # Re-exporting with other prefixes drops the old shard files
+        export_shards(entries, tmp, prefix_len=2)
+        assert sorted(p.name for p in Path(tmp).glob("*.bin")) == ["B0.bin", "coverage.bin"]
+
+
+def test_reader_keeps_a_bounded_number_of_shards():
+    with tempfile.TemporaryDirectory() as tmp:
+        export_shards(HAND_BUILT, tmp, prefix_len=10)
+        reader = ShardReader(tmp, max_shards=2)
+        for asin in HAND_BUILT:
+            assert reader.get(asin)["name"] == HAND_BUILT[asin]["name"]
+        assert len(reader._loaded) == 2
+
+
+if __name__ == "__main__":
+    for test in [
+        test_hand_built_cache_round_trips,
+        test_generated_cache_parity,
+        test_records_are_fixed_width_and_strings_shared,
+        test_reader_keeps_a_bounded_number_of_shards,
+    ]:
+        test()
+        print(f"✓ {test.__name__}")
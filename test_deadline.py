@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Test the request deadline: fetching stops once the budget is spent, strict carbon keeps the components
+it finished, and /api/analyze falls back to URL-derived info and heuristic values.
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+import app
+import carbon
+import scrape
+from deadline import Deadline, DeadlineExceeded
+import fake_providers
+from fake_providers import ProviderBehaviour
+from models import AnalyzeRequest, CarbonBreakdown, ProductInfo
+from settings import settings
+from strategy_scheduler import StrategyScheduler
+
+URL = "https://www.amazon.com/Steel-Water-Bottle/dp/B000TEST01"
+
+
+def test_fetch_stops_when_the_budget_is_spent():
+    async def stalled(ctx):
+        await asyncio.sleep(5)
+
+    saved = dict(scrape.FETCH_STRATEGIES), scrape.strategy_scheduler, settings.SCRAPE_ADAPTIVE
+    scrape.FETCH_STRATEGIES.clear()
+    scrape.FETCH_STRATEGIES.update({"first": stalled, "second": stalled})
+    scrape.strategy_scheduler = StrategyScheduler(failure_threshold=3, cooldown_s=60)
+    settings.SCRAPE_ADAPTIVE = False
+    try:
+        started = time.monotonic()
+        with pytest.raises(DeadlineExceeded):
+            asyncio.run(scrape.fetch_html(URL, deadline=Deadline(0.2), hedge=False, use_cache=False))
+        # The first strategy used up the budget; the second never started
+        assert time.monotonic() - started < 1.0
+    finally:
+        scrape.FETCH_STRATEGIES.clear()
+        scrape.FETCH_STRATEGIES.update(saved[0])
+        scrape.strategy_scheduler, settings.SCRAPE_ADAPTIVE = saved[1:]
+
+
+def test_strict_carbon_keeps_finished_components():
+    product = ProductInfo(url=URL, weight_kg=0.4, shipping_weight_kg=0.6)
+
+    async def run():
+        # Shipping takes two Climatiq calls, packaging two more: the deadline falls in between
+        behaviours = {"climatiq": ProviderBehaviour(latency_ms=250)}
+        async with fake_providers.serve(behaviours, CLIMATIQ_API_KEY="test-key", OPENCAGE_API_KEY="test-key"):
+            return await carbon.estimate_carbon_strict(product, "Berlin", "Shenzhen", "sea", deadline=Deadline(0.75))
+
+    result = asyncio.run(run())
+    assert result.shipping_kgco2e is not None
+    assert result.packaging_kgco2e is None
+    assert result.sources["shipping_debug"] == ["deadline_exceeded"]
+
+
+def test_strict_carbon_separates_timeouts_from_the_deadline():
+    async def times_out(*args):
+        raise asyncio.TimeoutError()
+
+    saved = carbon._strict_components
+    carbon._strict_components = times_out
+    try:
+        result = asyncio.run(carbon.estimate_carbon_strict(ProductInfo(url=URL), None, None, None, deadline=Deadline(30)))
+    finally:
+        carbon._strict_components = saved
+    # A request timed out with budget to spare: not a deadline
+    assert result.sources["shipping_debug"] == ["timeout"]
+
+
+def test_missing_components_are_filled_with_heuristics():
+    info = ProductInfo(url=URL, title="Steel water bottle", weight_kg=0.4, materials=["Steel"])
+    partial = CarbonBreakdown(shipping_kgco2e=1.25, sources={"shipping": ["fake-freight"]})
+
+    filled = app._fill_missing_with_heuristics(partial, info, AnalyzeRequest(url=URL, destination="Berlin"))
+
+    assert filled == ["manufacturing", "packaging", "end of life"]
+    assert partial.shipping_kgco2e == 1.25 and partial.sources["shipping"] == ["fake-freight"]
+    for component in ["manufacturing", "packaging", "end_of_life"]:
+        assert getattr(partial, f"{component}_kgco2e") is not None
+        assert partial.sources[component][-1] == "heuristic_fallback"
+
+
+def test_lookup_falls_back_to_the_url_when_out_of_time():
+    async def out_of_time(*args, **kwargs):
+        raise DeadlineExceeded("deadline of 0.1s exceeded before fetch")
+
+    async def broken(*args, **kwargs):
+        raise RuntimeError("all strategies failed")
+
+    saved = app.scrape_amazon_product, app._dataset_product
+    app._dataset_product = lambda url: None
+    try:
+        app.scrape_amazon_product = out_of_time
+        info, source = asyncio.run(app._lookup_product(AnalyzeRequest(url=URL), Deadline(0.1)))
+        assert source == "url"
+        assert info.asin == "B000TEST01" and "Steel Water Bottle" in info.title
+
+        # Other failures still use the mock product
+        app.scrape_amazon_product = broken
+        _, source = asyncio.run(app._lookup_product(AnalyzeRequest(url=URL), Deadline(0.1)))
+        assert source == "mock"
+    finally:
+        app.scrape_amazon_product, app._dataset_product = saved
+
+
+if __name__ == "__main__":
+    for test in [
+        test_fetch_stops_when_the_budget_is_spent,
+        test_strict_carbon_keeps_finished_components,
+        test_strict_carbon_separates_timeouts_from_the_deadline,
+        test_missing_components_are_filled_with_heuristics,
+        test_lookup_falls_back_to_the_url_when_out_of_time,
+    ]:
+        test()
+        print(f"✓ {test.__name__}")
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Test the single-pass product detail map and the fields read from it.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+from bs4 import BeautifulSoup
+
+import scrape
+
+FIXTURES = Path(__file__).parent / "backend" / "fixtures"
+
+
+def _fallback(name: str):
+    html = (FIXTURES / name).read_text(encoding="utf-8")
+    return asyncio.run(scrape.scrape_amazon_product_fallback(html, "https://www.amazon.com/dp/B000FAKE00"))
+
+
+def test_detail_map_normalizes_bullets_and_tables():
+    soup = BeautifulSoup(
+        """
+        <div id="detailBullets_feature_div"><ul>
+          <li><span>Item Weight &rlm; : &lrm;</span> <span>3.14 ounces</span></li>
+          <li><span>Country of Origin &rlm; : &lrm;</span> <span>Vietnam</span></li>
+          <li><span>No separator here</span></li>
+        </ul></div>
+        <table id="productDetails_detailBullets_sections1">
+          <tr><th> Item Weight </th><td> 9 pounds </td></tr>
+          <tr><th> Material Type Free </th><td> BPA Free </td></tr>
+          <tr><th> Frame Material </th><td> Aluminum, Steel </td></tr>
+        </table>
+        """,
+        "html.parser",
+    )
+    details = scrape._detail_map(soup)
+    # Bullets win over the table for the same label
+    assert details["item weight"] == "3.14 ounces"
+    assert details["country of origin"] == "Vietnam"
+    assert "no separator here" not in details
+    assert scrape._extract_materials(details) == ["Aluminum", "Steel"]
+    assert scrape._extract_shipping_weight(details) is None
+
+
+def test_fixture_fields():
+    bullets = _fallback("amazon_product.html")
+    assert bullets.materials == ["Copper"]
+    assert bullets.country_of_origin == "China" and bullets.manufacturer == "Minetom"
+    assert round(bullets.shipping_weight_kg, 3) == 0.159
+
+    table = _fallback("amazon_product_table.html")
+    assert table.asin == "B01ACARSIU"
+    assert round(table.weight_kg, 3) == 0.346 and round(table.shipping_weight_kg, 3) == 0.454
+    assert table.country_of_origin == "China" and table.manufacturer == "Helen of Troy"
+    assert table.dimensions_cm is not None
+
+
+if __name__ == "__main__":
+    for test in [test_detail_map_normalizes_bullets_and_tables, test_fixture_fields]:
+        test()
+        print(f"✓ {test.__name__}")
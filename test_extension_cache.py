@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test the extension cache generator: output format, parallel parity, incremental rebuilds.
+"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+import extension_cache
+from dataset_loader import DatasetLoader
+from extension_cache import build_extension_cache
+
+HAND_BUILT = json.loads((Path(__file__).parent / "carbon_footprint_cache.json").read_text())
+
+
+def _crumbs(*names):
+    return json.dumps([{"name": n} for n in names])
+
+
+def _dataset(n_per_group=6):
+    groups = [
+        ("LED Fairy String Lights", "ft", "Brightown", _crumbs("Home", "Lighting", "String Lights")),
+        ("Moisturizing Body Wash Shower Gel", "oz", "Dove", _crumbs("Beauty", "Bath", "Body Wash")),
+        ("USB C Fast Charger Power Adapter", "w", "Anker", _crumbs("Electronics", "Chargers")),
+    ]
+    rows = []
+    for g, (name, unit, brand, crumbs) in enumerate(groups):
+        for i in range(n_per_group):
+            rows.append((f"B0{g}{i:07d}", f"{name} {10 * (i + 1)}{unit}", brand, crumbs, 0.1 * (i + 1), "kg",
+                         f"Description of {name.lower()}", 9.99 + i))
+    return pd.DataFrame(rows, columns=["sku", "name", "brandName", "breadcrumbs", "weight_value", "weight_unit",
+                                       "description", "salePrice"])
+
+
+def _loader(df):
+    loader = DatasetLoader()
+    loader.df = df
+    return loader
+
+
+def test_entries_match_extension_format():
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp) / "carbon_footprint_cache.json"
+        stats = build_extension_cache(_loader(_dataset()), out, k=3)
+        cache = json.loads(out.read_text())
+    assert stats["products"] == 18 and stats["recomputed"] == 18
+
+    sample = next(iter(HAND_BUILT.values()))
+    entry = cache["B000000000"]
+    assert set(entry) == set(sample)
+    assert entry["link"] == "https://www.amazon.com/dp/B000000000"
+    assert entry["carbon_footprint_g"] == round(entry["carbon_footprint_kg"] * 1000)
+    # Neighbours come from the same kind of product
+    assert len(entry["similar_asins"]) == 3
+    assert all(a.startswith("B00") and a != "B000000000" for a in entry["similar_asins"])
+
+
+def test_parallel_build_matches_inline():
+    extension_cache.CHUNK_SIZE, saved = 4, extension_cache.CHUNK_SIZE
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            inline, parallel = Path(tmp) / "inline.json", Path(tmp) / "parallel.json"
+            build_extension_cache(_loader(_dataset()), inline, workers=0)
+            build_extension_cache(_loader(_dataset()), parallel, workers=2)
+            a, b = json.loads(inline.read_text()), json.loads(parallel.read_text())
+    finally:
+        extension_cache.CHUNK_SIZE = saved
+
+    strip = lambda cache: {k: {f: v for f, v in e.items() if f != "processed_date"} for k, e in cache.items()}
+    assert list(a) == list(b)
+    assert strip(a) == strip(b)
+
+
+def test_incremental_rebuild_only_recomputes_what_changed():
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp) / "carbon_footprint_cache.json"
+        # A hand-built entry that isn't in the dataset survives rebuilds
+        out.write_text(json.dumps({"B0HANDMADE": HAND_BUILT[next(iter(HAND_BUILT))]}))
+        df = _dataset()
+        build_extension_cache(_loader(df), out)
+        first = json.loads(out.read_text())
+
+        again = build_extension_cache(_loader(df), out)
+        assert again["recomputed"] == 0 and again["reused"] == 18
+        assert json.loads(out.read_text()) == first
+
+        df = df.copy()
+        df.loc[df["sku"] == "B020000003", "weight_value"] = 5.0
+        stats = build_extension_cache(_loader(df), out)
+        second = json.loads(out.read_text())
+
+    # The changed charger and the chargers around it; lights and body wash are untouched
+    assert 1 <= stats["recomputed"] <= 6
+    assert second["B020000003"]["carbon_footprint_kg"] > first["B020000003"]["carbon_footprint_kg"]
+    for asin in first:
+        if not asin.startswith("B02"):
+            assert second[asin] == first[asin]
+    assert "B0HANDMADE" in second and stats["kept"] == 1
+
+
+if __name__ == "__main__":
+    for test in [
+        test_entries_match_extension_format,
+        test_parallel_build_matches_inline,
+        test_incremental_rebuild_only_recomputes_what_changed,
+    ]:
+        test()
+        print(f"✓ {test.__name__}")
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Test the extraction process pool: same fields as inline parsing, and the event loop stays free.
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+from extraction_pool import ExtractionPool
+from scrape import extract_product_fields
+
+FIXTURE = Path(__file__).parent / "backend" / "fixtures" / "amazon_product.html"
+
+
+def _big_page() -> str:
+    reviews = "".join(f"<div class='review'><p>Review {i}: works great</p><script>var r{i};</script></div>\n" for i in range(15000))
+    return FIXTURE.read_text(encoding="utf-8").replace("</body>", reviews + "</body>")
+
+
+def test_pool_matches_inline_and_keeps_loop_free():
+    page = _big_page()
+    small = FIXTURE.read_text(encoding="utf-8")
+    pool = ExtractionPool(workers=2, inline_below_bytes=100_000)
+    pool.start()
+
+    async def run():
+        # Warm the workers so process start-up isn't counted against the loop
+        await pool.extract(page, "fast")
+        ticks = 0
+        done = asyncio.Event()
+
+        async def ticker():
+            nonlocal ticks
+            while not done.is_set():
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        tick_task = asyncio.create_task(ticker())
+        started = time.perf_counter()
+        results = await asyncio.gather(*[pool.extract(page, "fast") for _ in range(4)])
+        elapsed = time.perf_counter() - started
+        done.set()
+        await tick_task
+        small_result = await pool.extract(small, "fast")
+        return results, small_result, ticks, elapsed
+
+    try:
+        results, small_result, ticks, elapsed = asyncio.run(run())
+    finally:
+        pool.stop()
+
+    expected = extract_product_fields(page, "fast")
+    assert all(r == expected for r in results)
+    assert small_result == extract_product_fields(small, "fast")
+    assert pool.offloaded == 5 and pool.inline == 1
+    # The loop kept ticking while the workers parsed
+    assert ticks >= elapsed / 0.01 * 0.5
+
+
+if __name__ == "__main__":
+    test_pool_matches_inline_and_keeps_loop_free()
+    print("✓ test_pool_matches_inline_and_keeps_loop_free")
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Test tiered fact extraction: detail table, then regexes, then the LLM for missing fields only.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+import fact_extract
+import llm_extract
+from fact_extract import extract_facts, regex_composition, regex_country, regex_item_weight, regex_materials
+import fake_providers
+from models import ProductInfo
+from scrape import extract_product_fields
+
+FIXTURES = Path(__file__).parent / "backend" / "fixtures"
+URL = "https://www.amazon.com/dp/B000FAKE00"
+
+
+def _scraped(name):
+    return ProductInfo(url=URL, **extract_product_fields((FIXTURES / name).read_text()))
+
+
+def _run(info, llm_reply=None):
+    """extract_facts with the LLM replaced by a recorder; returns (facts, fields the LLM was asked for)."""
+    asked = []
+
+    async def fake_llm(text, deadline=None, fields=None):
+        asked.append(list(fields))
+        reply = {f: v for f, v in (llm_reply or {}).items() if f in fields}
+        reply["provenance"] = {f: {"tier": "llm", "cached": False} for f in reply}
+        return reply
+
+    saved = fact_extract.extract_facts_claude
+    fact_extract.extract_facts_claude = fake_llm
+    try:
+        return asyncio.run(extract_facts(info)), asked
+    finally:
+        fact_extract.extract_facts_claude = saved
+
+
+def test_detail_table_page_needs_no_llm():
+    facts, asked = _run(_scraped("amazon_product.html"))
+    assert asked == [] and facts["llm_fields"] == []
+    tiers = {f: p["tier"] for f, p in facts["provenance"].items()}
+    assert tiers == {
+        "item_weight_kg": "table",
+        "shipping_weight_kg": "table",
+        "materials": "table",
+        "country_of_origin": "table",
+        # "Materials: 85% copper wire, 15% PVC insulation" in the description
+        "materials_composition": "regex",
+    }
+    assert facts["materials_composition"] == [
+        {"material": "copper", "fraction": 0.85},
+        {"material": "pvc", "fraction": 0.15},
+    ]
+
+
+def test_regex_fills_what_the_table_missed():
+    info = _scraped("amazon_product_table.html")
+    assert info.materials == []
+    facts, asked = _run(info)
+    assert asked == []
+    assert facts["materials"] == ["stainless steel"]
+    assert facts["provenance"]["materials"] == {"tier": "regex"}
+
+
+def test_llm_is_asked_only_for_missing_fields():
+    info = ProductInfo(url=URL, weight_kg=0.4, raw={"text": "A sturdy lunch box for school and office."})
+    facts, asked = _run(info, llm_reply={"materials": ["PP"], "packaging_materials": ["cardboard"], "item_weight_kg": 9.9})
+    # Weight came from the table, so the LLM isn't asked for it (and its answer is ignored)
+    assert asked == [["shipping_weight_kg", "materials", "materials_composition", "packaging_materials",
+                      "packaging_weight_kg", "country_of_origin"]]
+    assert facts["item_weight_kg"] == 0.4 and facts["provenance"]["item_weight_kg"]["tier"] == "table"
+    assert facts["materials"] == ["PP"] and facts["provenance"]["materials"]["tier"] == "llm"
+    assert facts["packaging_materials"] == ["cardboard"]
+    assert facts["llm_fields"] == asked[0]
+
+
+def test_no_llm_without_text():
+    facts, asked = _run(ProductInfo(url=URL, raw={}))
+    assert asked == [] and facts["provenance"] == {}
+
+
+def test_regex_rules():
+    assert regex_item_weight("Weight Capacity: 300 lbs Color: Red") is None
+    assert abs(regex_item_weight("Item Weight : 2 pounds") - 0.907184) < 1e-6
+    assert regex_composition("Shell: 60% cotton, 50% polyester") == []
+    assert regex_composition("Fabric: cotton 95%, spandex 5%") == [
+        {"material": "cotton", "fraction": 0.95},
+        {"material": "spandex", "fraction": 0.05},
+    ]
+    assert regex_materials("Material Type : Aluminum, Silicone Color : Black") == ["aluminum", "silicone"]
+    assert regex_country("Proudly Made in USA from imported parts") == "USA"
+    assert regex_country("Country of Origin United States Item model number X1") == "United States"
+
+
+def test_claude_request_is_limited_to_requested_fields():
+    async def run():
+        saved, llm_extract.llm_cache = llm_extract.llm_cache, None
+        try:
+            async with fake_providers.serve(ANTHROPIC_API_KEY="test-key"):
+                return await llm_extract.extract_facts_claude("Some product text", fields=["materials", "country_of_origin"])
+        finally:
+            llm_extract.llm_cache = saved
+
+    result = asyncio.run(run())
+    # The fake API answers every field; only the requested ones are kept
+    assert set(result) == {"materials", "country_of_origin", "provenance"}
+    prompt = llm_extract.build_prompt(["materials", "country_of_origin"])
+    assert "item_weight_kg" not in prompt and "Output keys: materials, country_of_origin." in prompt
+    assert result["provenance"]["materials"]["prompt_version"] == llm_extract.prompt_version(prompt)
+
+
+if __name__ == "__main__":
+    for test in [
+        test_detail_table_page_needs_no_llm,
+        test_regex_fills_what_the_table_missed,
+        test_llm_is_asked_only_for_missing_fields,
+        test_no_llm_without_text,
+        test_regex_rules,
+        test_claude_request_is_limited_to_requested_fields,
+    ]:
+        test()
+        print(f"✓ {test.__name__}")
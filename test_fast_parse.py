@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Parity test: the lxml region parser must extract exactly what the html.parser path does.
+
+The parser speed comparison is a benchmark and only runs with RUN_BENCHMARKS=1.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+import pytest
+
+import scrape
+from fast_parse import parse_fast, parse_html_parser
+from settings import settings
+
+FIXTURE_DIR = Path(__file__).parent / "backend" / "fixtures"
+FIXTURES = [FIXTURE_DIR / "amazon_product.html", FIXTURE_DIR / "amazon_product_table.html"]
+# What the html.parser extractor returns for the saved pages; regenerate it when extraction rules change
+EXPECTED = json.loads((FIXTURE_DIR / "amazon_product_expected.json").read_text(encoding="utf-8"))
+BENCHMARKS = os.getenv("RUN_BENCHMARKS", "").lower() in {"1", "true", "yes"}
+
+
+def _extract(html: str, engine: str) -> dict:
+    saved = settings.SCRAPE_PARSER
+    settings.SCRAPE_PARSER = engine
+    try:
+        info = asyncio.run(scrape.scrape_amazon_product_fallback(html, "https://www.amazon.com/dp/B000FAKE00"))
+    finally:
+        settings.SCRAPE_PARSER = saved
+    return info.model_dump(mode="json")
+
+
+def _padded(html: str, rows: int = 5000) -> str:
+    # Reviews, scripts and comments between the product regions, like a real 1-2 MB page
+    filler = "".join(
+        f'<div class="review" data-x="{i}"><span>Review {i}: works&nbsp;great</span><script>var r{i}=1;</script><!-- r{i} --> tail {i}</div>\n'
+        for i in range(rows)
+    )
+    return html.replace("</body>", filler + "</body>")
+
+
+def test_saved_pages_match_the_baseline_extractor():
+    for path in FIXTURES:
+        html = path.read_text(encoding="utf-8")
+        baseline = _extract(html, "html.parser")
+        assert baseline == EXPECTED[path.name], path.name
+        assert _extract(html, "fast") == baseline, path.name
+
+
+def test_padded_page_parity():
+    html = _padded(FIXTURES[0].read_text(encoding="utf-8"))
+    assert _extract(html, "fast") == _extract(html, "html.parser")
+    assert parse_fast(html)[1] == parse_html_parser(html)[1]
+
+
+@pytest.mark.skipif(not BENCHMARKS, reason="benchmark; set RUN_BENCHMARKS=1")
+def test_fast_parser_speed():
+    html = _padded(FIXTURES[0].read_text(encoding="utf-8"))
+    started = time.perf_counter()
+    _, slow_text = parse_html_parser(html)
+    slow = time.perf_counter() - started
+    started = time.perf_counter()
+    _, fast_text = parse_fast(html)
+    fast = time.perf_counter() - started
+    assert fast_text == slow_text
+    assert fast * 3 < slow, f"fast parser {fast * 1000:.0f}ms vs html.parser {slow * 1000:.0f}ms"
+
+
+if __name__ == "__main__":
+    tests = [test_saved_pages_match_the_baseline_extractor, test_padded_page_parity]
+    for test in tests + ([test_fast_parser_speed] if BENCHMARKS else []):
+        test()
+        print(f"✓ {test.__name__}")
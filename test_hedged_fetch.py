@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Test hedged fetching: a slow leader is raced by the next strategy, invalid pages lose.
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+import scrape
+from settings import settings
+from strategy_scheduler import StrategyScheduler
+
+URL = "https://www.amazon.com/dp/B000TEST01"
+PRODUCT_PAGE = '<html><span id="productTitle">Test Widget</span></html>'
+CAPTCHA_PAGE = '<html><form action="/errors/validateCaptcha"></form></html>'
+JINA_TEXT = "Title: Amazon.com: Test Widget\n\nURL Source: https://www.amazon.com/dp/B000TEST01\n\nMarkdown Content:\nTest Widget"
+
+
+def _strategy(delay: float, html: str, log: list, name: str):
+    async def fetch(ctx):
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            log.append(f"{name} cancelled")
+            raise
+        return html
+
+    return fetch
+
+
+def _run_with(strategies: dict, hedge_delay: float):
+    saved = (dict(scrape.FETCH_STRATEGIES), settings.SCRAPE_ADAPTIVE, settings.SCRAPE_HEDGE_DELAY,
+             settings.SCRAPE_HEDGE_STRATEGIES)
+    scrape.FETCH_STRATEGIES.clear()
+    scrape.FETCH_STRATEGIES.update(strategies)
+    settings.SCRAPE_ADAPTIVE = False
+    settings.SCRAPE_HEDGE_DELAY = hedge_delay
+    settings.SCRAPE_HEDGE_STRATEGIES = ",".join(strategies)
+    try:
+        started = time.monotonic()
+        html = asyncio.run(scrape.fetch_html(URL, hedge=True, use_cache=False))
+        return html, time.monotonic() - started
+    finally:
+        scrape.FETCH_STRATEGIES.clear()
+        scrape.FETCH_STRATEGIES.update(saved[0])
+        settings.SCRAPE_ADAPTIVE, settings.SCRAPE_HEDGE_DELAY, settings.SCRAPE_HEDGE_STRATEGIES = saved[1:]
+
+
+def test_hedge_beats_slow_leader():
+    log: list = []
+    html, elapsed = _run_with(
+        {"slow": _strategy(5.0, PRODUCT_PAGE, log, "slow"), "fast": _strategy(0.05, PRODUCT_PAGE, log, "fast")},
+        hedge_delay=0.1,
+    )
+    assert html == PRODUCT_PAGE
+    assert elapsed < 1.0
+    assert log == ["slow cancelled"]
+
+
+def test_blocked_page_starts_next_strategy_immediately():
+    log: list = []
+    html, elapsed = _run_with(
+        {"blocked": _strategy(0.01, CAPTCHA_PAGE, log, "blocked"), "ok": _strategy(0.01, PRODUCT_PAGE, log, "ok")},
+        hedge_delay=2.0,
+    )
+    assert html == PRODUCT_PAGE
+    assert elapsed < 1.0
+
+
+def test_product_page_check():
+    assert scrape._is_product_page(URL, PRODUCT_PAGE)
+    assert not scrape._is_product_page(URL, CAPTCHA_PAGE)
+    assert not scrape._is_product_page(URL, "<html>Page not found</html>")
+    assert scrape._is_product_page("https://www.amazon.com/s?k=widget", "<html>results</html>")
+    # Reader text has no productTitle element, only a title header or the ASIN
+    assert not scrape._is_product_page(URL, JINA_TEXT)
+    assert scrape._is_product_page(URL, JINA_TEXT, text_proxy=True)
+    assert scrape._is_product_page(URL, "ASIN: B000TEST01 Item Weight: 3 ounces", text_proxy=True)
+    assert not scrape._is_product_page(URL, "Markdown Content:\nPage not found", text_proxy=True)
+    assert not scrape._is_product_page(URL, "Title: Robot Check " + CAPTCHA_PAGE, text_proxy=True)
+
+
+def test_jina_text_is_accepted_on_the_sequential_path():
+    log: list = []
+    saved = dict(scrape.FETCH_STRATEGIES), settings.SCRAPE_ADAPTIVE, scrape.strategy_scheduler
+    scrape.FETCH_STRATEGIES.clear()
+    scrape.FETCH_STRATEGIES.update(
+        {"direct": _strategy(0.01, CAPTCHA_PAGE, log, "direct"), "jina": _strategy(0.01, JINA_TEXT, log, "jina")}
+    )
+    settings.SCRAPE_ADAPTIVE = False
+    scrape.strategy_scheduler = StrategyScheduler(failure_threshold=1, cooldown_s=60, failure_prior_s=1.0)
+    try:
+        html = asyncio.run(scrape.fetch_html(URL, hedge=False, use_cache=False))
+        stats = scrape.strategy_scheduler.snapshot("www.amazon.com")["www.amazon.com"]["strategies"]
+    finally:
+        scrape.FETCH_STRATEGIES.clear()
+        scrape.FETCH_STRATEGIES.update(saved[0])
+        settings.SCRAPE_ADAPTIVE, scrape.strategy_scheduler = saved[1:]
+
+    assert html == JINA_TEXT
+    # The robot check cools "direct" down; the Reader fallback is recorded as a success
+    assert stats["direct"]["successes"] == 0 and stats["direct"]["cooldown_s"] > 0
+    assert stats["jina"]["successes"] == 1 and stats["jina"]["cooldown_s"] == 0
+
+
+if __name__ == "__main__":
+    for test in [
+        test_hedge_beats_slow_leader,
+        test_blocked_page_starts_next_strategy_immediately,
+        test_product_page_check,
+        test_jina_text_is_accepted_on_the_sequential_path,
+    ]:
+        test()
+        print(f"✓ {test.__name__}")
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Import-time budget for the API and CLI entry points.
+
+Fails when importing `backend/app.py` or `analyze_product.py` gets slower than
+the budget, or when a heavy dependency is imported eagerly again.
+Override the budgets with IMPORT_BUDGET_APP_MS / IMPORT_BUDGET_CLI_MS.
+"""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent
+BACKEND = ROOT / "backend"
+
+# Modules that must only load on first use
+HEAVY_MODULES = ["pandas", "bs4", "aiohttp", "requests", "playwright", "anthropic", "curl_cffi"]
+
+APP_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_APP_MS", "1000"))
+CLI_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_CLI_MS", "800"))
+
+_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import {module}
+elapsed_ms = (time.perf_counter() - t0) * 1000
+print(json.dumps({{"ms": elapsed_ms, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure_import(module: str, runs: int = 3) -> dict:
+    """Import `module` in fresh interpreters and return the best time and any heavy modules loaded."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([str(BACKEND), str(ROOT), env.get("PYTHONPATH", "")])
+    best = None
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            cwd=str(BACKEND),
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        if best is None or result["ms"] < best["ms"]:
+            best = result
+    return best
+
+
+def test_app_import_budget():
+    result = measure_import("app")
+    assert not result["heavy"], f"app imports heavy modules eagerly: {result['heavy']}"
+    assert result["ms"] <= APP_BUDGET_MS, f"app import took {result['ms']:.0f} ms (budget {APP_BUDGET_MS:.0f} ms)"
+
+
+def test_cli_import_budget():
+    result = measure_import("analyze_product")
+    assert not result["heavy"], f"analyze_product imports heavy modules eagerly: {result['heavy']}"
+    assert result["ms"] <= CLI_BUDGET_MS, f"analyze_product import took {result['ms']:.0f} ms (budget {CLI_BUDGET_MS:.0f} ms)"
+
+
+if __name__ == "__main__":
+    ok = True
+    for module, budget in [("app", APP_BUDGET_MS), ("analyze_product", CLI_BUDGET_MS)]:
+        result = measure_import(module)
+        passed = not result["heavy"] and result["ms"] <= budget
+        ok = ok and passed
+        mark = "✓" if passed else "✗"
+        print(f"{mark} import {module}: {result['ms']:.0f} ms (budget {budget:.0f} ms)")
+        if result["heavy"]:
+            print(f"  heavy modules loaded: {', '.join(result['heavy'])}")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Test batched LLM extraction: several products per request, keyed answers, retries of failed items only,
+fact_extract.extract_facts_many, and the asynchronous Message Batches mode.
+"""
+
+import asyncio
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+import fact_extract
+import llm_extract
+import fake_providers
+from fake_providers import DEFAULT_RESPONSES
+from llm_cache import LLMCache
+from models import ProductInfo
+from settings import settings
+
+TEXTS = {
+    "lamp": "Desk lamp. Material: aluminium and glass. Country of Origin: China.",
+    "mug": "Ceramic mug, 12 oz, dishwasher safe.",
+    "bag": "Tote bag made from recycled cotton canvas.",
+}
+FACTS = DEFAULT_RESPONSES["anthropic_facts"]
+
+
+def _with_fake_claude(coro_fn, cache=None, batch_size=8):
+    """Run `coro_fn()` against a local fake Anthropic API; returns (result, anthropic calls)."""
+
+    async def run():
+        saved, llm_extract.llm_cache = llm_extract.llm_cache, cache
+        try:
+            async with fake_providers.serve(ANTHROPIC_API_KEY="test-key", LLM_BATCH_SIZE=batch_size) as providers:
+                return await coro_fn(), providers.counts["anthropic"]
+        finally:
+            llm_extract.llm_cache = saved
+
+    return asyncio.run(run())
+
+
+def test_one_request_for_several_products_shares_the_cache():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = LLMCache(Path(tmp) / "llm.sqlite", max_entries=100)
+        results, calls = _with_fake_claude(lambda: llm_extract.extract_facts_claude_batch(TEXTS), cache=cache)
+        assert calls == 1 and list(results) == list(TEXTS)
+        for result in results.values():
+            assert result["materials"] == FACTS["materials"]
+            assert result["provenance"]["materials"]["cached"] is False
+
+        # The single-product path finds what the batch stored
+        single, calls = _with_fake_claude(lambda: llm_extract.extract_facts_claude(TEXTS["mug"]), cache=cache)
+        assert calls == 0 and single["provenance"]["materials"]["cached"] is True
+
+
+def test_requests_hold_at_most_batch_size_products():
+    texts = {f"p{i}": f"Product {i}: steel bottle, 500 g." for i in range(5)}
+    results, calls = _with_fake_claude(lambda: llm_extract.extract_facts_claude_batch(texts), batch_size=2)
+    assert calls == 3
+    assert all(r["country_of_origin"] == FACTS["country_of_origin"] for r in results.values())
+
+
+def test_only_items_that_failed_to_parse_are_retried():
+    sent = []
+
+    async def fake_post(content, max_tokens, deadline, lane="interactive"):
+        sent.append(content)
+        if len(sent) == 1:
+            # Item 2 missing, item 3 not an object
+            return json.dumps({"1": {"materials": ["Aluminium"]}, "3": "n/a"})
+        return json.dumps({"1": {"materials": ["Cotton"]}})
+
+    saved = settings.ANTHROPIC_API_KEY, llm_extract.llm_cache, llm_extract._post_messages
+    settings.ANTHROPIC_API_KEY, llm_extract.llm_cache, llm_extract._post_messages = "test-key", None, fake_post
+    try:
+        results = asyncio.run(llm_extract.extract_facts_claude_batch(TEXTS, fields=["materials"]))
+    finally:
+        settings.ANTHROPIC_API_KEY, llm_extract.llm_cache, llm_extract._post_messages = saved
+
+    assert len(sent) == 2
+    assert TEXTS["lamp"] in sent[0] and TEXTS["mug"] in sent[0] and TEXTS["bag"] in sent[0]
+    # The retry carries only the two failed products, renumbered
+    assert TEXTS["lamp"] not in sent[1] and "### ITEM 1\n" + TEXTS["mug"] in sent[1] and TEXTS["bag"] in sent[1]
+    assert results["lamp"]["materials"] == ["Aluminium"]
+    assert results["mug"]["materials"] == ["Cotton"]
+    # Still unanswered after the retry: empty, and not cached
+    assert results["bag"]["materials"] == [] and "provenance" not in results["bag"]
+
+
+def test_extract_facts_many_batches_only_products_that_need_the_llm():
+    asked = []
+
+    async def fake_batch(texts, deadline=None, fields=None):
+        asked.append((dict(texts), list(fields)))
+        return {i: {"materials": ["PP"], "provenance": {"materials": {"tier": "llm"}}} for i in texts}
+
+    infos = [
+        ProductInfo(url="https://www.amazon.com/dp/B000000001", weight_kg=0.2, materials=["Steel"], raw={"text": "x"}),
+        ProductInfo(url="https://www.amazon.com/dp/B000000002", raw={"text": "Item Weight: 2 pounds. Food container."}),
+        ProductInfo(url="https://www.amazon.com/dp/B000000003", raw={"text": "Storage box."}),
+    ]
+    saved = fact_extract.extract_facts_claude_batch
+    fact_extract.extract_facts_claude_batch = fake_batch
+    try:
+        facts = asyncio.run(fact_extract.extract_facts_many(infos))
+    finally:
+        fact_extract.extract_facts_claude_batch = saved
+
+    assert len(asked) == 1
+    texts, fields = asked[0]
+    assert texts == {"1": infos[1].raw["text"], "2": infos[2].raw["text"]}
+    # The union of what the two products miss; only the third lacks a weight
+    assert "item_weight_kg" in fields and "materials" in fields
+    assert facts[0]["llm_fields"] == [] and facts[0]["materials"] == ["Steel"]
+    assert "item_weight_kg" not in facts[1]["llm_fields"] and facts[1]["provenance"]["item_weight_kg"]["tier"] == "regex"
+    assert "item_weight_kg" in facts[2]["llm_fields"]
+    assert facts[1]["materials"] == facts[2]["materials"] == ["PP"]
+
+
+def test_async_batch_submission():
+    async def run():
+        batch_id = await llm_extract.submit_extraction_batch(TEXTS, fields=["materials", "country_of_origin"])
+        return await llm_extract.collect_extraction_batch(batch_id, TEXTS, fields=["materials", "country_of_origin"])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = LLMCache(Path(tmp) / "llm.sqlite", max_entries=100)
+        results, calls = _with_fake_claude(run, cache=cache)
+        assert calls == 1 and list(results) == list(TEXTS)
+        assert all(set(r) == {"materials", "country_of_origin", "provenance"} for r in results.values())
+        assert cache.stats()["entries"] == 3
+
+        # The online path reuses what the offline batch extracted
+        fields = ["materials", "country_of_origin"]
+        single, calls = _with_fake_claude(lambda: llm_extract.extract_facts_claude(TEXTS["bag"], fields=fields), cache=cache)
+        assert calls == 0 and single["provenance"]["materials"]["cached"] is True
+
+
+if __name__ == "__main__":
+    for test in [
+        test_one_request_for_several_products_shares_the_cache,
+        test_requests_hold_at_most_batch_size_products,
+        test_only_items_that_failed_to_parse_are_retried,
+        test_extract_facts_many_batches_only_products_that_need_the_llm,
+        test_async_batch_submission,
+    ]:
+        test()
+        print(f"✓ {test.__name__}")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test the LLM extraction cache: repeated text is served without a model call,
+keys include the prompt version and model, failures aren't cached, LRU bounds hold.
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+import llm_extract
+import fake_providers
+from fake_providers import DEFAULT_RESPONSES, ProviderBehaviour
+from llm_cache import LLMCache, text_hash
+
+PAGE_TEXT = "Brand: Acme\n  Item Weight: 3.1 ounces\nMaterial: Copper, PVC\nCountry of Origin: China"
+
+
+def _extract_with_fake_claude(texts, behaviours=None, cache=None):
+    """Run extract_facts_claude over `texts` against a local fake API; returns (results, anthropic calls)."""
+
+    async def run():
+        saved, llm_extract.llm_cache = llm_extract.llm_cache, cache
+        try:
+            async with fake_providers.serve(behaviours, ANTHROPIC_API_KEY="test-key") as providers:
+                results = [await llm_extract.extract_facts_claude(text) for text in texts]
+        finally:
+            llm_extract.llm_cache = saved
+        return results, providers.counts["anthropic"]
+
+    return asyncio.run(run())
+
+
+def test_repeated_text_is_served_from_cache():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = LLMCache(Path(tmp) / "llm.sqlite", max_entries=100)
+        # Whitespace differences don't matter
+        (first, second), calls = _extract_with_fake_claude([PAGE_TEXT, "  " + PAGE_TEXT.replace("\n", " \n ")], cache=cache)
+        assert calls == 1
+        assert first["materials"] == second["materials"] == DEFAULT_RESPONSES["anthropic_facts"]["materials"]
+        assert first["provenance"]["materials"]["cached"] is False
+        assert second["provenance"]["materials"]["cached"] is True
+        assert second["provenance"]["item_weight_kg"] == {
+            "tier": "llm",
+            "model": llm_extract.MODEL,
+            "prompt_version": llm_extract.PROMPT_VERSION,
+            "cached": True,
+            "extracted_at": first["provenance"]["item_weight_kg"]["extracted_at"],
+        }
+        # Fields the model left empty carry no provenance
+        assert "packaging_weight_kg" not in second["provenance"]
+
+        # The store survives a restart
+        cache.close()
+        (third,), calls = _extract_with_fake_claude([PAGE_TEXT], cache=LLMCache(Path(tmp) / "llm.sqlite", 100))
+        assert calls == 0 and third["provenance"]["materials"]["cached"] is True
+
+
+def test_failures_are_not_cached():
+    # Not a 429/529, so the scheduler doesn't retry it
+    failing = {"anthropic": ProviderBehaviour(error_rate=1.0, error_status=503)}
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = LLMCache(Path(tmp) / "llm.sqlite", max_entries=100)
+        (result,), calls = _extract_with_fake_claude([PAGE_TEXT], behaviours=failing, cache=cache)
+        assert calls == 1 and result["materials"] == [] and "provenance" not in result
+        assert cache.stats()["entries"] == 0
+
+
+def test_key_includes_prompt_version_and_model():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = LLMCache(Path(tmp) / "llm.sqlite", max_entries=100)
+        digest = text_hash(PAGE_TEXT)
+        cache.put(digest, "v1", "model-a", {"materials": ["PET"]})
+        assert cache.get(digest, "v1", "model-a")["result"] == {"materials": ["PET"]}
+        assert cache.get(digest, "v2", "model-a") is None
+        assert cache.get(digest, "v1", "model-b") is None
+        assert cache.get(text_hash(PAGE_TEXT + " more"), "v1", "model-a") is None
+
+
+def test_least_recently_used_entries_are_evicted():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = LLMCache(Path(tmp) / "llm.sqlite", max_entries=3)
+        for name in "abc":
+            cache.put(name, "v", "m", {"name": name})
+            time.sleep(0.01)
+        cache.get("a", "v", "m")
+        cache.put("d", "v", "m", {"name": "d"})
+        assert cache.get("b", "v", "m") is None
+        assert [cache.get(n, "v", "m") is not None for n in "acd"] == [True, True, True]
+        assert cache.stats()["evictions"] == 1 and cache.stats()["entries"] == 3
+
+
+if __name__ == "__main__":
+    for test in [
+        test_repeated_text_is_served_from_cache,
+        test_failures_are_not_cached,
+        test_key_includes_prompt_version_and_model,
+        test_least_recently_used_entries_are_evicted,
+    ]:
+        test()
+        print(f"✓ {test.__name__}")
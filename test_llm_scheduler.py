@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Test the shared LLM scheduler: concurrency cap, priority lanes, tokens-per-minute budget,
+backoff and retries on 429/529, and deadlines.
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+import llm_extract
+import llm_scheduler
+from deadline import Deadline
+import fake_providers
+from fake_providers import ProviderBehaviour
+from llm_scheduler import LLMScheduler, RateLimited
+
+
+def test_concurrency_is_capped():
+    scheduler = LLMScheduler(max_concurrency=3, tokens_per_minute=10**6)
+    in_flight = 0
+    peak = 0
+
+    async def call():
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.02)
+        in_flight -= 1
+        return "ok"
+
+    async def run():
+        return await asyncio.gather(*[scheduler.submit(call, estimated_tokens=10) for _ in range(10)])
+
+    assert asyncio.run(run()) == ["ok"] * 10
+    assert peak == 3 and scheduler.stats()["active"] == 0
+
+
+def test_interactive_lane_goes_first():
+    scheduler = LLMScheduler(max_concurrency=1, tokens_per_minute=10**6)
+    order = []
+
+    def call(name):
+        async def run():
+            order.append(name)
+            await asyncio.sleep(0.01)
+
+        return run
+
+    async def run():
+        blocker = asyncio.create_task(scheduler.submit(call("first"), 10))
+        await asyncio.sleep(0)
+        waiting = [
+            asyncio.create_task(scheduler.submit(call("batch-1"), 10, lane="batch")),
+            asyncio.create_task(scheduler.submit(call("batch-2"), 10, lane="batch")),
+        ]
+        await asyncio.sleep(0)
+        waiting.append(asyncio.create_task(scheduler.submit(call("interactive"), 10, lane="interactive")))
+        await asyncio.sleep(0)
+        assert scheduler.stats()["waiting"] == {"interactive": 1, "batch": 2}
+        await asyncio.gather(blocker, *waiting)
+
+    asyncio.run(run())
+    assert order == ["first", "interactive", "batch-1", "batch-2"]
+
+
+def test_token_budget_holds_requests_until_the_window_frees():
+    scheduler = LLMScheduler(max_concurrency=10, tokens_per_minute=100)
+
+    async def call():
+        return {"usage": 10}
+
+    async def run(first_usage):
+        started = time.monotonic()
+        await scheduler.submit(call, estimated_tokens=80, usage=lambda r: first_usage)
+        await scheduler.submit(call, estimated_tokens=50)
+        return time.monotonic() - started
+
+    saved = llm_scheduler.WINDOW_S
+    llm_scheduler.WINDOW_S = 0.2
+    try:
+        # 80 + 50 is over budget: the second request waits for the first to leave the window
+        assert 0.18 <= asyncio.run(run(None)) < 0.5
+        time.sleep(0.25)
+        # Reported usage replaces the estimate, so 10 + 50 fits at once
+        assert asyncio.run(run(10)) < 0.1
+        assert scheduler.stats()["tokens_last_minute"] == 60
+    finally:
+        llm_scheduler.WINDOW_S = saved
+
+
+def test_rate_limited_calls_back_off_and_retry():
+    scheduler = LLMScheduler(max_concurrency=2, tokens_per_minute=10**6, max_retries=3, base_backoff_s=0.01)
+    attempts = []
+
+    async def call():
+        attempts.append(time.monotonic())
+        if len(attempts) < 3:
+            raise RateLimited(429, retry_after=0.05)
+        return "ok"
+
+    assert asyncio.run(scheduler.submit(call, 10)) == "ok"
+    assert len(attempts) == 3 and scheduler.stats()["rate_limited"] == 2
+    # Retry-After is honoured, plus jitter
+    assert all(b - a >= 0.05 for a, b in zip(attempts, attempts[1:]))
+
+    async def always_limited():
+        raise RateLimited(529)
+
+    with pytest.raises(RateLimited):
+        asyncio.run(scheduler.submit(always_limited, 10))
+    assert scheduler.stats()["gave_up"] == 1 and scheduler.stats()["active"] == 0
+
+
+def test_waiting_stops_at_the_deadline():
+    scheduler = LLMScheduler(max_concurrency=1, tokens_per_minute=10**6)
+
+    async def slow():
+        await asyncio.sleep(0.3)
+
+    async def fast():
+        return "ok"
+
+    async def run():
+        blocker = asyncio.create_task(scheduler.submit(slow, 10))
+        await asyncio.sleep(0)
+        with pytest.raises(asyncio.TimeoutError):
+            await scheduler.submit(fast, 10, deadline=Deadline(0.05))
+        await blocker
+        # The abandoned waiter doesn't hold a slot
+        return await scheduler.submit(fast, 10)
+
+    assert asyncio.run(run()) == "ok"
+    assert scheduler.stats()["active"] == 0
+
+
+def test_extraction_retries_overloaded_api_then_gives_up():
+    async def run():
+        behaviours = {"anthropic": ProviderBehaviour(error_rate=1.0, error_status=529)}
+        scheduler = LLMScheduler(max_concurrency=2, tokens_per_minute=10**6, max_retries=2, base_backoff_s=0.01, max_backoff_s=0.02)
+        saved = llm_extract.llm_cache, llm_scheduler.scheduler
+        llm_extract.llm_cache, llm_scheduler.scheduler = None, scheduler
+        try:
+            async with fake_providers.serve(behaviours, ANTHROPIC_API_KEY="test-key") as providers:
+                result = await llm_extract.extract_facts_claude("Item Weight: 3 ounces")
+        finally:
+            llm_extract.llm_cache, llm_scheduler.scheduler = saved
+        return result, providers.counts["anthropic"], scheduler.stats()
+
+    result, calls, stats = asyncio.run(run())
+    # The fake's "retry-after: 1" is capped by max_backoff_s
+    assert calls == 3 and stats["rate_limited"] == 3 and stats["gave_up"] == 1
+    assert result["materials"] == [] and "provenance" not in result
+
+
+if __name__ == "__main__":
+    for test in [
+        test_concurrency_is_capped,
+        test_interactive_lane_goes_first,
+        test_token_budget_holds_requests_until_the_window_frees,
+        test_rate_limited_calls_back_off_and_retry,
+        test_waiting_stops_at_the_deadline,
+        test_extraction_retries_overloaded_api_then_gives_up,
+    ]:
+        test()
+        print(f"✓ {test.__name__}")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Test that the curl_cffi fetch strategy and the Claude extraction path do not block the event loop.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+from aiohttp import web
+
+import scrape
+import fake_providers
+from fake_providers import DEFAULT_RESPONSES, ProviderBehaviour, serve_app
+
+
+async def _slow_page(request: web.Request) -> web.Response:
+    await asyncio.sleep(0.5)
+    return web.Response(text="<html>slow</html>", content_type="text/html")
+
+
+def test_curl_cffi_fetch_keeps_loop_responsive():
+    async def run():
+        app = web.Application()
+        app.router.add_get("/dp/{asin}", _slow_page)
+        ticks = 0
+        done = asyncio.Event()
+
+        async def ticker():
+            nonlocal ticks
+            while not done.is_set():
+                await asyncio.sleep(0.02)
+                ticks += 1
+
+        async with serve_app(app) as base_url:
+            ctx = scrape._FetchContext(f"{base_url}/dp/B000TEST01", dict(scrape.HEADERS_BASE), None)
+            ctx.timeout_s = 5
+            tick_task = asyncio.create_task(ticker())
+            try:
+                html = await scrape._fetch_curl_cffi(ctx)
+            finally:
+                done.set()
+                await tick_task
+        return html, ticks
+
+    html, ticks = asyncio.run(run())
+    assert "slow" in html
+    # A blocking call would leave the ticker stuck for the whole 0.5s round trip
+    assert ticks >= 10
+
+
+def test_claude_extraction_keeps_loop_responsive():
+    import pytest
+
+    pytest.importorskip("anthropic")
+
+    async def run():
+        ticks = 0
+        done = asyncio.Event()
+
+        async def ticker():
+            nonlocal ticks
+            while not done.is_set():
+                await asyncio.sleep(0.02)
+                ticks += 1
+
+        behaviours = {"anthropic": ProviderBehaviour(latency_ms=500)}
+        async with fake_providers.serve(behaviours, ANTHROPIC_API_KEY="test-key"):
+            tick_task = asyncio.create_task(ticker())
+            try:
+                info = await scrape.scrape_amazon_product_claude("<html></html>", "https://www.amazon.com/dp/B000TEST01")
+            finally:
+                done.set()
+                await tick_task
+        return info, ticks
+
+    info, ticks = asyncio.run(run())
+    # Answered by the fake Messages API, not the HTML fallback
+    assert info.materials == DEFAULT_RESPONSES["anthropic_facts"]["materials"]
+    assert ticks >= 10
+
+
+if __name__ == "__main__":
+    for test in [test_curl_cffi_fetch_keeps_loop_responsive, test_claude_extraction_keeps_loop_responsive]:
+        test()
+        print(f"✓ {test.__name__}")
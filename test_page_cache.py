@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test the on-disk page cache: URL keys, TTL, LRU size cap and conditional revalidation.
+"""
+
+import asyncio
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+from aiohttp import web
+
+import scrape
+from fake_providers import serve_app
+from page_cache import PageCache, cache_key
+
+PAGE = '<html><span id="productTitle">Cached Widget</span>' + "x" * 2000 + "</html>"
+
+
+def test_product_urls_share_a_key():
+    key = cache_key("https://www.amazon.com/dp/B0CYLKRRQX")
+    assert cache_key("https://www.amazon.com/Some-Lamp/dp/B0CYLKRRQX/ref=sr_1_3?th=1&psc=1") == key
+    assert cache_key("https://m.amazon.com/gp/product/B0CYLKRRQX") == key
+    assert cache_key("https://www.amazon.co.uk/dp/B0CYLKRRQX") != key
+    assert cache_key("https://www.amazon.com/s?k=lamp") != cache_key("https://www.amazon.com/s?k=desk")
+
+
+def test_ttl_and_lru_eviction():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = PageCache(tmp, ttl_s=3600, max_bytes=10_000)
+        cache.put("https://www.amazon.com/dp/B000000001", PAGE, etag='"v1"')
+        hit = cache.get("https://www.amazon.com/dp/B000000001?ref=x")
+        assert hit is not None and hit.fresh and hit.html == PAGE
+        assert hit.validators == {"If-None-Match": '"v1"'}
+
+        stale = PageCache(tmp, ttl_s=0, max_bytes=10_000).get("https://www.amazon.com/dp/B000000001")
+        assert stale is not None and not stale.fresh
+
+        # Random text barely compresses, so a handful of pages overflows the cap
+        import os
+        for i in range(2, 8):
+            cache.put(f"https://www.amazon.com/dp/B00000000{i}", PAGE + os.urandom(1500).hex())
+        assert cache.stats()["bytes"] <= 10_000
+        assert cache.evictions > 0
+        assert cache.get("https://www.amazon.com/dp/B000000007") is not None
+
+
+def test_stale_page_revalidated_with_304():
+    requests: list = []
+
+    async def product(request: web.Request) -> web.Response:
+        requests.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return web.Response(status=304)
+        return web.Response(text=PAGE, content_type="text/html", headers={"ETag": '"v1"'})
+
+    async def run():
+        app = web.Application()
+        app.router.add_get("/dp/{asin}", product)
+        async with serve_app(app) as base_url:
+            url = f"{base_url}/dp/B0CACHE001"
+            first = await scrape.fetch_html(url)
+            scrape.page_cache.ttl_s = 0
+            second = await scrape.fetch_html(url)
+        return first, second
+
+    saved = (scrape.page_cache, scrape.FETCH_STRATEGIES.copy())
+    with tempfile.TemporaryDirectory() as tmp:
+        scrape.page_cache = PageCache(tmp, ttl_s=3600, max_bytes=10_000_000)
+        scrape.FETCH_STRATEGIES.clear()
+        scrape.FETCH_STRATEGIES["direct"] = saved[1]["direct"]
+        try:
+            first, second = asyncio.run(run())
+        finally:
+            scrape.page_cache = saved[0]
+            scrape.FETCH_STRATEGIES.clear()
+            scrape.FETCH_STRATEGIES.update(saved[1])
+    assert first == second == PAGE
+    assert requests == [None, '"v1"']
+
+
+if __name__ == "__main__":
+    for test in [test_product_urls_share_a_key, test_ttl_and_lru_eviction, test_stale_page_revalidated_with_304]:
+        test()
+        print(f"✓ {test.__name__}")
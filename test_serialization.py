@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Test response projection (slim default, `fields`, `include`) and the JSON encoder.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+import serialization
+from models import AnalyzeResponse, CarbonBreakdown, ProductInfo
+from serialization import FastJSONResponse, dumps, project
+
+
+def _response():
+    product = ProductInfo(
+        url="https://www.amazon.com/dp/B000TEST01",
+        title="Stainless Steel Water Bottle",
+        asin="B000TEST01",
+        materials=["steel"],
+        raw={"text": "Full page text " * 50, "html_len": 120000},
+    )
+    return AnalyzeResponse(
+        product=product,
+        carbon=CarbonBreakdown(manufacturing_kgco2e=1.2, shipping_kgco2e=0.3),
+        total_kgco2e=1.5,
+    )
+
+
+def test_slim_by_default():
+    out = project(_response())
+    assert "raw" not in out["product"]
+    assert out["product"]["title"] == "Stainless Steel Water Bottle"
+    assert out["total_kgco2e"] == 1.5
+
+
+def test_fields_dotted_paths():
+    out = project(_response(), fields=["total_kgco2e", "product.title", "carbon.shipping_kgco2e"])
+    assert out == {
+        "total_kgco2e": 1.5,
+        "product": {"title": "Stainless Steel Water Bottle"},
+        "carbon": {"shipping_kgco2e": 0.3},
+    }
+
+
+def test_fields_can_reach_into_excluded_field():
+    out = project(_response(), fields=["product.raw.html_len"])
+    assert out == {"product": {"raw": {"html_len": 120000}}}
+
+    out = project(_response(), fields=["product.raw"])
+    assert set(out["product"]["raw"]) == {"text", "html_len"}
+
+
+def test_include_opts_back_in():
+    out = project(_response(), include=["product.raw"])
+    assert out["product"]["raw"]["html_len"] == 120000
+    assert out["product"]["title"] == "Stainless Steel Water Bottle"
+
+    # Opting in to part of the field is enough to lift the default exclusion
+    out = project(_response(), include=["product.raw.text"])
+    assert "raw" in out["product"]
+
+    # Unrelated paths leave the slim default alone
+    assert "raw" not in project(_response(), include=["product.rawness"])["product"]
+
+
+def test_numpy_and_nan_encoding():
+    payload = {
+        "count": np.int64(3),
+        "score": np.float32(0.5),
+        "vector": np.array([1.0, 2.0]),
+        "missing": float("nan"),
+        "url": ProductInfo(url="https://www.amazon.com/dp/B000TEST01").url,
+    }
+    decoded = json.loads(dumps(payload))
+    assert decoded["count"] == 3 and decoded["score"] == 0.5
+    assert decoded["vector"] == [1.0, 2.0]
+    assert decoded["missing"] is None
+    assert decoded["url"] == "https://www.amazon.com/dp/B000TEST01"
+
+    body = FastJSONResponse(content=project(_response())).body
+    assert json.loads(body)["product"]["asin"] == "B000TEST01"
+
+
+def test_stdlib_fallback_matches_orjson():
+    payload = {
+        "count": np.int64(3),
+        "score": np.float32(0.5),
+        "vector": np.array([1.0, float("nan")]),
+        "values": [float("inf"), -float("inf"), (float("nan"), 2.5)],
+        "nested": {"missing": np.float64("nan"), "name": "Café ✓"},
+        "url": ProductInfo(url="https://www.amazon.com/dp/B000TEST01").url,
+    }
+    saved = serialization.orjson
+    serialization.orjson = None
+    try:
+        fallback = dumps(payload)
+    finally:
+        serialization.orjson = saved
+
+    decoded = json.loads(fallback)
+    assert decoded["vector"] == [1.0, None]
+    assert decoded["values"] == [None, None, [None, 2.5]]
+    assert decoded["nested"]["missing"] is None
+    if saved is not None:
+        assert fallback == dumps(payload)
+
+
+if __name__ == "__main__":
+    for test in [
+        test_slim_by_default,
+        test_fields_dotted_paths,
+        test_fields_can_reach_into_excluded_field,
+        test_include_opts_back_in,
+        test_numpy_and_nan_encoding,
+        test_stdlib_fallback_matches_orjson,
+    ]:
+        test()
+        print(f"✓ {test.__name__}")
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test concurrent similar-product extraction: per-host token bucket, global cap, rank order.
+"""
+
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+import extract_top_k_similar as similar
+from models import ProductInfo
+from politeness import HostScheduler, TokenBucket
+
+
+def test_token_bucket_paces_after_burst():
+    async def run():
+        bucket = TokenBucket(rate=20, burst=2)
+        started = time.monotonic()
+        for _ in range(6):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    # Two tokens up front, then four more at 20/s
+    assert 0.17 <= asyncio.run(run()) < 0.5
+
+
+def test_candidates_run_concurrently_in_rank_order():
+    urls = [f"https://www.amazon.com/dp/B00000000{i}" for i in range(5)]
+    in_flight = 0
+    peak = 0
+
+    async def fake_search(title, exclude_asin, limit):
+        return urls[:limit]
+
+    async def fake_extract(url, deadline=None):
+        nonlocal in_flight, peak
+        await similar.similar_scheduler.before_request(url)
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(random.uniform(0.05, 0.2))
+        in_flight -= 1
+        return ProductInfo(url=url)
+
+    saved = (similar.search_amazon_for_title, similar.scrape_similar_product, similar.similar_scheduler)
+    similar.search_amazon_for_title = fake_search
+    similar.scrape_similar_product = fake_extract
+    similar.similar_scheduler = HostScheduler(max_concurrency=3, per_host_rate=100, per_host_burst=5)
+    try:
+        started = time.monotonic()
+        info = ProductInfo(url="https://www.amazon.com/dp/B0ORIGINAL", title="Lamp", asin="B0ORIGINAL")
+        results = asyncio.run(similar.extract_top_k_similar(info, k=5))
+        elapsed = time.monotonic() - started
+    finally:
+        similar.search_amazon_for_title, similar.scrape_similar_product, similar.similar_scheduler = saved
+
+    assert [r["url"] for r in results] == urls
+    assert peak == 3
+    # Two waves of at most 0.2s instead of five sequential scrapes plus 1s sleeps
+    assert elapsed < 0.8
+
+
+if __name__ == "__main__":
+    for test in [test_token_bucket_paces_after_burst, test_candidates_run_concurrently_in_rank_order]:
+        test()
+        print(f"✓ {test.__name__}")
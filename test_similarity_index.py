@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test the local similarity index and its use by extract_top_k_similar.
+"""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+import extract_top_k_similar as similar
+from dataset_loader import DatasetLoader
+from models import ProductInfo
+from similarity_index import SimilarityIndex, build_from_dataframe
+
+
+def _crumbs(*names):
+    return json.dumps([{"name": n} for n in names])
+
+
+DATASET = pd.DataFrame(
+    [
+        ("B000000001", "LED Fairy String Lights 100ft Warm White", "Brightown", _crumbs("Home", "Lighting", "String Lights")),
+        ("B000000002", "Solar LED String Lights Outdoor Waterproof", "Brightown", _crumbs("Home", "Lighting", "String Lights")),
+        ("B000000003", "Copper Wire Fairy Lights Battery Operated", "Minetom", _crumbs("Home", "Lighting", "String Lights")),
+        ("B000000004", "Moisturizing Body Wash Shower Gel", "Dove", _crumbs("Beauty", "Bath", "Body Wash")),
+        ("B000000005", "USB C Fast Charger 20W Power Adapter", "Anker", _crumbs("Electronics", "Chargers")),
+        ("B000000006", "Unscented Shower Gel for Sensitive Skin", "Cetaphil", _crumbs("Beauty", "Bath", "Body Wash")),
+    ],
+    columns=["sku", "name", "brandName", "breadcrumbs"],
+)
+
+
+def test_query_ranks_same_kind_of_product_first():
+    index = build_from_dataframe(DATASET)
+    assert len(index) == 6
+
+    hits = index.query("Fairy Lights 200 LED Plug In", "Brightown", "Home Lighting String Lights", k=3)
+    assert {asin for asin, _ in hits} == {"B000000001", "B000000002", "B000000003"}
+    scores = [score for _, score in hits]
+    assert scores == sorted(scores, reverse=True) and 0 < scores[-1] <= scores[0] <= 1.0001
+
+    hits = index.query("Shower gel with aloe", category="Beauty Bath Body Wash", k=2)
+    assert {asin for asin, _ in hits} == {"B000000004", "B000000006"}
+
+
+def test_exclude_and_min_score():
+    index = build_from_dataframe(DATASET)
+    hits = index.query("LED Fairy String Lights 100ft Warm White", "Brightown", k=2, exclude=["B000000001"])
+    assert "B000000001" not in [asin for asin, _ in hits]
+    assert len(hits) == 2
+
+    assert index.query("completely unrelated words", k=5) == []
+    assert index.query("charger", k=5, min_score=0.99) == []
+    assert SimilarityIndex().build([]).query("anything") == []
+
+
+def test_top_k_prefers_index_over_live_search():
+    loader = DatasetLoader()
+    loader.df = DATASET
+    searched = []
+
+    async def fake_search(title, exclude_asin, limit):
+        searched.append(limit)
+        return [f"https://www.amazon.com/dp/B0SEARCH0{i}" for i in range(limit)]
+
+    async def fake_extract(url, deadline=None):
+        return ProductInfo(url=url)
+
+    saved = similar.find_similar_asins, similar.search_amazon_for_title, similar.scrape_similar_product
+    similar.find_similar_asins = loader.find_similar_asins
+    similar.search_amazon_for_title = fake_search
+    similar.scrape_similar_product = fake_extract
+    try:
+        info = ProductInfo(
+            url="https://www.amazon.com/dp/B000000001", asin="B000000001",
+            title="LED Fairy String Lights 100ft Warm White", brand="Brightown",
+            category="Home › Lighting › String Lights",
+        )
+        one = asyncio.run(similar.extract_top_k_similar(info, k=1))
+        three = asyncio.run(similar.extract_top_k_similar(info, k=3))
+    finally:
+        similar.find_similar_asins, similar.search_amazon_for_title, similar.scrape_similar_product = saved
+
+    # A close enough match in the dataset: no live search at all
+    assert [r["url"] for r in one] == ["https://www.amazon.com/dp/B000000002"]
+    # Only one product clears the minimum score, so search fills the remaining slots after it
+    assert [r["url"].rsplit("/", 1)[-1] for r in three] == ["B000000002", "B0SEARCH00", "B0SEARCH01"]
+    assert searched == [3]
+
+
+if __name__ == "__main__":
+    for test in [
+        test_query_ranks_same_kind_of_product_first,
+        test_exclude_and_min_score,
+        test_top_k_prefers_index_over_live_search,
+    ]:
+        test()
+        print(f"✓ {test.__name__}")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test adaptive fetch-strategy ordering: failing strategies drop back and cool down.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+import scrape
+from settings import settings
+from strategy_scheduler import StrategyScheduler
+
+URL = "https://www.amazon.com/dp/B0CYLKRRQX"
+DEFAULT = ["direct", "insecure", "mobile", "curl_cffi", "scraper_api"]
+
+
+def test_keeps_default_order_without_data():
+    scheduler = StrategyScheduler()
+    assert scheduler.order(URL, DEFAULT) == DEFAULT
+
+
+def test_blocked_strategies_move_behind_working_one():
+    scheduler = StrategyScheduler(failure_threshold=10)
+    for _ in range(3):
+        scheduler.record(URL, "direct", ok=False, latency_s=20.0)
+        scheduler.record(URL, "insecure", ok=False, latency_s=20.0)
+        scheduler.record(URL, "mobile", ok=False, latency_s=20.0)
+        scheduler.record(URL, "curl_cffi", ok=True, latency_s=1.2)
+    order = scheduler.order(URL, DEFAULT)
+    assert order[0] == "curl_cffi"
+    assert order.index("scraper_api") < order.index("direct")
+
+
+def test_cooldown_after_consecutive_failures():
+    scheduler = StrategyScheduler(failure_threshold=2, cooldown_s=60)
+    scheduler.record(URL, "direct", ok=False, latency_s=0.1)
+    scheduler.record(URL, "direct", ok=False, latency_s=0.1)
+    assert scheduler.order(URL, DEFAULT)[-1] == "direct"
+    stats = scheduler.snapshot("www.amazon.com")["www.amazon.com"]["strategies"]["direct"]
+    assert stats["cooldown_s"] > 0 and stats["consecutive_failures"] == 2
+
+
+def test_stats_are_per_host():
+    scheduler = StrategyScheduler(failure_threshold=1)
+    scheduler.record(URL, "direct", ok=False, latency_s=5.0)
+    assert scheduler.order("https://r.jina.ai/http/example.com", DEFAULT) == DEFAULT
+
+
+def test_captcha_page_counts_as_failure_on_sequential_path():
+    url = "https://www.amazon.test/dp/B000TEST02"
+    calls = []
+
+    def strategy(name, html):
+        async def fetch(ctx):
+            calls.append(name)
+            return html
+
+        return fetch
+
+    saved = dict(scrape.FETCH_STRATEGIES), settings.SCRAPE_ADAPTIVE, scrape.strategy_scheduler
+    scrape.FETCH_STRATEGIES.clear()
+    scrape.FETCH_STRATEGIES.update({
+        "direct": strategy("direct", '<html><form action="/errors/validateCaptcha"></form></html>'),
+        "mobile": strategy("mobile", '<html><span id="productTitle">Widget</span></html>'),
+    })
+    settings.SCRAPE_ADAPTIVE = True
+    scrape.strategy_scheduler = StrategyScheduler(failure_threshold=1, cooldown_s=60)
+    try:
+        html = asyncio.run(scrape.fetch_html(url, hedge=False, use_cache=False))
+        stats = scrape.strategy_scheduler.snapshot("www.amazon.test")["www.amazon.test"]
+        # Blocked strategy is cooled down, so the next fetch goes straight to the working one
+        calls.clear()
+        asyncio.run(scrape.fetch_html(url, hedge=False, use_cache=False))
+    finally:
+        scrape.FETCH_STRATEGIES.clear()
+        scrape.FETCH_STRATEGIES.update(saved[0])
+        settings.SCRAPE_ADAPTIVE, scrape.strategy_scheduler = saved[1:]
+
+    assert "productTitle" in html
+    assert stats["strategies"]["direct"]["consecutive_failures"] == 1
+    assert stats["order"][0] == "mobile"
+    assert calls == ["mobile"]
+
+
+if __name__ == "__main__":
+    for test in [
+        test_keeps_default_order_without_data,
+        test_blocked_strategies_move_behind_working_one,
+        test_cooldown_after_consecutive_failures,
+        test_stats_are_per_host,
+        test_captcha_page_counts_as_failure_on_sequential_path,
+    ]:
+        test()
+        print(f"✓ {test.__name__}")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Test the streaming download: it stops once the parsed sections are complete, the truncated
+page still extracts the same product fields, and it is cached without the full page's validators.
+"""
+
+import asyncio
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+import aiohttp
+from aiohttp import web
+
+import scrape
+from fake_providers import serve_app
+from page_cache import PageCache
+from settings import settings
+
+FIXTURE = Path(__file__).parent / "backend" / "fixtures" / "amazon_product.html"
+FIELDS = ["title", "brand", "asin", "price", "weight_kg", "shipping_weight_kg", "dimensions_cm", "category",
+          "bullets", "materials", "images", "country_of_origin", "manufacturer"]
+
+
+def _big_page() -> str:
+    # Roughly 1 MB of reviews after the product sections, with multi-byte text
+    reviews = "".join(f"<div class='review'><p>Review {i}: très bien — 5★</p></div>\n" for i in range(20000))
+    return FIXTURE.read_text(encoding="utf-8").replace("</body>", reviews + "</body>")
+
+
+async def _serve_and_fetch(page: str, path: str, fetch=None):
+    async def handler(request: web.Request) -> web.StreamResponse:
+        resp = web.StreamResponse(headers={"Content-Type": "text/html; charset=utf-8", "ETag": '"full-page"'})
+        await resp.prepare(request)
+        data = page.encode("utf-8")
+        for i in range(0, len(data), 16 * 1024):
+            await resp.write(data[i:i + 16 * 1024])
+        return resp
+
+    app = web.Application()
+    app.router.add_get("/{tail:.*}", handler)
+    async with serve_app(app) as base_url:
+        url = base_url + path
+        if fetch is not None:
+            return await fetch(url), url
+        async with aiohttp.ClientSession() as session:
+            ctx = scrape._FetchContext(url, {}, session)
+            html = await scrape._fetch_direct(ctx)
+    return html, ctx
+
+
+def test_stops_after_sections_and_extracts_same_fields():
+    page = _big_page()
+    html, ctx = asyncio.run(_serve_and_fetch(page, "/dp/B000FAKE00"))
+    assert ctx.truncated
+    assert len(html) < len(page) / 4
+
+    url = "https://www.amazon.com/dp/B000FAKE00"
+    streamed = asyncio.run(scrape.scrape_amazon_product_fallback(html, url))
+    full = asyncio.run(scrape.scrape_amazon_product_fallback(page, url))
+    assert {f: getattr(streamed, f) for f in FIELDS} == {f: getattr(full, f) for f in FIELDS}
+
+
+def test_byte_cap_and_non_product_pages():
+    page = _big_page().replace('id="feature-bullets"', 'id="other-bullets"')
+    saved = settings.SCRAPE_STREAM_MAX_BYTES
+    settings.SCRAPE_STREAM_MAX_BYTES = 200_000
+    try:
+        capped, ctx = asyncio.run(_serve_and_fetch(page, "/dp/B000FAKE00"))
+        search, search_ctx = asyncio.run(_serve_and_fetch(page, "/s?k=lights"))
+    finally:
+        settings.SCRAPE_STREAM_MAX_BYTES = saved
+    # A missing section means reading up to the cap; the page is cut at a chunk boundary
+    assert ctx.truncated and 200_000 <= len(capped.encode("utf-8")) < 300_000
+    assert "�" not in capped
+    # Only product pages are streamed
+    assert not search_ctx.stream and search == page
+
+
+def test_truncated_page_is_cached_without_validators():
+    page = _big_page()
+    saved = dict(scrape.FETCH_STRATEGIES), scrape.page_cache
+    scrape.FETCH_STRATEGIES.clear()
+    scrape.FETCH_STRATEGIES["direct"] = saved[0]["direct"]
+    with tempfile.TemporaryDirectory() as tmp:
+        scrape.page_cache = cache = PageCache(tmp, ttl_s=60, max_bytes=50_000_000)
+        try:
+            fetch = lambda url: scrape.fetch_html(url, hedge=False)
+            product, product_url = asyncio.run(_serve_and_fetch(page, "/dp/B000FAKE00", fetch))
+            search, search_url = asyncio.run(_serve_and_fetch(page, "/s?k=lights", fetch))
+            product_meta, search_meta = cache.get(product_url).meta, cache.get(search_url).meta
+        finally:
+            scrape.FETCH_STRATEGIES.clear()
+            scrape.FETCH_STRATEGIES.update(saved[0])
+            scrape.page_cache = saved[1]
+
+    assert len(product) < len(page) / 4
+    # The ETag belongs to the whole page, so the cut-off body must not be revalidated with it
+    assert product_meta["etag"] is None
+    assert search == page and search_meta["etag"] == '"full-page"'
+
+
+if __name__ == "__main__":
+    for test in [
+        test_stops_after_sections_and_extracts_same_fields,
+        test_byte_cap_and_non_product_pages,
+        test_truncated_page_is_cached_without_validators,
+    ]:
+        test()
+        print(f"✓ {test.__name__}")
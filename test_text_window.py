@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Test relevance-based text reduction: fact-bearing sentences survive, boilerplate is dropped, budget holds.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+from fact_extract import REGEX_RULES
+from scrape import extract_product_fields
+from text_window import CHARS_PER_TOKEN, reduce_text, score
+
+FIXTURES = Path(__file__).parent / "backend" / "fixtures"
+BOILERPLATE = (
+    "Skip to main content Hello, sign in Account & Lists Returns & Orders Cart All Today's Deals "
+    "Customer Service Registry Gift Cards Sell. Customers who viewed this item also viewed. "
+) * 150
+
+
+def _page_text():
+    return extract_product_fields((FIXTURES / "amazon_product.html").read_text())["raw"]["text"]
+
+
+def test_facts_far_down_the_page_survive():
+    text = BOILERPLATE + _page_text()
+    assert len(text) > 20000
+    reduced = reduce_text(text, max_tokens=300)
+    assert len(reduced) <= 300 * CHARS_PER_TOKEN
+    assert "Sign in" not in reduced and "Today's Deals" not in reduced
+    # Every fact the rules find in the full page is still in the reduced text
+    for field, rule in REGEX_RULES.items():
+        assert rule(reduced) == rule(text), field
+
+
+def test_highest_scoring_pieces_are_sent_once_in_page_order():
+    text = "\n".join(
+        [
+            "Free returns on eligible orders.",
+            "Material: 100% cotton.",
+            "Ships from and sold by Example.",
+            "Country of Origin: Portugal. Item Weight: 12 ounces.",
+        ]
+        * 40
+    )
+    reduced = reduce_text(text, max_tokens=20)
+    assert reduced.split("\n") == ["Material: 100% cotton.", "Country of Origin: Portugal.", "Item Weight: 12 ounces."]
+    assert score("Free returns on eligible orders.") == 0
+
+
+def test_short_or_signal_free_text_is_left_alone():
+    assert reduce_text("Item Weight: 3 ounces", max_tokens=100) == "Item Weight: 3 ounces"
+    assert reduce_text(BOILERPLATE, max_tokens=50) == BOILERPLATE[: 50 * CHARS_PER_TOKEN]
+
+
+if __name__ == "__main__":
+    for test in [
+        test_facts_far_down_the_page_survive,
+        test_highest_scoring_pieces_are_sent_once_in_page_order,
+        test_short_or_signal_free_text_is_left_alone,
+    ]:
+        test()
+        print(f"✓ {test.__name__}")